@@ -0,0 +1,76 @@
+"""어시스턴트 목록/통계 캐시
+
+/assistants 호출마다 OpenSearch 집계를 실행하지 않도록 조직별 결과를 프로세스 메모리에 보관합니다.
+  - 이 워커에서 문서를 업로드하면 invalidate()로 즉시 갱신
+  - 다른 워커나 bulk_ingest.py로 적재한 문서는 TTL이 지나면 반영
+  - 동시에 캐시가 만료되어도 집계는 한 번만 실행
+
+설정 (환경변수):
+    ASSISTANT_CACHE_TTL_SECONDS=60
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class AssistantCatalog:
+    def __init__(self, opensearch_client, ttl_seconds: float = 60.0):
+        self.opensearch_client = opensearch_client
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Optional[str], Dict[str, Any]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, opensearch_client) -> "AssistantCatalog":
+        return cls(opensearch_client, ttl_seconds=float(os.getenv("ASSISTANT_CACHE_TTL_SECONDS", "60")))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self, organization: Optional[str] = None) -> Dict[str, Any]:
+        """{"assistants": [{assistant_id, chunks, documents, last_upload}, ...], "cached_at": epoch초}"""
+        entry = self._fresh_entry(organization)
+        if entry is not None:
+            return entry
+
+        with self._refresh_lock:
+            # 기다리는 동안 다른 스레드가 갱신했으면 그 결과 사용
+            entry = self._fresh_entry(organization)
+            if entry is not None:
+                return entry
+            with self._lock:
+                generation = self._generation
+            entry = {
+                "assistants": self.opensearch_client.get_assistant_stats(organization),
+                "cached_at": time.time(),
+            }
+            with self._lock:
+                # 집계 도중 invalidate()가 호출됐으면 이번 결과는 캐시하지 않음
+                if generation == self._generation:
+                    self._entries[organization] = entry
+            return entry
+
+    def page(self, organization: Optional[str] = None, limit: Optional[int] = None,
+             cursor: Optional[str] = None) -> Dict[str, Any]:
+        """assistant_id 오름차순으로 cursor 다음부터 limit개 (cursor는 직전 페이지의 next_cursor)"""
+        entry = self.stats(organization)
+        assistants = entry["assistants"]
+        if cursor:
+            assistants = [item for item in assistants if item["assistant_id"] > cursor]
+        next_cursor = None
+        if limit is not None and len(assistants) > limit:
+            assistants = assistants[:limit]
+            next_cursor = assistants[-1]["assistant_id"]
+        return {"assistants": assistants, "next_cursor": next_cursor, "cached_at": entry["cached_at"]}
+
+    def _fresh_entry(self, organization: Optional[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(organization)
+        if entry is not None and time.time() - entry["cached_at"] < self.ttl_seconds:
+            return entry
+        return None
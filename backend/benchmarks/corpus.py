@@ -0,0 +1,108 @@
+"""합성 한국어 규정 PDF 코퍼스 생성기
+
+    python -m benchmarks.corpus --output /tmp/bench-corpus --docs 20 --pages 10
+"""
+import argparse
+import json
+import os
+import random
+from typing import Dict, List
+
+TOPICS = [
+    ("휴학", "휴학 신청은 학기 개시일 전까지 소속 학과장의 승인을 받아 총장에게 제출하여야 한다"),
+    ("복학", "휴학 기간이 만료된 자는 복학 신청서를 제출하여 다음 학기에 복학하여야 한다"),
+    ("등록", "등록금은 소정의 기간 내에 납부하여야 하며 분할 납부를 신청할 수 있다"),
+    ("수강신청", "학생은 매 학기 수강신청 기간에 교과목을 신청하여야 하며 최대 21학점까지 신청할 수 있다"),
+    ("졸업", "졸업에 필요한 최저 이수학점은 130학점으로 하며 졸업논문 또는 졸업시험에 합격하여야 한다"),
+    ("장학금", "장학금은 성적 우수자 및 경제적 곤란자에게 지급하며 세부 사항은 장학 규정으로 정한다"),
+    ("성적", "성적은 A+부터 F까지의 등급으로 평가하며 평점 평균은 4.5 만점으로 산출한다"),
+    ("전과", "전과는 2학년 진급 전에 신청할 수 있으며 해당 학과의 정원 범위 내에서 허가한다"),
+    ("재학기간", "재학기간은 휴학 기간을 제외하고 8년을 초과할 수 없으며 연장 신청서를 제출하여 연장할 수 있다"),
+    ("학사경고", "평점 평균이 1.75 미만인 자에게는 학사경고를 하며 연속 3회 경고 시 제적한다"),
+]
+ORGANIZATIONS = ["전북대학교", "전북대학교 대학원", "공과대학", "인문대학"]
+DOCUMENT_TYPES = ["규정", "지침", "세칙"]
+LINE_CHARS = 38
+LINES_PER_PAGE = 36
+
+
+def _article_lines(rng: random.Random, article_no: int) -> List[str]:
+    topic, sentence = rng.choice(TOPICS)
+    text = f"제{article_no}조({topic}) ① {sentence}. ② 제1항에도 불구하고 {topic}에 관하여 " \
+           f"필요한 사항은 {rng.choice(ORGANIZATIONS)} {rng.choice(DOCUMENT_TYPES)}으로 따로 정한다. " \
+           f"③ {rng.choice(TOPICS)[1]}."
+    return [text[i:i + LINE_CHARS] for i in range(0, len(text), LINE_CHARS)]
+
+
+def generate_pdf(path: str, title: str, pages: int, seed: int) -> None:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfgen import canvas
+
+    font = "HYSMyeongJo-Medium"
+    if font not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont(font))
+
+    rng = random.Random(seed)
+    pdf = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    article_no = 1
+    for page in range(1, pages + 1):
+        pdf.setFont(font, 9)
+        # 머리말/꼬리말 (모든 페이지에 반복)
+        pdf.drawString(50, height - 40, f"전북대학교 {title}")
+        pdf.drawString(width / 2 - 15, 30, f"- {page} -")
+
+        pdf.setFont(font, 10)
+        y = height - 70
+        lines_written = 0
+        while lines_written < LINES_PER_PAGE:
+            for line in _article_lines(rng, article_no):
+                pdf.drawString(50, y, line)
+                y -= 17
+                lines_written += 1
+            article_no += 1
+        pdf.showPage()
+    pdf.save()
+
+
+def generate_corpus(output_dir: str, docs: int, pages: int, assistants: int = 3, seed: int = 42) -> List[Dict]:
+    """PDF 파일과 manifest.json을 생성하고 manifest 항목 목록을 반환"""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = []
+    for i in range(docs):
+        topic = TOPICS[i % len(TOPICS)][0]
+        title = f"{topic} 규정 제{i + 1}호"
+        filename = f"regulation_{i + 1:04d}.pdf"
+        generate_pdf(os.path.join(output_dir, filename), title, pages, seed + i)
+        manifest.append({
+            "file": filename,
+            "document_title": title,
+            "tags": [topic, "학사"],
+            "organization": rng.choice(ORGANIZATIONS),
+            "document_type": rng.choice(DOCUMENT_TYPES),
+            "assistant_id": f"assistant_{i % assistants + 1}",
+            "pages": pages,
+        })
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 한국어 규정 PDF 코퍼스 생성")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--assistants", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    manifest = generate_corpus(args.output, args.docs, args.pages, args.assistants, args.seed)
+    print(f"Generated {len(manifest)} PDFs in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
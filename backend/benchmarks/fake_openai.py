@@ -0,0 +1,86 @@
+"""벤치마크용 가짜 OpenAI Chat Completions 서버
+
+지연 시간 = latency + completion_tokens / tokens_per_sec 로 응답을 흉내 냅니다.
+
+    server = FakeOpenAIServer(latency=0.5, tokens_per_sec=40).start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER_TEXT = "휴학은 학기 개시 전까지 신청해야 하며, 학칙 제12조에 따라 최대 3년까지 가능합니다. [학칙 - 페이지 1]"
+
+
+class FakeOpenAIServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.5,
+                 tokens_per_sec: float = 40.0, completion_tokens: int = 200, status_code: int = 200):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.completion_tokens = completion_tokens
+        self.status_code = status_code
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with fake._count_lock:
+                    fake.request_count += 1
+
+                prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages", []))
+                completion_tokens = min(fake.completion_tokens, request.get("max_tokens") or fake.completion_tokens)
+                time.sleep(fake.latency + completion_tokens / fake.tokens_per_sec)
+
+                if fake.status_code != 200:
+                    body = {"error": {"message": "fake error", "type": "server_error"}}
+                else:
+                    body = {
+                        "id": "chatcmpl-bench",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request.get("model", "gpt-4"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": ANSWER_TEXT},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": {
+                            "prompt_tokens": prompt_chars // 2,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": prompt_chars // 2 + completion_tokens,
+                        },
+                    }
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(fake.status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,253 @@
+"""벤치마크용 인메모리 OpenSearch 대체 구현
+
+opensearch-py의 `OpenSearch` 클라이언트 중 이 프로젝트가 사용하는 API만 흉내 냅니다.
+kNN 검색은 NumPy 브루트포스 코사인 유사도로 계산합니다.
+
+    import opensearch_client
+    opensearch_client.OpenSearch = FakeOpenSearch
+"""
+import fnmatch
+import json
+import threading
+import uuid
+import zlib
+from typing import Any, Dict, List, Union
+
+import numpy as np
+
+_lock = threading.Lock()
+_indices: Dict[str, Dict[str, Any]] = {}
+
+
+def reset():
+    with _lock:
+        _indices.clear()
+
+
+def _matches(source: Dict[str, Any], clause: Dict[str, Any], doc_id: str = None) -> bool:
+    if "ids" in clause:
+        return doc_id in clause["ids"]["values"]
+    if "term" in clause:
+        field, value = next(iter(clause["term"].items()))
+        if isinstance(value, dict):
+            value = value.get("value")
+        actual = source.get(field)
+        return value in actual if isinstance(actual, list) else actual == value
+    if "terms" in clause:
+        field, values = next(iter(clause["terms"].items()))
+        actual = source.get(field)
+        if isinstance(actual, list):
+            return any(v in actual for v in values)
+        return actual in values
+    if "match_all" in clause:
+        return True
+    if "bool" in clause:
+        return all(_matches(source, c, doc_id) for c in _as_list(clause["bool"].get("filter", [])))
+    raise NotImplementedError(f"Unsupported query clause: {list(clause)}")
+
+
+def _as_list(value) -> List:
+    return value if isinstance(value, list) else [value]
+
+
+def _resolve(index: str) -> List[str]:
+    """쉼표 목록, 와일드카드, 별칭을 실제 인덱스 이름들로 변환"""
+    names = []
+    for part in (index or "*").split(","):
+        if "*" in part:
+            names.extend(name for name in sorted(_indices) if fnmatch.fnmatchcase(name, part))
+        elif part in _indices:
+            names.append(part)
+        else:
+            names.extend(name for name in sorted(_indices) if part in _indices[name]["body"].get("aliases", {}))
+    return list(dict.fromkeys(names))
+
+
+def _shard(index: str, routing: str) -> int:
+    shards = int(_indices[index]["body"].get("settings", {}).get("index", {}).get("number_of_shards", 1))
+    return zlib.crc32(routing.encode("utf-8")) % shards
+
+
+class _Indices:
+    def exists(self, index: str, **kwargs) -> bool:
+        return bool(_resolve(index))
+
+    def create(self, index: str, body: Dict[str, Any] = None, **kwargs):
+        with _lock:
+            _indices.setdefault(index, {"body": body or {}, "docs": {}, "routing": {}})
+        return {"acknowledged": True, "index": index}
+
+    def get(self, index: str, **kwargs):
+        return {name: _indices[name]["body"] for name in _resolve(index)}
+
+    def delete(self, index: str, **kwargs):
+        with _lock:
+            for name in _resolve(index):
+                _indices.pop(name, None)
+        return {"acknowledged": True}
+
+    def refresh(self, index: str = None, **kwargs):
+        return {}
+
+    def put_settings(self, body: Dict[str, Any], index: str = None, **kwargs):
+        with _lock:
+            for name in _resolve(index):
+                _indices[name]["body"].setdefault("settings", {}).setdefault("index", {}).update(body.get("index", {}))
+        return {"acknowledged": True}
+
+
+class FakeOpenSearch:
+    def __init__(self, *args, **kwargs):
+        self.indices = _Indices()
+
+    def index(self, index: str, body: Dict[str, Any], id: str = None, routing: str = None, **kwargs):
+        doc_id = id or uuid.uuid4().hex
+        with _lock:
+            store = _indices.setdefault(index, {"body": {}, "docs": {}, "routing": {}})
+            store["docs"][doc_id] = body
+            store["routing"][doc_id] = routing or doc_id
+        return {"_id": doc_id, "result": "created"}
+
+    def bulk(self, body: Union[str, List[Dict[str, Any]]], index: str = None, **kwargs):
+        if isinstance(body, str):
+            body = [json.loads(line) for line in body.splitlines() if line.strip()]
+        items = []
+        for action, source in zip(body[0::2], body[1::2]):
+            meta = action["index"]
+            response = self.index(meta.get("_index", index), source, id=meta.get("_id"), routing=meta.get("routing"))
+            items.append({"index": {"_id": response["_id"], "_index": meta.get("_index", index), "status": 201}})
+        return {"took": 0, "errors": False, "items": items}
+
+    def get(self, index: str, id: str, **kwargs):
+        doc = _indices.get(index, {}).get("docs", {}).get(id)
+        if doc is None:
+            from opensearchpy.exceptions import NotFoundError
+            raise NotFoundError(404, "not_found", {"_id": id})
+        return {"_id": id, "_index": index, "found": True, "_source": doc}
+
+    def search(self, index: str, body: Dict[str, Any], routing: str = None, **kwargs):
+        with _lock:
+            docs = []
+            for name in _resolve(index):
+                store = _indices[name]
+                # routing을 주면 해당 샤드의 문서만 조회
+                shard = _shard(name, routing) if routing else None
+                docs.extend(
+                    (name, doc_id, src) for doc_id, src in store["docs"].items()
+                    if shard is None or _shard(name, store["routing"][doc_id]) == shard
+                )
+
+        query = body.get("query", {"match_all": {}})
+        knn = None
+        filters: List[Dict[str, Any]] = []
+        if "bool" in query:
+            for clause in _as_list(query["bool"].get("must", [])):
+                if "knn" in clause:
+                    knn = next(iter(clause["knn"].values()))
+                else:
+                    filters.append(clause)
+            filters.extend(_as_list(query["bool"].get("filter", [])))
+        elif "knn" in query:
+            knn = next(iter(query["knn"].values()))
+        else:
+            filters.append(query)
+
+        candidates = [(name, doc_id, src) for name, doc_id, src in docs
+                      if all(_matches(src, f, doc_id) for f in filters)]
+
+        if knn is not None and candidates:
+            matrix = np.asarray([src["embedding"] for _, _, src in candidates], dtype=np.float32)
+            vector = np.asarray(knn["vector"], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(vector) or 1.0)
+            scores = (matrix @ vector) / np.where(norms == 0, 1.0, norms)
+            # OpenSearch cosinesimil 점수 변환: (1 + cos) / 2
+            scores = (1.0 + scores) / 2.0
+            order = np.argsort(-scores)[: knn.get("k", 10)]
+            hits = [(*candidates[i], float(scores[i])) for i in order]
+        else:
+            hits = [(name, doc_id, src, 1.0) for name, doc_id, src in candidates]
+
+        hits = hits[: body.get("size", 10)]
+        source_fields = body.get("_source")
+
+        def _project(src):
+            if isinstance(source_fields, list):
+                return {k: src[k] for k in source_fields if k in src}
+            if isinstance(source_fields, dict):
+                return {k: v for k, v in src.items() if k not in source_fields.get("excludes", [])}
+            return src
+
+        response = {
+            "hits": {
+                "total": {"value": len(candidates), "relation": "eq"},
+                "hits": [{"_id": doc_id, "_index": name, "_score": score, "_source": _project(src)}
+                         for name, doc_id, src, score in hits],
+            }
+        }
+
+        if "aggs" in body:
+            response["aggregations"] = {
+                name: self._aggregate(agg, [src for _, _, src in candidates])
+                for name, agg in body["aggs"].items()
+            }
+        return response
+
+    def msearch(self, body: List[Dict[str, Any]], index: str = None, **kwargs):
+        responses = []
+        for header, search_body in zip(body[0::2], body[1::2]):
+            try:
+                responses.append(self.search(
+                    index=header.get("index", index), body=search_body, routing=header.get("routing")
+                ))
+            except Exception as e:
+                responses.append({"error": {"type": type(e).__name__, "reason": str(e)}, "status": 500})
+        return {"took": 0, "responses": responses}
+
+    def _aggregate(self, agg: Dict[str, Any], sources: List[Dict[str, Any]]):
+        if "terms" in agg:
+            field = agg["terms"]["field"]
+            counts: Dict[Any, int] = {}
+            for src in sources:
+                for value in _as_list(src.get(field, [])):
+                    counts[value] = counts.get(value, 0) + 1
+            buckets = sorted(counts.items(), key=lambda kv: -kv[1])[: agg["terms"].get("size", 10)]
+            return {"buckets": [{"key": k, "doc_count": c} for k, c in buckets]}
+        if "composite" in agg:
+            return self._composite(agg, sources)
+        if "cardinality" in agg:
+            field = agg["cardinality"]["field"]
+            return {"value": len({v for src in sources for v in _as_list(src.get(field, []))})}
+        if "max" in agg:
+            values = [src[agg["max"]["field"]] for src in sources if src.get(agg["max"]["field"]) is not None]
+            if not values:
+                return {"value": None}
+            return {"value": max(values), "value_as_string": str(max(values))}
+        raise NotImplementedError(f"Unsupported aggregation: {list(agg)}")
+
+    def _composite(self, agg: Dict[str, Any], sources: List[Dict[str, Any]]):
+        # terms 소스만 지원 (키 튜플 오름차순 페이지 조회)
+        fields = [(name, source["terms"]["field"]) for item in agg["composite"]["sources"]
+                  for name, source in item.items()]
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for src in sources:
+            keys = [()]
+            for _, field in fields:
+                keys = [key + (value,) for key in keys for value in _as_list(src.get(field, []))]
+            for key in keys:
+                groups.setdefault(key, []).append(src)
+        keys = sorted(groups)
+        after = agg["composite"].get("after")
+        if after is not None:
+            after_key = tuple(after[name] for name, _ in fields)
+            keys = [k for k in keys if k > after_key]
+        keys = keys[: agg["composite"].get("size", 10)]
+        buckets = []
+        for key in keys:
+            bucket = {"key": {name: value for (name, _), value in zip(fields, key)}, "doc_count": len(groups[key])}
+            for sub_name, sub_agg in agg.get("aggs", {}).items():
+                bucket[sub_name] = self._aggregate(sub_agg, groups[key])
+            buckets.append(bucket)
+        response = {"buckets": buckets}
+        if buckets:
+            response["after_key"] = buckets[-1]["key"]
+        return response
@@ -0,0 +1,222 @@
+"""HNSW/kNN 파라미터 튜닝: recall@k vs p95 지연 시간
+
+벡터 집합(합성 또는 운영 인덱스에서 추출)을 파라미터 조합별 전용 인덱스에 적재하고,
+NumPy 브루트포스로 계산한 정확한 top-k와 비교해 recall@k와 지연 시간을 측정합니다.
+  - 인덱스 구성: m × ef_construction 조합마다 인덱스 하나
+  - 검색: ef_search × oversample(필터 검색 k 배수) 조합을 같은 인덱스에서 측정
+  - 질의의 filtered-ratio 비율은 assistant_id 필터 검색
+
+결과에서 * 표시는 파레토 최적(더 빠르면서 재현율도 높은 다른 조합이 없는) 설정입니다.
+선택한 값은 OPENSEARCH_HNSW_M / OPENSEARCH_HNSW_EF_CONSTRUCTION / OPENSEARCH_HNSW_EF_SEARCH /
+OPENSEARCH_KNN_OVERSAMPLE 환경변수로 적용합니다.
+
+사용법 (backend 폴더에서):
+    python -m benchmarks.knn_tuning --synthetic 50000 --m 8,16,32 --ef-construction 64,128,256
+    python -m benchmarks.knn_tuning --from-index 20000 --ef-search 50,100,200 --oversample 1,2,4
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.placement_benchmark import DIMENSION, generate_chunks, load_corpus
+from benchmarks.run_benchmark import RESULTS_DIR, _git_commit, _percentile
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(v) for v in value.split(",") if v]
+
+
+def corpus_from_index(limit: int) -> Dict:
+    """운영 인덱스에서 임베딩과 assistant_id를 최대 limit개 추출"""
+    from opensearchpy.helpers import scan
+    from opensearch_client import OpenSearchClient
+
+    source = OpenSearchClient()
+    vectors, owners_by_name, chunks = [], [], []
+    hits = scan(
+        source.client,
+        index=source.search_index,
+        query={"query": {"match_all": {}}, "_source": ["embedding", "assistant_id", "organization"]},
+        size=500,
+    )
+    for i, hit in enumerate(hits):
+        if i >= limit:
+            break
+        src = hit["_source"]
+        vectors.append(src["embedding"])
+        owners_by_name.append(src.get("assistant_id") or "unknown")
+        chunks.append({
+            "document_id": f"doc-{i}",
+            "document_title": "",
+            "content": "",
+            "page_number": 1,
+            "chunk_index": i,
+            "tags": [],
+            "organization": src.get("organization") or "unknown",
+            "document_type": "",
+            "assistant_id": owners_by_name[-1],
+            "upload_date": "2024-01-01T00:00:00",
+        })
+    if not vectors:
+        raise SystemExit("인덱스에 임베딩이 없습니다.")
+
+    assistant_ids = sorted(set(owners_by_name))
+    positions = {aid: i for i, aid in enumerate(assistant_ids)}
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return {
+        "assistant_ids": assistant_ids,
+        "owners": np.asarray([positions[name] for name in owners_by_name]),
+        "vectors": vectors,
+        "chunks": chunks,
+    }
+
+
+def sample_queries(corpus: Dict, count: int, filtered_ratio: float, k: int, seed: int) -> List[Dict]:
+    """질의 벡터(코퍼스 벡터 + 노이즈)와 정확한 top-k 정답"""
+    rng = np.random.default_rng(seed)
+    vectors, owners = corpus["vectors"], corpus["owners"]
+    queries = []
+    for position in rng.choice(len(vectors), size=min(count, len(vectors)), replace=False):
+        query = vectors[position] + rng.normal(scale=0.05, size=DIMENSION).astype(np.float32)
+        query /= np.linalg.norm(query)
+        filtered = rng.random() < filtered_ratio
+        candidates = np.flatnonzero(owners == owners[position]) if filtered else np.arange(len(vectors))
+        exact = candidates[np.argsort(-(vectors[candidates] @ query))[:k]]
+        queries.append({
+            "vector": query.tolist(),
+            "assistant_id": corpus["assistant_ids"][owners[position]] if filtered else None,
+            "expected": {f"chunk-{i}" for i in exact},
+        })
+    return queries
+
+
+def measure(client, queries: List[Dict], k: int) -> Dict:
+    # 캐시/JIT 영향을 줄이기 위한 워밍업
+    for query in queries[:10]:
+        client.search_similar_chunks(query["vector"], assistant_id=query["assistant_id"], size=k)
+
+    latencies, recalls = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = client.search_similar_chunks(query["vector"], assistant_id=query["assistant_id"], size=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(query["expected"] & {hit["_id"] for hit in hits}) / len(query["expected"]))
+    return {
+        "recall_at_k": float(np.mean(recalls)),
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+    }
+
+
+def mark_pareto(rows: List[Dict]) -> None:
+    for row in rows:
+        row["pareto"] = not any(
+            other["recall_at_k"] >= row["recall_at_k"] and other["p95_ms"] <= row["p95_ms"]
+            and (other["recall_at_k"] > row["recall_at_k"] or other["p95_ms"] < row["p95_ms"])
+            for other in rows
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HNSW/kNN 파라미터 튜닝 (recall@k vs p95)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--synthetic", type=int, default=20000, help="합성 벡터 수")
+    source.add_argument("--from-index", type=int, help="운영 인덱스에서 추출할 벡터 수")
+    parser.add_argument("--engine", default="lucene")
+    parser.add_argument("--space-type", default="cosinesimil")
+    parser.add_argument("--m", default="8,16,32")
+    parser.add_argument("--ef-construction", default="64,128,256")
+    parser.add_argument("--ef-search", default="50,100,200")
+    parser.add_argument("--oversample", default="1,2,4")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--filtered-ratio", type=float, default=0.5, help="assistant_id 필터 검색 비율")
+    parser.add_argument("--force-merge", action="store_true", help="적재 후 세그먼트를 1개로 병합 (운영 상태에 가깝게)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--index-prefix", default="knn_tune")
+    parser.add_argument("--keep", action="store_true", help="측정 후 인덱스를 삭제하지 않음")
+    parser.add_argument("--fake", action="store_true", help="인메모리 OpenSearch 사용 (정확 검색이므로 동작 확인용)")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본: benchmarks/results/knn-tuning-<시각>-<커밋>.json)")
+    args = parser.parse_args()
+
+    import opensearch_client
+    if args.fake:
+        from benchmarks.fake_opensearch import FakeOpenSearch
+        opensearch_client.OpenSearch = FakeOpenSearch
+    # 측정용 인덱스는 단일 인덱스 배치로 생성
+    os.environ["OPENSEARCH_PLACEMENT"] = "shared"
+
+    if args.from_index:
+        corpus = corpus_from_index(args.from_index)
+    else:
+        corpus = generate_chunks(args.synthetic, organizations=4, assistants_per_org=5, seed=args.seed)
+    queries = sample_queries(corpus, args.queries, args.filtered_ratio, args.k, args.seed)
+    print(f"벡터 {len(corpus['vectors'])}개, 질의 {len(queries)}개 (필터 비율 {args.filtered_ratio})")
+
+    rows: List[Dict] = []
+    for m, ef_construction in itertools.product(_int_list(args.m), _int_list(args.ef_construction)):
+        profile = opensearch_client.KNNProfile(
+            engine=args.engine, space_type=args.space_type, m=m, ef_construction=ef_construction
+        )
+        index_name = f"{args.index_prefix}_m{m}_efc{ef_construction}"
+        opensearch_client.OpenSearchClient(index_name=index_name, profile=profile).delete_indices()
+        client = opensearch_client.OpenSearchClient(index_name=index_name, profile=profile)
+
+        build_seconds = load_corpus(client, corpus)
+        if args.force_merge:
+            client.client.indices.forcemerge(index=index_name, max_num_segments=1, request_timeout=3600)
+        print(f"m={m} ef_construction={ef_construction}: 적재 {build_seconds:.1f}s")
+
+        for ef_search, oversample in itertools.product(_int_list(args.ef_search), _float_list(args.oversample)):
+            client.set_ef_search(ef_search)
+            client.profile.oversample = oversample
+            result = measure(client, queries, args.k)
+            rows.append({
+                "m": m,
+                "ef_construction": ef_construction,
+                "ef_search": ef_search,
+                "oversample": oversample,
+                "build_seconds": build_seconds,
+                **result,
+            })
+            print(f"  ef_search={ef_search:<4} oversample={oversample:<4} "
+                  f"recall@{args.k}={result['recall_at_k']:.3f} p95={result['p95_ms']:.1f}ms")
+
+        if not args.keep:
+            client.delete_indices()
+
+    mark_pareto(rows)
+    print(f"\n{'m':>4} {'ef_c':>5} {'ef_s':>5} {'over':>5} {'recall':>7} {'p50':>8} {'p95':>8}")
+    for row in sorted(rows, key=lambda r: (-r["recall_at_k"], r["p95_ms"])):
+        print(f"{row['m']:>4} {row['ef_construction']:>5} {row['ef_search']:>5} {row['oversample']:>5} "
+              f"{row['recall_at_k']:>7.3f} {row['p50_ms']:>6.1f}ms {row['p95_ms']:>6.1f}ms"
+              f"{' *' if row['pareto'] else ''}")
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": rows,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"knn-tuning-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""문서 배치 전략(OPENSEARCH_PLACEMENT)별 검색 지연 시간/재현율 vs 코퍼스 크기
+
+합성 벡터(어시스턴트마다 중심이 다른 군집)를 배치 전략별 전용 인덱스에 적재한 뒤
+어시스턴트 필터 kNN 검색의 p50/p95 지연 시간과 recall@k(정확한 브루트포스 결과 대비)를 측정합니다.
+기본값은 OPENSEARCH_HOST/PORT의 실제 클러스터이며, 측정용 인덱스(<prefix>_<전략>)만 만들고 지웁니다.
+
+사용법 (backend 폴더에서):
+    python -m benchmarks.placement_benchmark --sizes 10000,50000,200000 --shards 4
+    python -m benchmarks.placement_benchmark --fake --sizes 2000,10000   # 인메모리 OpenSearch로 동작 확인
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.run_benchmark import RESULTS_DIR, _git_commit, _percentile
+
+DIMENSION = 384
+
+
+def generate_chunks(size: int, organizations: int, assistants_per_org: int, seed: int) -> Dict:
+    """어시스턴트별 군집 벡터와 메타데이터"""
+    rng = np.random.default_rng(seed)
+    assistant_ids = [f"org{o}-assistant{a}" for o in range(organizations) for a in range(assistants_per_org)]
+    centers = rng.normal(size=(len(assistant_ids), DIMENSION)).astype(np.float32)
+    owners = rng.integers(0, len(assistant_ids), size=size)
+    vectors = centers[owners] + rng.normal(scale=1.5, size=(size, DIMENSION)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    chunks = []
+    for i, owner in enumerate(owners):
+        assistant_id = assistant_ids[owner]
+        chunks.append({
+            "document_id": f"doc-{i // 20}",
+            "document_title": f"문서 {i // 20}",
+            "content": f"합성 청크 {i}",
+            "page_number": 1,
+            "chunk_index": i,
+            "tags": [],
+            "organization": assistant_id.split("-")[0],
+            "document_type": "규정",
+            "assistant_id": assistant_id,
+            "upload_date": "2024-01-01T00:00:00",
+        })
+    return {"assistant_ids": assistant_ids, "centers": centers, "owners": owners, "vectors": vectors, "chunks": chunks}
+
+
+def load_corpus(client, corpus: Dict, batch_size: int = 1000) -> float:
+    start = time.perf_counter()
+    chunks, vectors = corpus["chunks"], corpus["vectors"]
+    for offset in range(0, len(chunks), batch_size):
+        batch = []
+        for chunk, vector in zip(chunks[offset:offset + batch_size], vectors[offset:offset + batch_size]):
+            batch.append({**chunk, "embedding": vector.tolist()})
+        client.bulk_index_chunks(batch, ids=[f"chunk-{chunk['chunk_index']}" for chunk in batch])
+    client.refresh()
+    return time.perf_counter() - start
+
+
+def run_queries(client, corpus: Dict, queries: int, k: int, seed: int) -> Dict:
+    rng = np.random.default_rng(seed + 1)
+    latencies, recalls = [], []
+    for _ in range(queries):
+        owner = int(rng.integers(0, len(corpus["assistant_ids"])))
+        assistant_id = corpus["assistant_ids"][owner]
+        query = corpus["centers"][owner] + rng.normal(scale=1.5, size=DIMENSION).astype(np.float32)
+        query /= np.linalg.norm(query)
+
+        start = time.perf_counter()
+        hits = client.search_similar_chunks(query.tolist(), assistant_id=assistant_id, size=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        # 정답: 해당 어시스턴트 청크 중 코사인 상위 k개
+        members = np.flatnonzero(corpus["owners"] == owner)
+        exact = members[np.argsort(-(corpus["vectors"][members] @ query))[:k]]
+        expected = {f"chunk-{i}" for i in exact}
+        if expected:
+            recalls.append(len(expected & {hit["_id"] for hit in hits}) / len(expected))
+
+    return {
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "mean_ms": float(np.mean(latencies)),
+        "recall_at_k": float(np.mean(recalls)) if recalls else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenSearch 문서 배치 전략 벤치마크")
+    parser.add_argument("--sizes", default="10000,50000", help="코퍼스 크기(청크 수) 목록")
+    parser.add_argument("--placements", default="shared,routing,org_index")
+    parser.add_argument("--organizations", type=int, default=4)
+    parser.add_argument("--assistants-per-org", type=int, default=5)
+    parser.add_argument("--shards", type=int, default=4, help="shared/routing 인덱스의 샤드 수")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--index-prefix", default="placement_bench")
+    parser.add_argument("--keep", action="store_true", help="측정 후 인덱스를 삭제하지 않음")
+    parser.add_argument("--fake", action="store_true", help="인메모리 OpenSearch 사용")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본: benchmarks/results/placement-<시각>-<커밋>.json)")
+    args = parser.parse_args()
+
+    import opensearch_client
+    if args.fake:
+        from benchmarks.fake_opensearch import FakeOpenSearch
+        opensearch_client.OpenSearch = FakeOpenSearch
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    placements = args.placements.split(",")
+    os.environ["OPENSEARCH_NUMBER_OF_SHARDS"] = str(args.shards)
+
+    rows: List[Dict] = []
+    for size in sizes:
+        corpus = generate_chunks(size, args.organizations, args.assistants_per_org, args.seed)
+        for placement in placements:
+            os.environ["OPENSEARCH_PLACEMENT"] = placement
+            os.environ["OPENSEARCH_INDEX"] = f"{args.index_prefix}_{placement}"
+            client = opensearch_client.OpenSearchClient()
+            client.delete_indices()
+            client = opensearch_client.OpenSearchClient()
+
+            load_seconds = load_corpus(client, corpus)
+            result = run_queries(client, corpus, args.queries, args.k, args.seed)
+            row = {"size": size, "placement": placement, "load_seconds": load_seconds, **result}
+            rows.append(row)
+            print(f"size={size:>8} {placement:<10} p50={row['p50_ms']:7.1f}ms p95={row['p95_ms']:7.1f}ms "
+                  f"recall@{args.k}={row['recall_at_k']:.3f} (load {load_seconds:.1f}s)")
+            if not args.keep:
+                client.delete_indices()
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": rows,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"placement-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
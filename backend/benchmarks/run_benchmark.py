@@ -0,0 +1,302 @@
+"""엔드투엔드 벤치마크: 실제 main.py FastAPI 앱을 인메모리 OpenSearch와 가짜 OpenAI 서버로 구동
+
+측정 항목:
+  - 업로드(/upload-document) 처리량: pages/sec
+  - /query 지연 시간 p50/p95/p99: individual / integrated 모드, 동시성 설정 가능
+  - 최대 RSS
+
+사용법 (backend 폴더에서):
+    python -m benchmarks.run_benchmark --docs 20 --pages 10 --concurrency 8 --requests 100
+    python -m benchmarks.run_benchmark --compare benchmarks/results/<이전 결과>.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+QUESTIONS = [
+    "휴학 신청은 언제까지 해야 하나요?",
+    "복학 절차를 알려주세요",
+    "졸업에 필요한 최저 이수학점은?",
+    "재학기간 연장",
+    "장학금 지급 기준이 무엇인가요?",
+    "학사경고를 받으면 어떻게 되나요?",
+    "휴학 규정을 항목별로 비교해줘",
+    "수강신청 최대 학점",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _peak_rss_mb() -> float:
+    # Linux: KB, macOS: bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def _post_form(url: str, fields: Dict[str, str], timeout: float = 300) -> Dict:
+    data = urllib.parse.urlencode(fields).encode("utf-8")
+    with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def _post_multipart(url: str, fields: Dict[str, str], file_field: str, file_path: str, timeout: float = 600) -> Dict:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8"))
+    with open(file_path, "rb") as f:
+        file_bytes = f.read()
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+        f'filename="{os.path.basename(file_path)}"\r\nContent-Type: application/pdf\r\n\r\n'.encode("utf-8")
+        + file_bytes + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    request = urllib.request.Request(url, data=b"".join(parts))
+    request.add_header("Content-Type", f"multipart/form-data; boundary={boundary}")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def _start_app(port: int):
+    """OpenSearch를 인메모리 구현으로 교체한 뒤 main.app을 uvicorn으로 기동"""
+    import uvicorn
+
+    sys.path.insert(0, BACKEND_DIR)
+    import opensearch_client
+    from benchmarks.fake_opensearch import FakeOpenSearch
+    opensearch_client.OpenSearch = FakeOpenSearch
+
+    import main
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def _wait_ready(base_url: str, timeout: float = 600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/ready", timeout=5) as response:
+                if response.status == 200:
+                    return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("App did not become ready in time")
+
+
+def run_ingestion(base_url: str, corpus_dir: str, manifest: List[Dict]) -> Dict:
+    total_pages = 0
+    total_chunks = 0
+    start = time.perf_counter()
+    for entry in manifest:
+        result = _post_multipart(f"{base_url}/upload-document", {
+            "document_title": entry["document_title"],
+            "tags": json.dumps(entry["tags"], ensure_ascii=False),
+            "organization": entry["organization"],
+            "document_type": entry["document_type"],
+            "assistant_id": entry["assistant_id"],
+        }, "file", os.path.join(corpus_dir, entry["file"]))
+        total_pages += result["total_pages"]
+        total_chunks += result["total_chunks"]
+    elapsed = time.perf_counter() - start
+    return {
+        "documents": len(manifest),
+        "pages": total_pages,
+        "chunks": total_chunks,
+        "seconds": elapsed,
+        "pages_per_sec": total_pages / elapsed if elapsed else 0.0,
+    }
+
+
+def run_queries(base_url: str, mode: str, assistant_ids: List[str], concurrency: int, requests: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int):
+        nonlocal errors
+        fields = {
+            "question": QUESTIONS[i % len(QUESTIONS)],
+            "assistant_ids": json.dumps(assistant_ids),
+            "response_mode": mode,
+        }
+        start = time.perf_counter()
+        try:
+            _post_form(f"{base_url}/query", fields)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def compare(current: Dict, baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nComparison vs {baseline_path} ({baseline.get('commit')})")
+
+    def delta(label, new, old, higher_is_better):
+        if not old:
+            return
+        change = (new - old) / old * 100
+        better = change > 0 if higher_is_better else change < 0
+        print(f"  {label:<32} {old:>10.1f} -> {new:>10.1f}  ({change:+.1f}% {'better' if better else 'worse'})")
+
+    delta("ingestion pages/sec", current["ingestion"]["pages_per_sec"], baseline["ingestion"]["pages_per_sec"], True)
+    baseline_queries = {q["mode"]: q for q in baseline.get("queries", [])}
+    for q in current["queries"]:
+        old = baseline_queries.get(q["mode"])
+        if old:
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                delta(f"{q['mode']} {key}", q[key], old[key], False)
+    delta("peak RSS MB", current["peak_rss_mb"], baseline["peak_rss_mb"], False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG 백엔드 엔드투엔드 벤치마크")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--assistants", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--modes", default="individual,integrated")
+    parser.add_argument("--openai-latency", type=float, default=0.5, help="가짜 OpenAI 기본 지연(초)")
+    parser.add_argument("--openai-tps", type=float, default=40.0, help="가짜 OpenAI 토큰 생성 속도(tokens/sec)")
+    parser.add_argument("--openai-completion-tokens", type=int, default=200)
+    parser.add_argument("--no-llm-cache", action="store_true", help="LLM 응답 캐시 비활성화")
+    parser.add_argument("--corpus-dir", help="기존 코퍼스 폴더 (manifest.json 포함). 미지정시 임시 생성")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본: benchmarks/results/<시각>-<커밋>.json)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    from benchmarks.corpus import generate_corpus
+    from benchmarks.fake_openai import FakeOpenAIServer
+
+    openai_server = FakeOpenAIServer(latency=args.openai_latency, tokens_per_sec=args.openai_tps,
+                                     completion_tokens=args.openai_completion_tokens).start()
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["OPENAI_BASE_URL"] = openai_server.base_url
+    # 실행마다 빈 캐시에서 시작해야 커밋 간 비교가 가능
+    os.environ["LLM_CACHE_ENABLED"] = "false" if args.no_llm_cache else "true"
+    os.environ["LLM_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="rag-bench-cache-"), "llm.sqlite3")
+
+    if args.corpus_dir:
+        corpus_dir = args.corpus_dir
+        with open(os.path.join(corpus_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    else:
+        corpus_dir = tempfile.mkdtemp(prefix="rag-bench-")
+        print(f"Generating corpus in {corpus_dir} ...")
+        manifest = generate_corpus(corpus_dir, args.docs, args.pages, args.assistants)
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    startup_start = time.perf_counter()
+    server = _start_app(port)
+    _wait_ready(base_url)
+    startup_seconds = time.perf_counter() - startup_start
+
+    print("Running ingestion ...")
+    ingestion = run_ingestion(base_url, corpus_dir, manifest)
+    print(f"  {ingestion['pages_per_sec']:.2f} pages/sec ({ingestion['pages']} pages, {ingestion['chunks']} chunks)")
+
+    assistant_ids = sorted({entry["assistant_id"] for entry in manifest})
+    queries = []
+    for mode in args.modes.split(","):
+        print(f"Running /query ({mode}, concurrency={args.concurrency}) ...")
+        result = run_queries(base_url, mode, assistant_ids, args.concurrency, args.requests)
+        print(f"  p50={result['p50_ms']:.0f}ms p95={result['p95_ms']:.0f}ms p99={result['p99_ms']:.0f}ms "
+              f"errors={result['errors']}")
+        queries.append(result)
+
+    server.should_exit = True
+    openai_server.stop()
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "startup_seconds": startup_seconds,
+        "ingestion": ingestion,
+        "queries": queries,
+        "openai_requests": openai_server.request_count,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Peak RSS: {results['peak_rss_mb']:.0f} MB")
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
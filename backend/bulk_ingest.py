@@ -0,0 +1,313 @@
+"""PDF 폴더 대량 적재 도구
+
+manifest에 적힌 PDF들을 한 번에 OpenSearch에 적재합니다.
+  - 텍스트 추출/청킹: 프로세스 풀에서 병렬 실행 (워커는 임베딩 모델을 로드하지 않음)
+  - 임베딩: 메인 프로세스의 모델 하나가 여러 문서의 청크를 모아 큰 배치로 인코딩
+  - 색인: 별도 스레드가 _bulk 요청으로 색인 (인코딩과 겹쳐서 실행)
+  - 체크포인트: 색인이 끝난 문서를 JSONL 파일에 기록해 중단 후 다시 실행하면 이어서 처리
+
+manifest (JSON 배열 또는 JSON Lines, file은 --dir 기준 상대 경로):
+    [{"file": "학칙.pdf", "document_title": "학칙", "tags": ["학사"],
+      "organization": "전북대학교", "document_type": "규정", "assistant_id": "assistant_1"}, ...]
+
+사용법:
+    python bulk_ingest.py --dir ./pdfs --manifest ./pdfs/manifest.json --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import metrics
+from keyword_extractor import get_keyword_extractor
+from pdf_processor import PDFProcessor
+from vector_projection import get_vector_codec
+
+DEFAULT_CHECKPOINT = ".bulk_ingest_checkpoint.jsonl"
+
+_worker_processor: Optional[PDFProcessor] = None
+
+
+def _prepare_in_worker(path: str, entry: Dict[str, Any], document_id: str) -> Dict[str, Any]:
+    """워커 프로세스: PDF 추출과 청킹 (임베딩 제외)"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = PDFProcessor()
+    return _worker_processor.prepare_document(
+        path,
+        entry['document_title'],
+        entry['tags'],
+        entry['organization'],
+        entry['document_type'],
+        entry['assistant_id'],
+        document_id=document_id
+    )
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    with open(manifest_path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        raw_entries = json.loads(text)
+    else:
+        raw_entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    entries = []
+    for raw in raw_entries:
+        missing = [key for key in ("file", "organization", "document_type", "assistant_id") if not raw.get(key)]
+        if missing:
+            raise ValueError(f"manifest 항목에 {', '.join(missing)} 값이 없습니다: {raw}")
+        tags = raw.get("tags") or []
+        if isinstance(tags, str):
+            tags = [tag.strip() for tag in tags.split(",") if tag.strip()]
+        entries.append({
+            "file": raw["file"],
+            "document_title": raw.get("document_title") or os.path.splitext(os.path.basename(raw["file"]))[0],
+            "tags": tags,
+            "organization": raw["organization"],
+            "document_type": raw["document_type"],
+            "assistant_id": raw["assistant_id"],
+        })
+    return entries
+
+
+def load_checkpoint(checkpoint_path: str) -> Set[str]:
+    """색인이 끝난 문서의 file 목록"""
+    done = set()
+    if not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["file"])
+            except (ValueError, KeyError):
+                continue  # 중단 중에 잘린 마지막 줄
+    return done
+
+
+def stable_document_id(entry: Dict[str, Any]) -> str:
+    """같은 문서는 항상 같은 ID → 중간에 끊긴 문서를 다시 색인해도 청크가 중복되지 않음"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{entry['assistant_id']}/{entry['file']}"))
+
+
+class BulkIngester:
+    def __init__(
+        self,
+        pdf_dir: str,
+        entries: List[Dict[str, Any]],
+        opensearch_client,
+        embedding_model,
+        checkpoint_path: str = DEFAULT_CHECKPOINT,
+        workers: int = 4,
+        encode_batch_size: int = 256,
+        bulk_size: int = 500,
+    ):
+        self.pdf_dir = pdf_dir
+        self.entries = entries
+        self.opensearch_client = opensearch_client
+        self.embedding_model = embedding_model
+        self.checkpoint_path = checkpoint_path
+        self.workers = max(1, workers)
+        self.encode_batch_size = encode_batch_size
+        self.bulk_size = bulk_size
+        self.failed: List[Dict[str, str]] = []
+        self.indexed_documents = 0
+        self.indexed_chunks = 0
+        self.indexed_pages = 0
+        self.boilerplate_chars = 0
+        self.boilerplate_chunks = 0
+        self._checkpoint_lock = threading.Lock()
+
+    def run(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        done = load_checkpoint(self.checkpoint_path)
+        pending = [entry for entry in self.entries if entry["file"] not in done]
+        print(f"문서 {len(self.entries)}개 중 {len(self.entries) - len(pending)}개는 이미 적재됨, "
+              f"{len(pending)}개 처리 시작 (워커 {self.workers}개)")
+
+        index_queue: "queue.Queue" = queue.Queue(maxsize=4)
+        indexer = threading.Thread(target=self._index_loop, args=(index_queue,), name="bulk-indexer", daemon=True)
+        indexer.start()
+        try:
+            self._extract_and_encode(pending, index_queue)
+        finally:
+            index_queue.put(None)
+            indexer.join()
+
+        self.opensearch_client.refresh()
+        elapsed = time.perf_counter() - start
+        summary = {
+            "documents": self.indexed_documents,
+            "chunks": self.indexed_chunks,
+            "pages": self.indexed_pages,
+            "boilerplate_removed": {"chars": self.boilerplate_chars, "chunks": self.boilerplate_chunks},
+            "skipped": len(self.entries) - len(pending),
+            "failed": self.failed,
+            "seconds": round(elapsed, 2),
+            "pages_per_sec": round(self.indexed_pages / elapsed, 2) if elapsed else 0.0,
+        }
+        print(f"적재 완료: 문서 {summary['documents']}개, 청크 {summary['chunks']}개, "
+              f"{summary['pages_per_sec']} pages/sec, 실패 {len(self.failed)}개, "
+              f"반복 머리말/꼬리말 {self.boilerplate_chars}자(청크 {self.boilerplate_chunks}개) 제거")
+        return summary
+
+    def _extract_and_encode(self, pending: List[Dict[str, Any]], index_queue: "queue.Queue") -> None:
+        # 워커는 spawn으로 시작해 메인 프로세스의 torch 스레드/모델 상태를 물려받지 않음
+        context = multiprocessing.get_context("spawn")
+        buffer = []
+        buffered_chunks = 0
+        remaining = iter(pending)
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            in_flight = {}
+
+            def submit_next():
+                entry = next(remaining, None)
+                if entry is not None:
+                    path = os.path.join(self.pdf_dir, entry["file"])
+                    in_flight[pool.submit(_prepare_in_worker, path, entry, stable_document_id(entry))] = entry
+
+            # 인코딩이 밀려도 추출 결과가 메모리에 쌓이지 않도록 진행 중인 작업 수를 제한
+            for _ in range(self.workers * 2):
+                submit_next()
+
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    entry = in_flight.pop(future)
+                    submit_next()
+                    try:
+                        document = future.result()
+                    except Exception as e:
+                        self._record_failure(entry, "extract", e)
+                        continue
+                    buffer.append((entry, document))
+                    buffered_chunks += len(document["chunks"])
+
+                if buffered_chunks >= self.encode_batch_size:
+                    self._encode(buffer)
+                    for item in buffer:
+                        index_queue.put(item)
+                    buffer, buffered_chunks = [], 0
+
+        if buffer:
+            self._encode(buffer)
+            for item in buffer:
+                index_queue.put(item)
+
+    def _encode(self, batch) -> None:
+        """여러 문서의 청크(와 문서 제목)를 한 번에 인코딩"""
+        documents = [document for _, document in batch if len(document["chunks"])]
+        total = sum(len(document["chunks"]) for document in documents)
+        if not total:
+            return
+        texts = [content for document in documents for content in document["chunks"].contents]
+        texts += [document["summary"]["document_title"] for document in documents]
+        with metrics.span("ingest", "embed", detail=f"{total} chunks"):
+            embeddings = self.embedding_model.encode(texts, batch_size=64)
+        
+        codec = get_vector_codec()
+        encoded = codec.encode(embeddings[:total])
+        offset = 0
+        for position, document in enumerate(documents):
+            chunks = document["chunks"]
+            count = len(chunks)
+            chunks.embeddings = encoded[offset:offset + count]
+            summary = PDFProcessor.document_embedding(embeddings[total + position], embeddings[offset:offset + count])
+            document["summary"]["embedding"] = codec.encode(summary).tolist()
+            offset += count
+
+    def _index_loop(self, index_queue: "queue.Queue") -> None:
+        while True:
+            item = index_queue.get()
+            if item is None:
+                return
+            entry, document = item
+            try:
+                chunks = document["chunks"]
+                with metrics.span("ingest", "index"):
+                    for batch in chunks.split(self.bulk_size):
+                        self.opensearch_client.bulk_index_batch(batch)
+                    if len(chunks):
+                        self.opensearch_client.index_document_summary(document["summary"])
+            except Exception as e:
+                self._record_failure(entry, "index", e)
+                continue
+            self._record_keyword_stats(entry, document)
+            self.indexed_documents += 1
+            self.indexed_chunks += len(chunks)
+            self.indexed_pages += document["total_pages"]
+            self.boilerplate_chars += document["boilerplate"]["removed_chars"]
+            self.boilerplate_chunks += document["boilerplate"]["saved_chunks"]
+            self._write_checkpoint(entry, document)
+            print(f"[{self.indexed_documents}] {entry['file']}: 청크 {len(chunks)}개")
+
+    def _record_keyword_stats(self, entry: Dict[str, Any], document: Dict[str, Any]) -> None:
+        """키워드 추출용 코퍼스 통계 누적 (실패해도 문서 적재는 성공으로 처리, keyword_extractor.py rebuild로 다시 집계)"""
+        extractor = get_keyword_extractor()
+        if extractor is None or not len(document["chunks"]):
+            return
+        try:
+            with metrics.span("ingest", "keyword_stats"):
+                extractor.add_document(document["document_id"], [entry["document_title"], *document["chunks"].contents])
+        except Exception as e:
+            print(f"⚠️ {entry['file']} (keyword_stats): {e}")
+
+    def _write_checkpoint(self, entry: Dict[str, Any], document: Dict[str, Any]) -> None:
+        record = {
+            "file": entry["file"],
+            "document_id": document["document_id"],
+            "chunks": document["total_chunks"],
+            "pages": document["total_pages"],
+            "finished_at": datetime.now().isoformat(),
+        }
+        with self._checkpoint_lock:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _record_failure(self, entry: Dict[str, Any], stage: str, error: Exception) -> None:
+        # 실패한 문서는 체크포인트에 남기지 않으므로 다시 실행하면 재시도됨
+        print(f"❌ {entry['file']} ({stage}): {error}")
+        self.failed.append({"file": entry["file"], "stage": stage, "error": str(error)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF 폴더 대량 적재")
+    parser.add_argument("--dir", required=True, help="PDF 폴더")
+    parser.add_argument("--manifest", help="메타데이터 manifest (기본값: <dir>/manifest.json)")
+    parser.add_argument("--checkpoint", help=f"체크포인트 파일 (기본값: <dir>/{DEFAULT_CHECKPOINT})")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="추출/청킹 프로세스 수")
+    parser.add_argument("--encode-batch", type=int, default=256, help="한 번에 인코딩할 청크 수")
+    parser.add_argument("--bulk-size", type=int, default=500, help="_bulk 요청당 청크 수")
+    args = parser.parse_args()
+
+    from embedding_model import get_embedding_model
+    from opensearch_client import OpenSearchClient
+
+    entries = load_manifest(args.manifest or os.path.join(args.dir, "manifest.json"))
+    ingester = BulkIngester(
+        args.dir,
+        entries,
+        opensearch_client=OpenSearchClient(),
+        embedding_model=get_embedding_model(),
+        checkpoint_path=args.checkpoint or os.path.join(args.dir, DEFAULT_CHECKPOINT),
+        workers=args.workers,
+        encode_batch_size=args.encode_batch,
+        bulk_size=args.bulk_size,
+    )
+    summary = ingester.run()
+    if summary["failed"]:
+        raise SystemExit(f"{len(summary['failed'])}개 문서 적재 실패 (다시 실행하면 실패한 문서만 재시도)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""문서 하나의 청크를 배열로 보관하는 적재용 표현
+
+청크마다 dict를 만들고 384개 float 리스트와 문서 메타데이터를 복사하는 대신
+  - 문서 메타데이터(제목, 태그, 조직, 문서 유형, 어시스턴트, 업로드 시각)는 문서당 하나
+  - 청크 본문/페이지/오프셋은 병렬 배열
+  - 임베딩은 (청크 수 × 차원) NumPy 행렬 하나
+로 보관하고, _bulk 요청 본문(NDJSON)도 메타데이터 JSON 조각을 한 번만 직렬화해 문자열로 바로 만듭니다.
+"""
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+
+class ChunkBatch:
+    def __init__(
+        self,
+        metadata: Dict[str, Any],
+        contents: List[str],
+        page_numbers: np.ndarray,
+        start_chars: np.ndarray,
+        end_chars: np.ndarray,
+        embeddings: Optional[np.ndarray] = None,
+        first_chunk_index: int = 0
+    ):
+        self.metadata = metadata
+        self.contents = contents
+        self.page_numbers = page_numbers
+        self.start_chars = start_chars
+        self.end_chars = end_chars
+        self.embeddings = embeddings
+        self.first_chunk_index = first_chunk_index
+
+    @classmethod
+    def from_chunks(cls, metadata: Dict[str, Any], chunks: List[Dict[str, Any]]) -> "ChunkBatch":
+        """chunk_text 결과(청크 dict 목록)를 배열로 변환"""
+        return cls(
+            metadata,
+            [chunk['content'] for chunk in chunks],
+            np.fromiter((chunk['page_number'] for chunk in chunks), dtype=np.int32, count=len(chunks)),
+            np.fromiter((chunk['start_char'] for chunk in chunks), dtype=np.int32, count=len(chunks)),
+            np.fromiter((chunk['end_char'] for chunk in chunks), dtype=np.int32, count=len(chunks)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    @property
+    def document_id(self) -> str:
+        return self.metadata['document_id']
+
+    def ids(self) -> List[str]:
+        """청크 ID (같은 문서를 다시 적재하면 덮어쓰도록 document_id와 순번으로 고정)"""
+        return [f"{self.document_id}_{self.first_chunk_index + i}" for i in range(len(self))]
+
+    def split(self, size: int) -> Iterator["ChunkBatch"]:
+        """size개씩 나눈 뷰 (메타데이터와 배열을 복사하지 않음)"""
+        for start in range(0, len(self), size):
+            stop = start + size
+            yield ChunkBatch(
+                self.metadata,
+                self.contents[start:stop],
+                self.page_numbers[start:stop],
+                self.start_chars[start:stop],
+                self.end_chars[start:stop],
+                None if self.embeddings is None else self.embeddings[start:stop],
+                self.first_chunk_index + start
+            )
+
+    def chunk(self, i: int) -> Dict[str, Any]:
+        """청크 하나를 기존 dict 형태로 (디버깅/단건 색인용)"""
+        chunk = {
+            **self.metadata,
+            'content': self.contents[i],
+            'page_number': int(self.page_numbers[i]),
+            'chunk_index': self.first_chunk_index + i,
+            'start_char': int(self.start_chars[i]),
+            'end_char': int(self.end_chars[i])
+        }
+        if self.embeddings is not None:
+            chunk['embedding'] = self.embeddings[i].tolist()
+        return chunk
+
+    def bulk_body(self, action: Dict[str, Any]) -> str:
+        """_bulk NDJSON 본문. action은 청크 공통 index 액션(_index, routing)이며 _id는 청크별로 추가"""
+        if self.embeddings is None:
+            raise ValueError("ChunkBatch has no embeddings")
+        # 문서 메타데이터와 액션은 한 번만 직렬화하고 청크별 필드만 이어 붙임
+        metadata_json = json.dumps(self.metadata, ensure_ascii=False)[1:-1]
+        action_json = json.dumps(action, ensure_ascii=False)[1:-1]
+        row_format = ",".join(["%d" if self.embeddings.dtype.kind == "i" else "%.7g"] * self.embeddings.shape[1])
+
+        lines = []
+        for i, chunk_id in enumerate(self.ids()):
+            lines.append(f'{{"index":{{{action_json},"_id":{json.dumps(chunk_id)}}}}}')
+            lines.append(
+                f'{{{metadata_json},"content":{json.dumps(self.contents[i], ensure_ascii=False)},'
+                f'"page_number":{self.page_numbers[i]},"chunk_index":{self.first_chunk_index + i},'
+                f'"start_char":{self.start_chars[i]},"end_char":{self.end_chars[i]},'
+                f'"embedding":[{row_format % tuple(self.embeddings[i])}]}}'
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,110 @@
+"""단일 호출 비교 생성
+
+비교 질문("휴학 규정을 항목별로 비교해줘")에서 어시스턴트마다 답변을 만들고 그 답변들을 다시 보내
+비교표를 만드는(N+1회 호출) 대신, 어시스턴트별 근거 청크를 한 프롬프트에 담아 한 번의 호출로
+  - 어시스턴트별 답변
+  - 비교표 행(비교항목 × 어시스턴트)
+을 JSON으로 받고, 표 HTML은 서버에서 렌더링합니다. 표가 요약이 아닌 원문 근거에서 만들어집니다.
+
+응답 JSON:
+    {"answers": {"<assistant_id>": "답변"}, "rows": [{"item": "비교항목", "values": {"<assistant_id>": "내용"}}]}
+"""
+import html
+import json
+from typing import Any, Dict, List
+
+MISSING_VALUE = "명시되지 않음"
+
+SYSTEM_PROMPT = """
+당신은 규정과 지침 문서를 바탕으로 여러 기관의 규정을 비교하는 전문 어시스턴트입니다.
+
+지침:
+1. 어시스턴트별로 제공된 근거 문서 내용만을 바탕으로 답변하세요.
+2. answers에는 어시스턴트마다 질문에 대한 답변을 작성하고, 근거가 되는 문서명과 페이지를 명시하세요.
+3. rows에는 비교항목(예: 신청 절차, 승인 조건, 기간 제한 등)마다 각 어시스턴트의 내용을 40자 이내로 요약하세요.
+4. 유사한 내용이나 관련 규정이 있다면 적극적으로 포함하고, 내용이 없는 경우에만 "명시되지 않음"으로 표시하세요.
+5. 한국어로 작성하세요.
+6. 응답은 반드시 아래 형식의 JSON 객체로만 반환하세요 (코드 블록이나 설명 없이).
+{"answers": {"<어시스턴트 ID>": "답변"}, "rows": [{"item": "비교항목", "values": {"<어시스턴트 ID>": "내용"}}]}
+"""
+
+
+def build_messages(question: str, evidence: Dict[str, List[Dict[str, Any]]], content_limit: int) -> List[Dict[str, str]]:
+    """evidence: 어시스턴트 ID별 source 목록 (근거가 없는 어시스턴트는 빈 목록)"""
+    sections = []
+    for assistant_id, sources in evidence.items():
+        lines = [f"=== {assistant_id} 관련 문서 ==="]
+        for source in sources:
+            content = source['content'].strip()
+            if not content:
+                continue
+            truncated_content = content[:content_limit] + ("..." if len(content) > content_limit else "")
+            lines.append(f"[{source['document_title']} - 페이지 {source['page_number']}]\n{truncated_content}")
+        if len(lines) == 1:
+            lines.append("(관련 문서 없음)")
+        sections.append("\n".join(lines))
+
+    user_prompt = f"""
+질문: {question}
+
+비교 대상 어시스턴트: {', '.join(evidence)}
+
+어시스턴트별 문서 내용:
+{chr(10).join(sections)}
+"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def parse_result(text: str, assistant_ids: List[str]) -> Dict[str, Any]:
+    """모델 응답 JSON 검증 (형식이 맞지 않으면 ValueError → 호출 측에서 기존 방식으로 처리)"""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("comparison response is not a JSON object")
+    data = json.loads(text[start:end + 1])
+
+    answers = data.get("answers")
+    if not isinstance(answers, dict):
+        raise ValueError("comparison response has no answers object")
+
+    rows = []
+    for row in data.get("rows") or []:
+        if not isinstance(row, dict) or not str(row.get("item", "")).strip():
+            continue
+        values = row.get("values") if isinstance(row.get("values"), dict) else {}
+        rows.append({
+            "item": str(row["item"]).strip(),
+            "values": {aid: str(values.get(aid) or MISSING_VALUE).strip() for aid in assistant_ids}
+        })
+    # 근거가 없는 어시스턴트의 답변은 생략될 수 있음 (필요한 답변이 있는지는 호출 측에서 확인)
+    return {
+        "answers": {aid: answers[aid].strip() for aid in assistant_ids
+                    if isinstance(answers.get(aid), str) and answers[aid].strip()},
+        "rows": rows
+    }
+
+
+def render_table(assistant_ids: List[str], rows: List[Dict[str, Any]]) -> str:
+    """비교표 HTML (기존 비교표와 같은 스타일, 셀 내용은 이스케이프)"""
+    cell = 'style="border: 1px solid #ddd; padding: 12px; text-align: left;"'
+    header = 'style="border: 1px solid #ddd; padding: 12px; text-align: left; font-weight: bold;"'
+    lines = [
+        '<table style="border-collapse: collapse; width: 100%; border: 1px solid #ddd;">',
+        '<thead>',
+        '<tr style="background-color: #f8f9fa;">',
+        f'<th {header}>비교항목</th>',
+        *[f'<th {header}>{html.escape(aid)}</th>' for aid in assistant_ids],
+        '</tr>',
+        '</thead>',
+        '<tbody>',
+    ]
+    for row in rows:
+        lines.append(
+            f'<tr><td {cell}>{html.escape(row["item"])}</td>'
+            + "".join(f'<td {cell}>{html.escape(row["values"][aid])}</td>' for aid in assistant_ids)
+            + '</tr>'
+        )
+    lines += ['</tbody>', '</table>']
+    return "\n".join(lines)
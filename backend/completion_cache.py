@@ -0,0 +1,116 @@
+"""디스크 기반 LLM 응답 캐시 (SQLite)
+
+모델, temperature, max_tokens와 메시지 해시를 키로 응답 본문을 저장합니다.
+SQLite WAL 모드를 사용하므로 재시작 후에도, 여러 uvicorn 워커 사이에서도 공유됩니다.
+
+설정 (환경변수):
+    LLM_CACHE_ENABLED=true
+    LLM_CACHE_PATH=.cache/llm_completions.sqlite3
+    LLM_CACHE_TTL_SECONDS=86400
+    LLM_CACHE_MAX_ENTRIES=10000
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import metrics
+
+
+def make_cache_key(model: str, temperature: float, max_tokens: int, messages: List[Dict[str, str]]) -> str:
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "max_tokens": max_tokens, "messages": messages},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    def __init__(self, path: str, ttl_seconds: float = 86400, max_entries: int = 10000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                route TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_access ON completions(last_access)")
+
+    @classmethod
+    def from_env(cls) -> Optional["CompletionCache"]:
+        if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            os.getenv("LLM_CACHE_PATH", ".cache/llm_completions.sqlite3"),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000")),
+        )
+
+    def get(self, route: str, key: str) -> Optional[str]:
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT content, created_at FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                    row = None
+                if row is not None:
+                    self._conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            # 캐시 오류(여러 워커 간 database is locked 등)로 답변을 실패시키지 않고 미스로 처리
+            print(f"Warning: LLM cache read failed ({route}): {e}")
+            row = None
+
+        metrics.LLM_CACHE_REQUESTS.labels(route, "hit" if row is not None else "miss").inc()
+        return row[0] if row is not None else None
+
+    def set(self, route: str, key: str, content: str) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, route, content, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, route, content, now, now),
+                )
+                self._evict(now)
+        except sqlite3.Error as e:
+            # 저장 실패는 다음 요청이 다시 계산하면 되므로 건너뜀
+            print(f"Warning: LLM cache write failed ({route}): {e}")
+
+    def _evict(self, now: float) -> None:
+        """만료 항목 삭제 후 최대 개수를 넘으면 가장 오래 사용되지 않은 항목부터 삭제 (LRU)"""
+        expired = self._conn.execute(
+            "DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        count = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        overflow = max(0, count - self.max_entries)
+        if overflow:
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN "
+                "(SELECT key FROM completions ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+        if expired or overflow:
+            metrics.LLM_CACHE_EVICTIONS.inc(expired + overflow)
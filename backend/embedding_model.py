@@ -0,0 +1,171 @@
+"""임베딩 모델 로더
+
+EMBEDDING_BACKEND 환경변수로 CPU 추론 백엔드를 선택합니다.
+  - torch (기본값): fp32 SentenceTransformer
+  - int8: 동적 양자화(int8)로 미리 내보낸 로컬 모델 파일 (EMBEDDING_QUANTIZED_PATH)
+
+사용법:
+    python embedding_model.py export --output models/minilm-int8.pt
+    python embedding_model.py parity --quantized models/minilm-int8.pt --pdf-dir ./pdfs
+"""
+import argparse
+import os
+import threading
+import time
+from typing import List
+
+MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+DEFAULT_QUANTIZED_PATH = 'models/minilm-int8.pt'
+
+_shared_model = None
+_shared_model_lock = threading.Lock()
+
+
+def load_fp32_model():
+    """원본 fp32 SentenceTransformer 모델 로드"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME, device='cpu')
+
+
+def quantize_model(model):
+    """Linear 레이어를 int8 동적 양자화"""
+    import torch
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    quantized.eval()
+    return quantized
+
+
+def export_quantized_model(output_path: str) -> str:
+    """양자화된 모델을 로컬 파일로 내보냅니다."""
+    import torch
+    model = quantize_model(load_fp32_model())
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    torch.save(model, output_path)
+    return output_path
+
+
+def load_quantized_model(path: str):
+    """export_quantized_model로 저장한 int8 모델 로드"""
+    import torch
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"Quantized embedding model not found: {path} "
+            f"(run `python embedding_model.py export --output {path}` first)"
+        )
+    model = torch.load(path, map_location='cpu', weights_only=False)
+    model.eval()
+    return model
+
+
+def load_embedding_model():
+    """설정된 백엔드에 맞는 임베딩 모델을 새로 로드"""
+    backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    if backend == "int8":
+        return load_quantized_model(os.getenv("EMBEDDING_QUANTIZED_PATH", DEFAULT_QUANTIZED_PATH))
+    if backend != "torch":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend} (expected 'torch' or 'int8')")
+    return load_fp32_model()
+
+
+def get_embedding_model():
+    """프로세스 전체에서 공유하는 임베딩 모델 (PDFProcessor, RAGService 공용)"""
+    global _shared_model
+    if _shared_model is None:
+        with _shared_model_lock:
+            if _shared_model is None:
+                _shared_model = load_embedding_model()
+    return _shared_model
+
+
+def _load_corpus_from_pdfs(pdf_dir: str, limit: int) -> List[str]:
+    from pdf_processor import PDFProcessor
+    processor = PDFProcessor()
+    texts = []
+    for filename in sorted(os.listdir(pdf_dir)):
+        if not filename.lower().endswith('.pdf'):
+            continue
+        extracted = processor.extract_text_from_pdf(os.path.join(pdf_dir, filename))
+        texts.extend(chunk['content'] for chunk in processor.chunk_text(extracted['pages']))
+        if len(texts) >= limit:
+            break
+    return texts[:limit]
+
+
+def _load_corpus_from_index(limit: int) -> List[str]:
+    from opensearch_client import OpenSearchClient
+    client = OpenSearchClient()
+    response = client.client.search(
+        index=client.search_index,
+        body={"size": limit, "query": {"match_all": {}}, "_source": ["content"]}
+    )
+    return [hit['_source']['content'] for hit in response['hits']['hits']]
+
+
+def check_parity(quantized_path: str, texts: List[str], batch_size: int = 32) -> dict:
+    """fp32 모델과 int8 모델의 임베딩 코사인 일치도와 처리량을 비교"""
+    import numpy as np
+
+    fp32_model = load_fp32_model()
+    int8_model = load_quantized_model(quantized_path)
+
+    start = time.perf_counter()
+    fp32_embeddings = fp32_model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    fp32_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    int8_embeddings = int8_model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    int8_seconds = time.perf_counter() - start
+
+    cosines = np.sum(fp32_embeddings * int8_embeddings, axis=1)
+    return {
+        "texts": len(texts),
+        "cosine_mean": float(np.mean(cosines)),
+        "cosine_min": float(np.min(cosines)),
+        "cosine_p5": float(np.percentile(cosines, 5)),
+        "fp32_texts_per_sec": len(texts) / fp32_seconds,
+        "int8_texts_per_sec": len(texts) / int8_seconds,
+        "speedup": fp32_seconds / int8_seconds,
+        "quantized_file_mb": os.path.getsize(quantized_path) / (1024 * 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 모델 양자화 도구")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="int8 양자화 모델 내보내기")
+    export_parser.add_argument("--output", default=DEFAULT_QUANTIZED_PATH)
+
+    parity_parser = subparsers.add_parser("parity", help="fp32 대비 int8 코사인 일치도 확인")
+    parity_parser.add_argument("--quantized", default=DEFAULT_QUANTIZED_PATH)
+    parity_parser.add_argument("--pdf-dir", help="비교에 사용할 PDF 폴더 (미지정시 OpenSearch 인덱스에서 샘플링)")
+    parity_parser.add_argument("--limit", type=int, default=500)
+    parity_parser.add_argument("--min-cosine", type=float, default=0.98)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        path = export_quantized_model(args.output)
+        print(f"Exported int8 embedding model: {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+        return
+
+    if args.pdf_dir:
+        texts = _load_corpus_from_pdfs(args.pdf_dir, args.limit)
+    else:
+        texts = _load_corpus_from_index(args.limit)
+    if not texts:
+        raise SystemExit("비교할 텍스트가 없습니다.")
+
+    report = check_parity(args.quantized, texts)
+    for key, value in report.items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+    if report["cosine_mean"] < args.min_cosine:
+        raise SystemExit(f"❌ 평균 코사인 {report['cosine_mean']:.4f} < {args.min_cosine}")
+    print("✅ int8 모델이 fp32 모델과 일치합니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""코퍼스 통계 기반 로컬 키워드 추출
+
+/extract-keywords는 문서 제목마다 GPT-4를 호출했습니다. 이제는 색인된 문서에서 모은 통계로 먼저 추출합니다.
+문서를 적재할 때마다 한글 어절(조사 제거)의 문서 빈도(df)를 SQLite에 누적합니다.
+  - word_df : 독립된 어절로 나타난 문서 수 (복합명사/단어 사전 역할)
+  - ngram_df: 어절 안의 문자 n-gram(2~KEYWORD_MAX_NGRAM자)으로 나타난 문서 수
+SQLite WAL 모드라 재시작 후에도, 여러 uvicorn 워커 사이에서도 공유됩니다.
+
+추출 (제목 한 줄 기준 수 ms):
+  1. 제목 어절을 코퍼스 단어로 가장 잘게 분해 (학사운영위원회 → 학사|운영|위원회)
+  2. 어절 전체, 분해된 단어, 인접 단어를 이은 복합어(학사운영, 운영위원회) 중 코퍼스에 있는 것을 후보로
+  3. 후보가 많으면 길이 × IDF 순으로 limit개를 고르고, 긴 키워드부터 정렬
+  4. confidence = (코퍼스 단어로 설명되는 글자 비율) × min(1, 문서 수 / KEYWORD_MIN_DOCUMENTS)
+     → KEYWORD_MIN_CONFIDENCE 미만이면 호출 측(RAGService.extract_keywords)에서 GPT로 보완
+
+설정 (환경변수):
+    KEYWORD_STATS_ENABLED=true
+    KEYWORD_STATS_PATH=.cache/keyword_stats.sqlite3
+    KEYWORD_MAX_NGRAM=5         KEYWORD_MIN_DF=1
+    KEYWORD_MIN_DOCUMENTS=20    KEYWORD_MIN_CONFIDENCE=0.6
+
+기존 문서로 통계 만들기:
+    python keyword_extractor.py rebuild
+"""
+import argparse
+import math
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+HANGUL_TOKEN_RE = re.compile(r'[가-힣]{2,}')
+
+# 긴 조사부터 확인 (어간이 2글자 이상 남을 때만 제거)
+JOSA_SUFFIXES = (
+    '에서는', '으로는', '으로서', '으로써', '에서', '에게', '으로', '부터', '까지', '에는', '와의', '과의',
+    '은', '는', '이', '가', '을', '를', '의', '에', '와', '과', '로', '도', '만'
+)
+
+# 제목에 자주 붙지만 키워드로 의미 없는 단어
+STOP_WORDS = frozenset({'관한', '대한', '위한', '따른', '관하여', '대하여', '그리고', '또는', '있는', '하는', '경우'})
+
+MAX_TOKEN_LENGTH = 15
+
+
+def normalize_token(token: str) -> str:
+    for suffix in JOSA_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            return token[:-len(suffix)]
+    return token
+
+
+def document_terms(texts: Iterable[str], max_ngram: int) -> Tuple[Set[str], Set[str]]:
+    """문서 하나의 (어절 집합, 어절 내부 n-gram 집합) - 문서 빈도용이라 중복 없이"""
+    words = set()
+    for text in texts:
+        for token in HANGUL_TOKEN_RE.findall(text):
+            token = normalize_token(token)
+            if len(token) <= MAX_TOKEN_LENGTH:
+                words.add(token)
+    ngrams = set()
+    for word in words:
+        for n in range(2, min(max_ngram, len(word)) + 1):
+            for i in range(len(word) - n + 1):
+                ngrams.add(word[i:i + n])
+    return words, ngrams
+
+
+class CorpusKeywordExtractor:
+    def __init__(self, path: str, max_ngram: int = 5, min_df: int = 1, min_documents: int = 20,
+                 min_confidence: float = 0.6):
+        self.path = path
+        self.max_ngram = max_ngram
+        self.min_df = min_df
+        self.min_documents = min_documents
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS documents (document_id TEXT PRIMARY KEY)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY,
+                word_df INTEGER NOT NULL DEFAULT 0,
+                ngram_df INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["CorpusKeywordExtractor"]:
+        if os.getenv("KEYWORD_STATS_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            os.getenv("KEYWORD_STATS_PATH", ".cache/keyword_stats.sqlite3"),
+            max_ngram=int(os.getenv("KEYWORD_MAX_NGRAM", "5")),
+            min_df=int(os.getenv("KEYWORD_MIN_DF", "1")),
+            min_documents=int(os.getenv("KEYWORD_MIN_DOCUMENTS", "20")),
+            min_confidence=float(os.getenv("KEYWORD_MIN_CONFIDENCE", "0.6")),
+        )
+
+    def add_document(self, document_id: str, texts: Iterable[str]) -> bool:
+        """문서 하나의 통계를 누적 (같은 document_id를 다시 적재하면 중복 집계하지 않고 False)"""
+        words, ngrams = document_terms(texts, self.max_ngram)
+        rows = [(term, int(term in words), int(term in ngrams)) for term in words | ngrams]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO documents (document_id) VALUES (?)", (document_id,)
+                ).rowcount
+                if inserted:
+                    self._conn.executemany(
+                        "INSERT INTO terms (term, word_df, ngram_df) VALUES (?, ?, ?) "
+                        "ON CONFLICT(term) DO UPDATE SET word_df = word_df + excluded.word_df, "
+                        "ngram_df = ngram_df + excluded.ngram_df",
+                        rows,
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return bool(inserted)
+
+    def document_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _lookup(self, terms: Set[str]) -> Dict[str, Tuple[int, int]]:
+        if not terms:
+            return {}
+        placeholders = ",".join("?" * len(terms))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT term, word_df, ngram_df FROM terms WHERE term IN ({placeholders})", tuple(terms)
+            ).fetchall()
+        return {term: (word_df, ngram_df) for term, word_df, ngram_df in rows}
+
+    def _segment(self, token: str, stats: Dict[str, Tuple[int, int]]) -> List[Tuple[str, bool]]:
+        """token을 코퍼스 단어로 가장 잘게 분해 [(조각, 코퍼스 단어 여부)]
+
+        모르는 글자 수가 가장 적은 분할 중 단어 수가 가장 많은 분할 (모르는 글자는 한 글자씩 조각)
+        """
+        best: List[Optional[Tuple[int, int, List[Tuple[str, bool]]]]] = [None] * (len(token) + 1)
+        best[0] = (0, 0, [])
+        for end in range(1, len(token) + 1):
+            unknown, pieces, path = best[end - 1]
+            best[end] = (unknown + 1, pieces, path + [(token[end - 1], False)])
+            for start in range(0, end - 1):
+                piece = token[start:end]
+                if stats.get(piece, (0, 0))[0] < self.min_df or best[start] is None:
+                    continue
+                unknown, pieces, path = best[start]
+                candidate = (unknown, pieces + 1, path + [(piece, True)])
+                if (candidate[0], -candidate[1]) < (best[end][0], -best[end][1]):
+                    best[end] = candidate
+        return best[-1][2]
+
+    def extract(self, text: str, limit: int = 10) -> Dict[str, Any]:
+        """{"keywords": [...], "confidence": 0~1}"""
+        tokens = [normalize_token(token) for token in HANGUL_TOKEN_RE.findall(text)]
+        tokens = [token for token in dict.fromkeys(tokens) if token not in STOP_WORDS and len(token) <= MAX_TOKEN_LENGTH]
+        if not tokens:
+            return {"keywords": [], "confidence": 0.0}
+
+        substrings = {token[i:j] for token in tokens for i in range(len(token)) for j in range(i + 2, len(token) + 1)}
+        stats = self._lookup(substrings)
+        total_documents = self.document_count()
+
+        candidates: Dict[str, float] = {}
+        covered = 0
+        for token in tokens:
+            pieces = self._segment(token, stats)
+            covered += sum(len(piece) for piece, known in pieces if known)
+            candidates.setdefault(token, 0.0)
+            for a in range(len(pieces)):
+                for b in range(a + 1, len(pieces) + 1):
+                    span = pieces[a:b]
+                    if not all(known for _, known in span):
+                        continue
+                    term = "".join(piece for piece, _ in span)
+                    word_df, ngram_df = stats.get(term, (0, 0))
+                    # 인접 단어를 이은 복합어는 코퍼스에 한 어절(또는 어절의 일부)로 나타난 경우만
+                    if len(span) > 1 and max(word_df, ngram_df) < self.min_df and term != token:
+                        continue
+                    candidates.setdefault(term, 0.0)
+
+        for term in candidates:
+            df = max(stats.get(term, (0, 0)))
+            idf = math.log((total_documents + 1) / (df + 1)) + 1
+            candidates[term] = len(term) * idf
+        selected = sorted(candidates, key=lambda term: -candidates[term])[:limit]
+        # 기존 GPT/파일명 추출과 같이 긴 키워드부터
+        keywords = sorted(selected, key=lambda term: (-len(term), -candidates[term]))
+
+        coverage = covered / sum(len(token) for token in tokens)
+        corpus_factor = min(1.0, total_documents / self.min_documents) if self.min_documents else 1.0
+        return {"keywords": keywords, "confidence": round(coverage * corpus_factor, 3)}
+
+
+_extractor: Optional[CorpusKeywordExtractor] = None
+_extractor_lock = threading.Lock()
+_extractor_loaded = False
+
+
+def get_keyword_extractor() -> Optional[CorpusKeywordExtractor]:
+    """프로세스 공용 추출기 (KEYWORD_STATS_ENABLED=false면 None)"""
+    global _extractor, _extractor_loaded
+    if not _extractor_loaded:
+        with _extractor_lock:
+            if not _extractor_loaded:
+                _extractor = CorpusKeywordExtractor.from_env()
+                _extractor_loaded = True
+    return _extractor
+
+
+def rebuild(opensearch_client, extractor: CorpusKeywordExtractor) -> Dict[str, int]:
+    """색인된 청크를 document_id 순으로 훑어 문서별 통계를 누적 (이미 집계된 문서는 건너뜀)"""
+    added = skipped = 0
+    document_id, texts = None, []
+
+    def flush():
+        nonlocal added, skipped
+        if document_id is None:
+            return
+        if extractor.add_document(document_id, texts):
+            added += 1
+        else:
+            skipped += 1
+
+    for source in opensearch_client.scan_chunks(["document_id", "document_title", "content"]):
+        if source["document_id"] != document_id:
+            flush()
+            document_id, texts = source["document_id"], [source.get("document_title", "")]
+        texts.append(source.get("content", ""))
+    flush()
+    return {"added": added, "skipped": skipped, "documents": extractor.document_count()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="코퍼스 키워드 통계")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help="OpenSearch에 색인된 문서로 통계 누적")
+    extract_parser = subparsers.add_parser("extract", help="텍스트에서 키워드 추출")
+    extract_parser.add_argument("text")
+    args = parser.parse_args()
+
+    extractor = CorpusKeywordExtractor.from_env()
+    if extractor is None:
+        raise SystemExit("KEYWORD_STATS_ENABLED=false")
+    if args.command == "rebuild":
+        from opensearch_client import OpenSearchClient
+        print(rebuild(OpenSearchClient(), extractor))
+    else:
+        print(extractor.extract(args.text))
+
+
+if __name__ == "__main__":
+    main()
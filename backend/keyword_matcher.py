@@ -0,0 +1,98 @@
+"""키워드 하이라이트 엔진
+
+키워드마다 re.sub를 반복하던 방식 대신, 매칭할 단어들을 하나의 alternation 정규식으로
+컴파일해 텍스트를 한 번만 훑으며 겹치지 않는 구간(span)을 찾습니다.
+
+매칭 규칙 (기존 _highlight_keywords와 동일):
+  1. 텍스트에 있는 키워드는 그대로 매치
+  2. 없는 키워드는 (3글자 이상일 때) 텍스트에 있는 첫 번째 2글자 부분 문자열
+  3. 없는 키워드의 관련 단어 (RELATED_WORDS)
+
+키워드 집합마다 키워드, 2글자 부분 문자열, 관련 단어를 모두 담은 정규식을 한 번만 컴파일해 캐시하고,
+텍스트마다 finditer 한 번으로 후보를 찾은 뒤 찾은 단어들로 위 규칙을 적용해 구간을 고릅니다.
+(다른 매치 안에 가려진 단어는 텍스트에 없는 것으로 봅니다.)
+"""
+import re
+from functools import lru_cache
+from typing import List, Optional, Pattern, Sequence, Tuple
+
+RELATED_WORDS = {
+    '재학기간': ('재학', '학기', '기간', '수학'),
+    '연장': ('연장', '연기', '기간'),
+    '신청서': ('신청', '서류', '신청서', '허가'),
+}
+
+
+class _Matcher:
+    """키워드 집합 하나에 대한 후보 단어 정규식과 선택 규칙"""
+
+    def __init__(self, keywords: Tuple[str, ...]):
+        plan = []
+        terms = set()
+        for keyword in dict.fromkeys(keyword for keyword in keywords if keyword):
+            partials = tuple(keyword[i:i + 2] for i in range(len(keyword) - 1)) if len(keyword) >= 3 else ()
+            related_words = RELATED_WORDS.get(keyword, ())
+            plan.append((keyword, partials, related_words))
+            terms.add(keyword)
+            terms.update(partials)
+            terms.update(related_words)
+        # 키워드를 포함하는 더 긴 후보 단어 (그 단어가 매치되면 키워드도 텍스트에 있는 것)
+        self.plan = [
+            (keyword, partials, related_words, frozenset(term for term in terms if keyword in term))
+            for keyword, partials, related_words in plan
+        ]
+        # 긴 단어를 먼저 시도해야 "학사운영위원회"가 "학사"보다 우선 매치됨
+        ordered = sorted(terms, key=lambda term: (-len(term), term))
+        self.pattern: Optional[Pattern] = (
+            re.compile("|".join(re.escape(term) for term in ordered), re.IGNORECASE) if ordered else None
+        )
+
+    def find_spans(self, text: str) -> List[Tuple[int, int]]:
+        if self.pattern is None:
+            return []
+        matches = [(match.start(), match.end(), match.group()) for match in self.pattern.finditer(text)]
+        if not matches:
+            return []
+        # 단어가 텍스트에 있는지는 대소문자를 구분하고, 선택된 단어는 대소문자 구분 없이 하이라이트 (기존과 동일)
+        found = {term for _, _, term in matches}
+        selected = set()
+        for keyword, partials, related_words, containers in self.plan:
+            if not found.isdisjoint(containers):
+                selected.add(keyword)
+                continue
+            for partial in partials:
+                if partial in found:
+                    selected.add(partial)
+                    break
+            selected.update(related for related in related_words if related in found)
+        selected = {term.lower() for term in selected}
+        return [(start, end) for start, end, term in matches if term.lower() in selected]
+
+
+@lru_cache(maxsize=512)
+def _matcher(keywords: Tuple[str, ...]) -> _Matcher:
+    return _Matcher(keywords)
+
+
+def find_spans(text: str, keywords: Sequence[str]) -> List[Tuple[int, int]]:
+    """겹치지 않는 매치 구간 [(start, end), ...]"""
+    if not text or not keywords:
+        return []
+    return _matcher(tuple(keywords)).find_spans(text)
+
+
+def highlight(text: str, keywords: Sequence[str], open_tag: str = "<mark>", close_tag: str = "</mark>") -> str:
+    """매치 구간을 태그로 감싼 텍스트 (한 번의 선형 스캔)"""
+    spans = find_spans(text, keywords)
+    if not spans:
+        return text
+    parts = []
+    last = 0
+    for start, end in spans:
+        parts.append(text[last:start])
+        parts.append(open_tag)
+        parts.append(text[start:end])
+        parts.append(close_tag)
+        last = end
+    parts.append(text[last:])
+    return "".join(parts)
@@ -0,0 +1,294 @@
+"""OpenAI 호출 공용 게이트웨이
+
+모든 chat.completions 호출은 이 게이트웨이를 거칩니다.
+  - 전역 / 라우트별 동시 실행 제한 (세마포어)
+  - 토큰 버킷 기반 요청 속도 제한
+  - 429/5xx/타임아웃에 대한 지터 포함 지수 백오프 재시도
+  - 동일 요청은 디스크 캐시(completion_cache)에서 토큰 비용 없이 응답
+  - 서킷 브레이커: OpenAI 장애 중에는 즉시 LLMUnavailableError를 발생시켜
+    호출자가 검색 결과만으로 된 대체 답변을 바로 반환하도록 합니다.
+
+설정 (환경변수):
+    LLM_MAX_CONCURRENCY=8
+    LLM_ROUTE_CONCURRENCY=answer=6,comparison=2,comparison_table=2,extract_keywords=2
+    LLM_RATE_PER_SEC=8          LLM_RATE_BURST=16
+    LLM_TIMEOUT=60              LLM_QUEUE_TIMEOUT=10
+    LLM_MAX_RETRIES=3           LLM_RETRY_BASE_DELAY=0.5     LLM_RETRY_MAX_DELAY=8
+    LLM_BREAKER_FAILURES=5      LLM_BREAKER_RESET_SECONDS=30
+"""
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import openai
+
+import metrics
+from completion_cache import CompletionCache, make_cache_key
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+)
+
+
+class LLMUnavailableError(Exception):
+    """OpenAI를 호출하지 않고 즉시 실패 (서킷 오픈, 대기열 초과, 재시도 소진)"""
+
+
+class TokenBucket:
+    """초당 rate개 토큰이 채워지는 버킷 (최대 capacity개)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """연속 실패가 failure_threshold회 이상이면 reset_timeout초 동안 호출 차단 후 한 건만 시험 허용"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_owner: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_owner is not None:
+                return False
+            # half-open: 한 건만 시험 호출 허용
+            self._trial_owner = threading.get_ident()
+            return True
+
+    def release_trial(self):
+        """시험 호출이 성공/실패 판정 없이 끝난 경우 (대기열 초과 등) 다음 시험을 허용"""
+        with self._lock:
+            if self._trial_owner == threading.get_ident():
+                self._trial_owner = None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_owner = None
+        metrics.LLM_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_owner = None
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+        if self.is_open:
+            metrics.LLM_CIRCUIT_OPEN.set(1)
+
+
+def _parse_route_limits(value: str) -> Dict[str, int]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        route, _, limit = item.partition("=")
+        limits[route.strip()] = int(limit)
+    return limits
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        client: openai.OpenAI,
+        max_concurrency: int = 8,
+        route_concurrency: Optional[Dict[str, int]] = None,
+        rate_per_sec: float = 5.0,
+        rate_burst: float = 10.0,
+        queue_timeout: float = 10.0,
+        max_retries: int = 3,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 8.0,
+        breaker: Optional[CircuitBreaker] = None,
+        cache: Optional[CompletionCache] = None,
+    ):
+        self.client = client
+        self.cache = cache
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30)
+        self._global_slots = threading.BoundedSemaphore(max_concurrency)
+        self._route_slots = {
+            route: threading.BoundedSemaphore(limit) for route, limit in (route_concurrency or {}).items()
+        }
+        self._bucket = TokenBucket(rate_per_sec, rate_burst)
+
+    @classmethod
+    def from_env(cls, api_key: str) -> "LLMGateway":
+        # 재시도는 게이트웨이가 담당하므로 SDK 자체 재시도는 끔
+        client = openai.OpenAI(
+            api_key=api_key,
+            timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+            max_retries=0,
+        )
+        return cls(
+            client,
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            route_concurrency=_parse_route_limits(
+                os.getenv("LLM_ROUTE_CONCURRENCY", "answer=6,comparison=2,comparison_table=2,extract_keywords=2")
+            ),
+            rate_per_sec=float(os.getenv("LLM_RATE_PER_SEC", "8")),
+            rate_burst=float(os.getenv("LLM_RATE_BURST", "16")),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "10")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+            retry_base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+            retry_max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "8")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+            ),
+            cache=CompletionCache.from_env(),
+        )
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        # 429 응답의 Retry-After 헤더가 있으면 우선 적용
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.retry_max_delay)
+            except ValueError:
+                pass
+        # full jitter
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+    def _acquire(self, semaphore: threading.BoundedSemaphore, deadline: float) -> bool:
+        return semaphore.acquire(timeout=max(0.0, deadline - time.monotonic()))
+
+    def complete(
+        self,
+        route: str,
+        messages: List[Dict[str, str]],
+        model: str = "gpt-4",
+        temperature: float = 0.2,
+        max_tokens: int = 1500,
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        """chat completion을 실행하고 응답 본문을 반환
+
+        validate: 응답 형식 검증 함수. 예외를 발생시키면 응답을 캐시에 저장하지 않고 그 예외를 그대로 전달
+        (형식이 잘못된 응답이 TTL 동안 계속 재사용되지 않도록 함)
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(model, temperature, max_tokens, messages)
+            cached = self.cache.get(route, cache_key)
+            if cached is not None:
+                return cached
+
+        if not self.breaker.allow():
+            metrics.LLM_REJECTIONS.labels(route, "circuit_open").inc()
+            raise LLMUnavailableError("OpenAI circuit breaker is open")
+
+        try:
+            content = self._complete_with_slots(route, messages, model, temperature, max_tokens)
+        finally:
+            self.breaker.release_trial()
+
+        if validate is not None:
+            validate(content)
+        if cache_key is not None and content:
+            self.cache.set(route, cache_key, content)
+        return content
+
+    def _complete_with_slots(self, route, messages, model, temperature, max_tokens) -> str:
+        deadline = time.monotonic() + self.queue_timeout
+        route_slot = self._route_slots.get(route)
+        if route_slot is not None and not self._acquire(route_slot, deadline):
+            metrics.LLM_REJECTIONS.labels(route, "queue_timeout").inc()
+            raise LLMUnavailableError(f"Timed out waiting for an LLM slot ({route})")
+        try:
+            if not self._acquire(self._global_slots, deadline):
+                metrics.LLM_REJECTIONS.labels(route, "queue_timeout").inc()
+                raise LLMUnavailableError("Timed out waiting for a global LLM slot")
+            try:
+                return self._call_with_retries(route, messages, model, temperature, max_tokens, deadline)
+            finally:
+                self._global_slots.release()
+        finally:
+            if route_slot is not None:
+                route_slot.release()
+
+    def _call_with_retries(self, route, messages, model, temperature, max_tokens, deadline) -> str:
+        attempt = 0
+        while True:
+            # 재시도는 자체 대기 한도를 가짐 (첫 시도가 오래 걸려 원래 대기 기한이 지났어도 재시도가 막히지 않도록)
+            if attempt:
+                deadline = time.monotonic() + self.queue_timeout
+            if not self._bucket.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                metrics.LLM_REJECTIONS.labels(route, "rate_limited").inc()
+                raise LLMUnavailableError("Local LLM rate limit exceeded")
+
+            metrics.LLM_INFLIGHT.labels(route).inc()
+            try:
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                metrics.LLM_RETRIES.labels(route).inc()
+                time.sleep(self._retry_delay(attempt, e))
+                attempt += 1
+                continue
+            finally:
+                metrics.LLM_INFLIGHT.labels(route).dec()
+
+            self.breaker.record_success()
+            metrics.record_openai_usage(route, response)
+            return response.choices[0].message.content
+
+
+_shared_gateway: Optional[LLMGateway] = None
+_shared_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway(api_key: str) -> LLMGateway:
+    """프로세스 전체에서 공유하는 게이트웨이 (동시성 제한과 서킷 상태를 공유)"""
+    global _shared_gateway
+    if _shared_gateway is None:
+        with _shared_gateway_lock:
+            if _shared_gateway is None:
+                _shared_gateway = LLMGateway.from_env(api_key)
+    return _shared_gateway
@@ -1,18 +1,42 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Header, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from brotli_asgi import BrotliMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import os
 import tempfile
 import json
+import secrets
+import asyncio
 from dotenv import load_dotenv
 
-from opensearch_client import OpenSearchClient
-from pdf_processor import PDFProcessor
-from rag_service import RAGService
+# 무거운 모듈(torch, opensearch-py)은 services에서 백그라운드로 지연 로드
+import services
+import metrics
+import profiler
+from singleflight import SingleFlight, query_key
+from workload import PoolSaturatedError, WorkloadPool
+from keyword_extractor import get_keyword_extractor
 
 load_dotenv()
 
+# 모든 /query 응답에 단계별 타이밍 포함 (요청별로는 debug=true 폼 필드 사용)
+DEBUG_TIMINGS = os.getenv("RAG_DEBUG_TIMINGS", "false").lower() == "true"
+
+# 동일 질의가 동시에 들어오면 한 번만 계산하고 결과 공유
+query_flight = SingleFlight.from_env("query")
+
+# 질의와 문서 적재는 별도 풀에서 실행 (적재는 낮은 우선순위, CPU 일부만 사용, 대기열이 차면 429)
+query_pool = WorkloadPool.from_env("query")
+ingest_pool = WorkloadPool.from_env("ingest")
+
+# /query/batch 한 요청에 담을 수 있는 최대 질문 수
+BATCH_QUERY_MAX_ITEMS = int(os.getenv("BATCH_QUERY_MAX_ITEMS", "100"))
+
+# /admin API 토큰 (X-Admin-Token 헤더, 미설정시 관리자 API 비활성화)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
 app = FastAPI(title="RAG Document Management System")
 
 app.add_middleware(
@@ -26,35 +50,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 응답 압축 (br 지원 클라이언트는 brotli, 그 외에는 gzip)
+# NDJSON 스트리밍 응답은 줄 단위로 바로 전달되도록 압축에서 제외
+app.add_middleware(
+    BrotliMiddleware,
+    minimum_size=1000,
+    gzip_fallback=True,
+    excluded_handlers=[r"^/query/batch$"]
+)
+
+def record_keyword_stats(document_id: str, document_title: str, contents: List[str]):
+    extractor = get_keyword_extractor()
+    if extractor is None:
+        return
+    try:
+        with metrics.span("ingest", "keyword_stats"):
+            extractor.add_document(document_id, [document_title, *contents])
+    except Exception as e:
+        # 통계 누적 실패로 적재를 실패시키지 않음 (keyword_extractor.py rebuild로 다시 집계 가능)
+        print(f"Warning: keyword stats update failed for {document_id}: {e}")
+
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request, exc: PoolSaturatedError):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": f"Server is busy ({exc.pool} queue is full), retry later"},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 @app.get("/")
 async def root():
     return {"message": "RAG System API"}
 
+@app.on_event("startup")
+async def start_services():
+    services.start_background_initialization()
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
-
-# Initialize services with error handling
-try:
-    osearch_client = OpenSearchClient()
-    print("OpenSearch client initialized")
-except Exception as e:
-    print(f"Warning: OpenSearch client initialization failed: {e}")
-    osearch_client = None
-
-try:
-    pdf_processor = PDFProcessor()
-    print("PDF processor initialized")
-except Exception as e:
-    print(f"Warning: PDF processor initialization failed: {e}")
-    pdf_processor = None
-
-try:
-    rag_service = RAGService()
-    print("RAG service initialized")
-except Exception as e:
-    print(f"Warning: RAG service initialization failed: {e}")
-    rag_service = None
+    readiness = services.readiness()
+    return {"status": "healthy" if readiness["status"] != "degraded" else "degraded"}
+
+@app.get("/ready")
+async def readiness_check():
+    readiness = services.readiness()
+    status_code = 200 if readiness["status"] == "ready" else 503
+    return JSONResponse(status_code=status_code, content=readiness)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
 
 @app.post("/upload-document")
 async def upload_document(
@@ -68,6 +114,8 @@ async def upload_document(
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
+    osearch_client = services.get_opensearch_client()
+    pdf_processor = services.get_pdf_processor()
     if not osearch_client or not pdf_processor:
         raise HTTPException(status_code=503, detail="Service temporarily unavailable")
     
@@ -81,21 +129,36 @@ async def upload_document(
             tmp_file.write(content)
             tmp_file_path = tmp_file.name
         
-        # Process PDF
-        processed_data = pdf_processor.process_pdf_for_storage(
-            tmp_file_path,
-            document_title,
-            tags_list,
-            organization,
-            document_type,
-            assistant_id
-        )
+        def ingest():
+            with profiler.profile("upload"):
+                # Process PDF
+                processed_data = pdf_processor.process_pdf_for_storage(
+                    tmp_file_path,
+                    document_title,
+                    tags_list,
+                    organization,
+                    document_type,
+                    assistant_id
+                )
+                
+                # Store in OpenSearch (문서 전체 청크를 _bulk 요청 한 번으로)
+                with metrics.span("ingest", "index"):
+                    stored_chunks = osearch_client.bulk_index_batch(processed_data['chunks'])
+                    if stored_chunks:
+                        osearch_client.index_document_summary(processed_data['summary'])
+                
+                # 키워드 추출용 코퍼스 통계(n-gram/어절 문서 빈도) 누적
+                if stored_chunks:
+                    record_keyword_stats(processed_data['document_id'], document_title, processed_data['chunks'].contents)
+            return processed_data, stored_chunks
         
-        # Store in OpenSearch
-        stored_chunks = []
-        for chunk in processed_data['chunks']:
-            chunk_id = osearch_client.add_document_chunk(chunk)
-            stored_chunks.append(chunk_id)
+        # 추출/임베딩/색인은 적재 풀에서 실행해 이벤트 루프와 질의 처리를 막지 않음
+        processed_data, stored_chunks = await asyncio.wrap_future(ingest_pool.submit(ingest))
+        
+        # 새 어시스턴트/문서 수가 목록에 바로 반영되도록 캐시 무효화
+        catalog = services.get_assistant_catalog()
+        if catalog:
+            catalog.invalidate()
         
         # Clean up temporary files
         os.unlink(tmp_file_path)
@@ -105,7 +168,8 @@ async def upload_document(
             "document_id": processed_data['document_id'],
             "total_chunks": processed_data['total_chunks'],
             "total_pages": processed_data['total_pages'],
-            "stored_chunks": len(stored_chunks)
+            "stored_chunks": len(stored_chunks),
+            "boilerplate_removed": processed_data['boilerplate']
         }
         
     except Exception as e:
@@ -115,62 +179,238 @@ async def upload_document(
                 os.unlink(tmp_file_path)
             except:
                 pass
+        if isinstance(e, PoolSaturatedError):
+            raise
         raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
 
 @app.get("/assistants")
-async def get_assistants(organization: str = None):
-    if not osearch_client:
+def get_assistants(organization: str = None, limit: Optional[int] = Query(None, ge=1), cursor: Optional[str] = None):
+    """어시스턴트 ID 목록 (캐시). limit을 주면 next_cursor로 다음 페이지를 조회합니다."""
+    catalog = services.get_assistant_catalog()
+    if not catalog:
         return {"assistants": []}  # Return empty list if service unavailable
     try:
-        assistants = osearch_client.get_assistants(organization)
-        return {"assistants": assistants}
+        page = catalog.page(organization, limit, cursor)
+        return {
+            "assistants": [item["assistant_id"] for item in page["assistants"]],
+            "next_cursor": page["next_cursor"]
+        }
     except Exception as e:
         return {"assistants": []}
 
+@app.get("/assistants/stats")
+def get_assistant_stats(organization: str = None, limit: Optional[int] = Query(None, ge=1), cursor: Optional[str] = None):
+    """어시스턴트별 청크/문서 수와 마지막 업로드 시각, 전체 합계 (캐시)"""
+    catalog = services.get_assistant_catalog()
+    if not catalog:
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+    try:
+        all_stats = catalog.stats(organization)["assistants"]
+        page = catalog.page(organization, limit, cursor)
+        page["totals"] = {
+            "assistants": len(all_stats),
+            "documents": sum(item["documents"] for item in all_stats),
+            "chunks": sum(item["chunks"] for item in all_stats)
+        }
+        return page
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching assistant stats: {str(e)}")
+
+# 답변 생성은 질의 풀에서 실행하고 이벤트 루프에서 기다리므로, 요청이 몰려도 FastAPI 스레드를 차지하지 않고
+# 질의 대기열이 차면 바로 429를 반환합니다. LLM 게이트웨이의 동시성 제한은 풀 스레드에서 그대로 적용됩니다.
 @app.post("/query")
 async def query_documents(
     question: str = Form(...),
     assistant_id: Optional[str] = Form(None),
     assistant_ids: Optional[str] = Form(None),
     response_mode: str = Form("individual"),  # "individual" or "integrated"
-    summary_mode: bool = Form(False)  # Enhanced summary mode
+    summary_mode: bool = Form(False),  # Enhanced summary mode
+    debug: bool = Form(False),  # 단계별 타이밍을 응답에 포함
+    compact: bool = Form(False),  # 출처를 미리보기 + 하이라이트 구간으로 축약
+    preview_chars: int = Form(300, ge=0)  # compact 모드의 미리보기 길이
 ):
+    rag_service = services.get_rag_service()
     if not rag_service:
         raise HTTPException(status_code=503, detail="RAG service temporarily unavailable")
     
     try:
         # Handle multiple assistant IDs
-        if assistant_ids:
-            import json
-            assistant_list = json.loads(assistant_ids)
-            
-            if response_mode == "individual":
-                # Individual responses from each assistant
-                response = rag_service.get_individual_answers(question, assistant_list, summary_mode)
+        assistant_list = json.loads(assistant_ids) if assistant_ids else None
+        
+        def answer():
+            # 질의 풀 스레드에서 실행되므로 프로파일링도 그 스레드 안에서 시작
+            with profiler.profile("query"):
+                if assistant_list is not None:
+                    if response_mode == "individual":
+                        # Individual responses from each assistant
+                        return rag_service.get_individual_answers(question, assistant_list, summary_mode, not compact)
+                    # Integrated response (current behavior)
+                    return rag_service.get_answer(question, assistant_list, summary_mode, not compact)
+                # Handle single assistant ID (backward compatibility)
+                return rag_service.get_answer(question, assistant_id, summary_mode, not compact)
+        
+        with metrics.collect_spans() as timings:
+            if query_flight is None:
+                response = await asyncio.wrap_future(query_pool.submit(answer))
             else:
-                # Integrated response (current behavior)
-                response = rag_service.get_answer(question, assistant_list, summary_mode)
-        else:
-            # Handle single assistant ID (backward compatibility)
-            response = rag_service.get_answer(question, assistant_id, summary_mode)
+                key = query_key(
+                    question,
+                    assistant_list if assistant_list is not None else [assistant_id] if assistant_id else [],
+                    response_mode if assistant_list is not None else "single",
+                    summary_mode,
+                    highlight=not compact
+                )
+                # 같은 질의를 기다리는 요청도 풀 스레드에서 대기 (대기 중인 요청 수가 대기열 제한에 포함됨)
+                response = await asyncio.wrap_future(query_pool.submit(query_flight.do, key, answer))
+        if compact:
+            from rag_service import compact_response
+            response = compact_response(response, preview_chars)
+        if debug or DEBUG_TIMINGS:
+            response["timings"] = timings
         return response
+    except PoolSaturatedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
+class BatchQueryItem(BaseModel):
+    question: str
+    assistant_id: Optional[str] = None
+    assistant_ids: Optional[List[str]] = None
+    response_mode: str = "individual"  # "individual" or "integrated"
+    summary_mode: bool = False
+    id: Optional[str] = None  # 호출자가 결과를 매칭할 때 쓰는 임의의 식별자
+
+class BatchQueryRequest(BaseModel):
+    items: List[BatchQueryItem] = Field(..., min_length=1, max_length=BATCH_QUERY_MAX_ITEMS)
+    max_concurrency: int = Field(4, ge=1, le=16)  # 동시에 실행할 답변 생성 수
+    compact: bool = False
+    preview_chars: int = Field(300, ge=0)
+
+@app.post("/query/batch")
+def query_documents_batch(request: BatchQueryRequest):
+    """여러 질문을 한 번에 처리하고 완료되는 순서대로 NDJSON 한 줄씩 반환합니다.
+    
+    각 줄: {"index": 요청 내 순서, "id": item.id, "response": ...} 또는 {"index", "id", "error": ...}
+    """
+    rag_service = services.get_rag_service()
+    if not rag_service:
+        raise HTTPException(status_code=503, detail="RAG service temporarily unavailable")
+    
+    # 질의 대기열이 이미 찼으면 스트림을 시작하기 전에 429로 거절
+    query_pool.admit()
+    items = [item.model_dump() for item in request.items]
+    
+    def stream():
+        # 항목별 답변 생성도 질의 풀에서 실행 (도중에 대기열이 차면 해당 항목만 오류로 반환)
+        answers = rag_service.get_batch_answers(
+            items, request.max_concurrency, submit=query_pool.submit, highlight=not request.compact
+        )
+        for index, response, error in answers:
+            line = {"index": index, "id": request.items[index].id}
+            if error is not None:
+                line["error"] = f"Error processing query: {str(error)}"
+            else:
+                if request.compact:
+                    from rag_service import compact_response
+                    response = compact_response(response, request.preview_chars)
+                line["response"] = response
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/chunks/{chunk_id}")
+def get_chunk(chunk_id: str):
+    """compact 모드 응답의 출처 전체 내용을 조회합니다."""
+    osearch_client = services.get_opensearch_client()
+    if not osearch_client:
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+    try:
+        return osearch_client.get_chunk(chunk_id)
+    except Exception as e:
+        if getattr(e, 'status_code', None) == 404:
+            raise HTTPException(status_code=404, detail="Chunk not found")
+        raise HTTPException(status_code=500, detail=f"Error fetching chunk: {str(e)}")
+
 @app.post("/extract-keywords")
-async def extract_keywords(
+def extract_keywords(
     text: str = Form(...)
 ):
-    """OpenAI API를 사용하여 텍스트에서 키워드를 추출합니다."""
+    """색인된 코퍼스 통계로 키워드를 추출하고, 신뢰도가 낮을 때만 OpenAI API를 사용합니다."""
+    rag_service = services.get_rag_service()
     if not rag_service:
         raise HTTPException(status_code=503, detail="RAG service temporarily unavailable")
     
     try:
-        keywords = rag_service.extract_keywords_with_openai(text)
-        return {"keywords": keywords}
+        return rag_service.extract_keywords(text)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error extracting keywords: {str(e)}")
 
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+class ProfilingRequest(BaseModel):
+    route: str = Field(..., pattern="^(query|upload)$")
+    requests: Optional[int] = Field(None, ge=1, le=1000)  # 다음 N개 요청
+    sample_rate: Optional[float] = Field(None, gt=0, le=1)  # 또는 요청 비율
+    memory: bool = True  # tracemalloc 할당 위치 집계
+    ttl_seconds: int = Field(600, ge=1, le=86400)
+
+@app.post("/admin/profiling", dependencies=[Depends(require_admin)])
+def start_profiling(request: ProfilingRequest):
+    if request.requests is not None and request.sample_rate is not None:
+        raise HTTPException(status_code=400, detail="Use either requests or sample_rate")
+    session = profiler.start(
+        request.route,
+        requests=None if request.sample_rate is not None else (request.requests or 10),
+        sample_rate=request.sample_rate,
+        memory=request.memory,
+        ttl_seconds=request.ttl_seconds
+    )
+    return session.to_dict()
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+def profiling_status():
+    session = profiler.current()
+    return session.to_dict() if session else {"active": False}
+
+@app.delete("/admin/profiling", dependencies=[Depends(require_admin)])
+def stop_profiling():
+    session = profiler.stop()
+    return session.to_dict() if session else {"active": False}
+
+@app.get("/admin/profiling/stats", dependencies=[Depends(require_admin)])
+def profiling_stats(format: str = "text", sort: str = "cumulative", limit: int = 50):
+    session = profiler.current()
+    if not session:
+        raise HTTPException(status_code=404, detail="No profiling session")
+    if format == "pstats":
+        data = session.stats_dump()
+        if data is None:
+            raise HTTPException(status_code=404, detail="No profiled requests yet")
+        return Response(
+            content=data,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{session.route}.prof"'}
+        )
+    try:
+        return Response(content=session.stats_text(sort, limit), media_type="text/plain; charset=utf-8")
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key: {sort}")
+
+@app.get("/admin/profiling/memory", dependencies=[Depends(require_admin)])
+def profiling_memory(limit: int = 25):
+    session = profiler.current()
+    if not session:
+        raise HTTPException(status_code=404, detail="No profiling session")
+    return {"route": session.route, "profiled": session.profiled, "allocations": session.top_allocations(limit)}
+
+@app.get("/admin/workload", dependencies=[Depends(require_admin)])
+def workload_status():
+    """질의/적재 풀의 대기열 길이, 실행 중 작업 수, 평균 실행 시간"""
+    return {"query": query_pool.stats(), "ingest": ingest_pool.stats()}
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
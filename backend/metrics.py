@@ -0,0 +1,213 @@
+"""단계별 지연 시간 계측과 Prometheus 메트릭
+
+사용법:
+    with metrics.span("query", "embedding"):
+        ...
+
+    with metrics.collect_spans() as spans:   # 디버그 모드: 요청 단위로 타이밍 수집
+        response = rag_service.get_answer(...)
+"""
+import contextvars
+import time
+from typing import Any, Dict, List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Duration of each query/ingestion pipeline stage",
+    ["pipeline", "stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+OPENAI_TOKENS = Counter(
+    "rag_openai_tokens_total",
+    "OpenAI token usage reported in completion responses",
+    ["route", "kind"],
+)
+
+OPENAI_REQUESTS = Counter(
+    "rag_openai_requests_total",
+    "OpenAI chat completion calls",
+    ["route"],
+)
+
+LLM_RETRIES = Counter(
+    "rag_llm_retries_total",
+    "LLM gateway retries after 429/5xx/timeout",
+    ["route"],
+)
+
+LLM_REJECTIONS = Counter(
+    "rag_llm_rejections_total",
+    "LLM calls rejected without reaching OpenAI (circuit open, queue timeout)",
+    ["route", "reason"],
+)
+
+LLM_CIRCUIT_OPEN = Gauge(
+    "rag_llm_circuit_open",
+    "1 while the OpenAI circuit breaker is open",
+)
+
+LLM_INFLIGHT = Gauge(
+    "rag_llm_inflight_requests",
+    "OpenAI calls currently in flight",
+    ["route"],
+)
+
+LLM_CACHE_REQUESTS = Counter(
+    "rag_llm_cache_requests_total",
+    "LLM completion cache lookups",
+    ["route", "result"],
+)
+
+LLM_CACHE_EVICTIONS = Counter(
+    "rag_llm_cache_evictions_total",
+    "LLM completion cache entries removed by TTL or LRU size cap",
+)
+
+SINGLEFLIGHT_REQUESTS = Counter(
+    "rag_singleflight_requests_total",
+    "Requests that computed a result (leader) or shared an in-flight one",
+    ["flight", "role"],
+)
+
+OPENSEARCH_INFLIGHT = Gauge(
+    "rag_opensearch_inflight_requests",
+    "OpenSearch requests currently in flight",
+    ["operation"],
+)
+
+OPENSEARCH_POOL_SATURATION = Gauge(
+    "rag_opensearch_pool_saturation",
+    "In-flight OpenSearch requests divided by connection pool capacity (above 1 means connections are not reused)",
+)
+
+OPENSEARCH_POOL_OVERFLOW = Counter(
+    "rag_opensearch_pool_overflow_total",
+    "OpenSearch requests sent while every pooled connection was busy",
+    ["operation"],
+)
+
+RETRIEVAL_CHUNKS_USED = Histogram(
+    "rag_retrieval_chunks_used",
+    "Chunks sent to the LLM after the adaptive retrieval cut-off",
+    buckets=(1, 2, 3, 4, 6, 8, 10, 15, 20, 30),
+)
+
+RETRIEVAL_TOKENS_SAVED = Counter(
+    "rag_retrieval_tokens_saved_total",
+    "Estimated context tokens not sent to the LLM thanks to the adaptive retrieval cut-off",
+)
+
+COMPARISON_FALLBACKS = Counter(
+    "rag_comparison_fallbacks_total",
+    "Single-pass comparisons that fell back to per-assistant answers",
+    ["reason"],
+)
+
+WORKLOAD_QUEUE_DEPTH = Gauge(
+    "rag_workload_queue_depth",
+    "Jobs waiting for a worker in the query/ingest pool",
+    ["pool"],
+)
+
+WORKLOAD_QUEUE_LIMIT = Gauge(
+    "rag_workload_queue_limit",
+    "Queue depth above which the pool rejects new jobs with 429",
+    ["pool"],
+)
+
+WORKLOAD_RUNNING = Gauge(
+    "rag_workload_running",
+    "Jobs currently running in the query/ingest pool",
+    ["pool"],
+)
+
+WORKLOAD_WAIT_SECONDS = Histogram(
+    "rag_workload_wait_seconds",
+    "Time a job waited in the pool queue before starting",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+WORKLOAD_RUN_SECONDS = Histogram(
+    "rag_workload_run_seconds",
+    "Time a job ran in the query/ingest pool",
+    ["pool"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+WORKLOAD_REJECTIONS = Counter(
+    "rag_workload_rejections_total",
+    "Jobs rejected with 429 because the pool queue was full",
+    ["pool"],
+)
+
+_current_spans: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar(
+    "rag_current_spans", default=None
+)
+
+
+class Span:
+    """한 단계의 소요 시간을 측정해 히스토그램과 (수집 중이면) 요청 타이밍에 기록"""
+
+    def __init__(self, pipeline: str, stage: str, detail: Optional[str] = None):
+        self.pipeline = pipeline
+        self.stage = stage
+        self.detail = detail
+        self.start = time.perf_counter()
+        self.elapsed = None
+
+    def stop(self) -> float:
+        if self.elapsed is not None:
+            return self.elapsed
+        self.elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.labels(self.pipeline, self.stage).observe(self.elapsed)
+
+        spans = _current_spans.get()
+        if spans is not None:
+            entry = {"stage": f"{self.pipeline}.{self.stage}", "ms": round(self.elapsed * 1000, 2)}
+            if self.detail:
+                entry["detail"] = self.detail
+            spans.append(entry)
+        return self.elapsed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def span(pipeline: str, stage: str, detail: Optional[str] = None) -> Span:
+    return Span(pipeline, stage, detail)
+
+
+class collect_spans:
+    """블록 안에서 기록된 span들을 리스트로 모읍니다 (중첩 가능)."""
+
+    def __enter__(self) -> List[Dict[str, Any]]:
+        self.spans: List[Dict[str, Any]] = []
+        self._token = _current_spans.set(self.spans)
+        return self.spans
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_spans.reset(self._token)
+        return False
+
+
+def record_openai_usage(route: str, response) -> None:
+    """OpenAI 응답의 usage를 토큰 카운터에 반영"""
+    OPENAI_REQUESTS.labels(route).inc()
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    OPENAI_TOKENS.labels(route, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+    OPENAI_TOKENS.labels(route, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def render_latest():
+    """/metrics 응답 본문과 content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
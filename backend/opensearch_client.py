@@ -1,13 +1,176 @@
 from opensearchpy import OpenSearch
+from opensearchpy.exceptions import NotFoundError
+import hashlib
+import math
 import os
-from typing import List, Dict, Any
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple, Union
 import json
 
+import metrics
+from chunk_batch import ChunkBatch
+from vector_projection import VectorCodec, get_vector_codec
+
+# 문서 배치 전략 (OPENSEARCH_PLACEMENT)
+#   shared    : 단일 인덱스 + assistant_id term 필터 (기본값)
+#   routing   : 단일 인덱스 + assistant_id 커스텀 _routing → 어시스턴트 검색은 샤드 하나만 조회
+#   org_index : 조직별 인덱스(<index>-org-...) + <index> 별칭 → 어시스턴트 검색은 해당 조직 인덱스만 조회
+# 배치 전략을 바꾸면 기존 문서는 새 위치에 없으므로 reset_index.py 후 다시 적재해야 합니다.
+PLACEMENTS = ("shared", "routing", "org_index")
+# ef_search를 지정하지 않았을 때 인덱스에 설정하는 knn.algo_param.ef_search (nmslib/faiss)
+DEFAULT_EF_SEARCH = 100
+
+class KNNProfile:
+    """kNN 인덱스/검색 파라미터 묶음
+    
+    m, ef_construction: HNSW 그래프 구성 (인덱스 생성 시에만 적용, None이면 엔진 기본값)
+    ef_search: 검색 후보 수. nmslib/faiss는 인덱스 설정으로, lucene은 질의의 k 하한으로 적용
+              (lucene 엔진은 k를 후보 큐 크기로 사용). None이면 인덱스 설정은 DEFAULT_EF_SEARCH,
+              lucene 질의는 k = size 그대로 (knn_tuning 결과로 값을 정한 뒤 지정)
+    oversample: 필터 검색에서 후처리 필터로 줄어드는 결과를 보충하기 위해 k = size × oversample
+    
+    설정 (환경변수):
+        OPENSEARCH_KNN_ENGINE=lucene        OPENSEARCH_KNN_SPACE_TYPE=cosinesimil
+        OPENSEARCH_HNSW_M=                  OPENSEARCH_HNSW_EF_CONSTRUCTION=
+        OPENSEARCH_HNSW_EF_SEARCH=          OPENSEARCH_KNN_OVERSAMPLE=1.0
+    """
+    
+    def __init__(self, engine: str = "lucene", space_type: str = "cosinesimil", m: Optional[int] = None,
+                 ef_construction: Optional[int] = None, ef_search: Optional[int] = None, oversample: float = 1.0):
+        self.engine = engine
+        self.space_type = space_type
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.oversample = oversample
+    
+    @classmethod
+    def from_env(cls) -> "KNNProfile":
+        def optional_int(name):
+            value = os.getenv(name)
+            return int(value) if value else None
+        
+        return cls(
+            engine=os.getenv("OPENSEARCH_KNN_ENGINE", "lucene"),
+            space_type=os.getenv("OPENSEARCH_KNN_SPACE_TYPE", "cosinesimil"),
+            m=optional_int("OPENSEARCH_HNSW_M"),
+            ef_construction=optional_int("OPENSEARCH_HNSW_EF_CONSTRUCTION"),
+            ef_search=optional_int("OPENSEARCH_HNSW_EF_SEARCH"),
+            oversample=float(os.getenv("OPENSEARCH_KNN_OVERSAMPLE", "1.0")),
+        )
+    
+    def method(self) -> Dict[str, Any]:
+        method = {
+            "name": "hnsw",
+            "space_type": self.space_type,
+            "engine": self.engine
+        }
+        parameters = {}
+        if self.m:
+            parameters["m"] = self.m
+        if self.ef_construction:
+            parameters["ef_construction"] = self.ef_construction
+        if parameters:
+            method["parameters"] = parameters
+        return method
+    
+    def candidate_k(self, size: int, filtered: bool) -> int:
+        k = int(math.ceil(size * self.oversample)) if filtered else size
+        if self.engine == "lucene" and self.ef_search:
+            k = max(k, self.ef_search)
+        return k
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "engine": self.engine,
+            "space_type": self.space_type,
+            "m": self.m,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+            "oversample": self.oversample,
+        }
+
+
+class TransportSettings:
+    """OpenSearch HTTP 전송 설정
+    
+    pool_maxsize: 호스트당 유지하는 연결 수. 동시 요청이 이보다 많으면 urllib3가 임시 연결을 새로 열고
+                  응답 후 버리므로(keep-alive 재사용 실패) API 스레드풀 크기 이상으로 맞춥니다.
+    http_compress: 요청 본문 gzip 압축 (원격 클러스터에서 bulk/kNN 벡터 본문 전송량 감소, 로컬에서는 CPU만 소모)
+    search_timeout / bulk_timeout: 검색·집계와 색인 요청의 타임아웃(초)
+    max_retries, retry_on_timeout: 연결 오류/502·503·504/타임아웃 재시도
+    sniff: 시작 시와 연결 실패 시 클러스터 노드 목록을 조회해 모든 노드로 분산 (sniffer_timeout초마다 갱신)
+    
+    설정 (환경변수):
+        OPENSEARCH_POOL_MAXSIZE=40          OPENSEARCH_HTTP_COMPRESS=false
+        OPENSEARCH_SEARCH_TIMEOUT=10        OPENSEARCH_BULK_TIMEOUT=120
+        OPENSEARCH_MAX_RETRIES=3            OPENSEARCH_RETRY_ON_TIMEOUT=true
+        OPENSEARCH_SNIFF=false              OPENSEARCH_SNIFFER_TIMEOUT=60
+    """
+    
+    def __init__(self, pool_maxsize: int = 40, http_compress: bool = False, search_timeout: float = 10.0,
+                 bulk_timeout: float = 120.0, max_retries: int = 3, retry_on_timeout: bool = True,
+                 sniff: bool = False, sniffer_timeout: float = 60.0):
+        self.pool_maxsize = pool_maxsize
+        self.http_compress = http_compress
+        self.search_timeout = search_timeout
+        self.bulk_timeout = bulk_timeout
+        self.max_retries = max_retries
+        self.retry_on_timeout = retry_on_timeout
+        self.sniff = sniff
+        self.sniffer_timeout = sniffer_timeout
+    
+    @classmethod
+    def from_env(cls) -> "TransportSettings":
+        def flag(name, default):
+            return os.getenv(name, default).lower() in ("1", "true", "yes")
+        
+        return cls(
+            pool_maxsize=int(os.getenv("OPENSEARCH_POOL_MAXSIZE", "40")),
+            http_compress=flag("OPENSEARCH_HTTP_COMPRESS", "false"),
+            search_timeout=float(os.getenv("OPENSEARCH_SEARCH_TIMEOUT", "10")),
+            bulk_timeout=float(os.getenv("OPENSEARCH_BULK_TIMEOUT", "120")),
+            max_retries=int(os.getenv("OPENSEARCH_MAX_RETRIES", "3")),
+            retry_on_timeout=flag("OPENSEARCH_RETRY_ON_TIMEOUT", "true"),
+            sniff=flag("OPENSEARCH_SNIFF", "false"),
+            sniffer_timeout=float(os.getenv("OPENSEARCH_SNIFFER_TIMEOUT", "60")),
+        )
+    
+    def client_kwargs(self) -> Dict[str, Any]:
+        kwargs = {
+            "pool_maxsize": self.pool_maxsize,
+            "http_compress": self.http_compress,
+            "timeout": self.search_timeout,
+            "max_retries": self.max_retries,
+            "retry_on_timeout": self.retry_on_timeout,
+        }
+        if self.sniff:
+            kwargs.update(sniff_on_start=True, sniff_on_connection_fail=True, sniffer_timeout=self.sniffer_timeout)
+        return kwargs
+
+
+# org_index 배치에서 모르는 assistant_id가 들어왔을 때 어시스턴트→조직 매핑을 다시 읽는 최소 간격
+ASSISTANT_MAP_REFRESH_SECONDS = 30
+
+
 class OpenSearchClient:
-    def __init__(self):
+    def __init__(self, index_name: Optional[str] = None, profile: Optional[KNNProfile] = None,
+                 vector_codec: Optional[VectorCodec] = None, transport: Optional[TransportSettings] = None):
         self.host = os.getenv("OPENSEARCH_HOST", "localhost")
         self.port = int(os.getenv("OPENSEARCH_PORT", "9200"))
-        self.index_name = os.getenv("OPENSEARCH_INDEX", "rag_documents")
+        self.index_name = index_name or os.getenv("OPENSEARCH_INDEX", "rag_documents")
+        self.profile = profile or KNNProfile.from_env()
+        self.vector_codec = vector_codec or get_vector_codec()
+        if self.vector_codec.encoding == "fp16" and self.profile.engine != "faiss":
+            raise ValueError("VECTOR_ENCODING=fp16 requires OPENSEARCH_KNN_ENGINE=faiss")
+        self.placement = os.getenv("OPENSEARCH_PLACEMENT", "shared").lower()
+        if self.placement not in PLACEMENTS:
+            raise ValueError(f"Unknown OPENSEARCH_PLACEMENT: {self.placement} (expected one of {', '.join(PLACEMENTS)})")
+        self.number_of_shards = os.getenv("OPENSEARCH_NUMBER_OF_SHARDS")
+        self.transport = transport or TransportSettings.from_env()
         
         self.client = OpenSearch(
             hosts=[{'host': self.host, 'port': self.port}],
@@ -15,25 +178,57 @@ class OpenSearchClient:
             use_ssl=False,
             verify_certs=False,
             ssl_show_warn=False,
+            **self.transport.client_kwargs()
         )
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+        
+        self._assistant_indices: Dict[str, Set[str]] = {}
+        self._assistant_map_loaded_at = 0.0
+        self._assistant_map_lock = threading.Lock()
         
-        self._create_index_if_not_exists()
+        # org_index 배치에서는 조직 인덱스를 첫 색인 시점에 생성
+        if self.placement != "org_index":
+            self._create_index_if_not_exists()
     
-    def _create_index_if_not_exists(self):
-        if not self.client.indices.exists(index=self.index_name):
+    @property
+    def search_index(self) -> str:
+        """전체 검색 대상 (org_index 배치에서는 모든 조직 인덱스)"""
+        if self.placement == "org_index":
+            return f"{self.index_name}-org-*"
+        return self.index_name
+    
+    def organization_index(self, organization: str) -> str:
+        """조직 인덱스 이름 (인덱스 이름에 쓸 수 없는 문자가 있어도 안전하도록 해시 포함)"""
+        slug = re.sub(r'[^a-z0-9]+', '-', organization.lower()).strip('-')
+        digest = hashlib.sha1(organization.encode('utf-8')).hexdigest()[:10]
+        return f"{self.index_name}-org-{slug + '-' if slug else ''}{digest}"
+    
+    @property
+    def documents_index(self) -> str:
+        """문서 요약 벡터 인덱스 (2단계 검색의 1단계, 배치 전략과 무관하게 하나)"""
+        return f"{self.index_name}-documents"
+    
+    def _embedding_field(self) -> Dict[str, Any]:
+        # 차원 축소/양자화 설정(vector_projection.py)에 따라 차원, data_type, 인코더가 달라짐
+        method = self.profile.method()
+        encoder = self.vector_codec.method_parameters()
+        if encoder:
+            method["parameters"] = {**method.get("parameters", {}), **encoder}
+        return {
+            "type": "knn_vector",
+            **self.vector_codec.mapping(),
+            "method": method
+        }
+    
+    def _create_index_if_not_exists(self, index_name: Optional[str] = None):
+        index_name = index_name or self.index_name
+        if not self.client.indices.exists(index=index_name):
             index_body = {
                 "mappings": {
                     "properties": {
                         "content": {"type": "text"},
-                        "embedding": {
-                            "type": "knn_vector",
-                            "dimension": 384,
-                            "method": {
-                                "name": "hnsw",
-                                "space_type": "cosinesimil",
-                                "engine": "lucene"
-                            }
-                        },
+                        "embedding": self._embedding_field(),
                         "document_id": {"type": "keyword"},
                         "document_title": {"type": "text"},
                         "page_number": {"type": "integer"},
@@ -48,25 +243,166 @@ class OpenSearchClient:
                 "settings": {
                     "index": {
                         "knn": True,
-                        "knn.algo_param.ef_search": 100
+                        "knn.algo_param.ef_search": self.profile.ef_search or DEFAULT_EF_SEARCH
                     }
                 }
             }
+            if self.number_of_shards:
+                index_body["settings"]["index"]["number_of_shards"] = int(self.number_of_shards)
+            if index_name != self.index_name:
+                # 조직 인덱스는 기본 인덱스 이름의 별칭으로 묶음 (운영 도구/대시보드에서 한 번에 조회)
+                index_body["aliases"] = {self.index_name: {}}
             
-            self.client.indices.create(index=self.index_name, body=index_body)
-            print(f"Created index: {self.index_name}")
+            self.client.indices.create(index=index_name, body=index_body)
+            print(f"Created index: {index_name}")
+    
+    def _create_documents_index_if_not_exists(self):
+        if not self.client.indices.exists(index=self.documents_index):
+            index_body = {
+                "mappings": {
+                    "properties": {
+                        "embedding": self._embedding_field(),
+                        "document_id": {"type": "keyword"},
+                        "document_title": {"type": "text"},
+                        "chunks": {"type": "integer"},
+                        "tags": {"type": "keyword"},
+                        "organization": {"type": "keyword"},
+                        "document_type": {"type": "keyword"},
+                        "upload_date": {"type": "date"},
+                        "assistant_id": {"type": "keyword"}
+                    }
+                },
+                "settings": {
+                    "index": {
+                        "knn": True,
+                        "knn.algo_param.ef_search": self.profile.ef_search or DEFAULT_EF_SEARCH
+                    }
+                }
+            }
+            self.client.indices.create(index=self.documents_index, body=index_body)
+            print(f"Created index: {self.documents_index}")
     
-    def add_document_chunk(self, chunk_data: Dict[str, Any]) -> str:
-        # 매번 인덱스 존재 확인 및 생성 (올바른 매핑 보장)
-        self._create_index_if_not_exists()
+    def _placement_for_chunk(self, chunk_data: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """청크를 저장할 (인덱스, routing)"""
+        if self.placement == "routing":
+            return self.index_name, chunk_data['assistant_id']
+        if self.placement == "org_index":
+            index_name = self.organization_index(chunk_data['organization'])
+            with self._assistant_map_lock:
+                self._assistant_indices.setdefault(chunk_data['assistant_id'], set()).add(index_name)
+            return index_name, None
+        return self.index_name, None
+    
+    def _search_target(self, assistant_id: Optional[str]) -> Tuple[str, Optional[str]]:
+        """검색할 (인덱스, routing). 어시스턴트를 지정하면 해당 샤드/조직 인덱스로 좁힘"""
+        if not assistant_id:
+            return self.search_index, None
+        if self.placement == "routing":
+            return self.index_name, assistant_id
+        if self.placement == "org_index":
+            indices = self._indices_for_assistant(assistant_id)
+            return (",".join(sorted(indices)) if indices else self.search_index), None
+        return self.index_name, None
+    
+    def _indices_for_assistant(self, assistant_id: str) -> Set[str]:
+        with self._assistant_map_lock:
+            indices = self._assistant_indices.get(assistant_id)
+            if indices is not None or time.time() - self._assistant_map_loaded_at < ASSISTANT_MAP_REFRESH_SECONDS:
+                return set(indices or ())
+            self._assistant_map_loaded_at = time.time()
         
-        response = self.client.index(
-            index=self.index_name,
-            body=chunk_data
-        )
+        # 다른 프로세스(bulk_ingest.py 등)가 색인한 어시스턴트까지 포함해 매핑을 다시 읽음
+        mapping: Dict[str, Set[str]] = {}
+        sources = [
+            {"assistant_id": {"terms": {"field": "assistant_id"}}},
+            {"organization": {"terms": {"field": "organization"}}}
+        ]
+        for bucket in self._composite_buckets(sources):
+            key = bucket['key']
+            mapping.setdefault(key['assistant_id'], set()).add(self.organization_index(key['organization']))
+        with self._assistant_map_lock:
+            for aid, index_names in mapping.items():
+                self._assistant_indices.setdefault(aid, set()).update(index_names)
+            return set(self._assistant_indices.get(assistant_id, ()))
+    
+    @contextmanager
+    def _request(self, operation: str):
+        """동시 요청 수를 연결 풀 크기와 비교해 포화도 메트릭에 기록"""
+        connections = getattr(getattr(self.client, "transport", None), "connection_pool", None)
+        capacity = self.transport.pool_maxsize * max(1, len(getattr(connections, "connections", [None])))
+        with self._inflight_lock:
+            self._inflight += 1
+            inflight = self._inflight
+        if inflight > capacity:
+            metrics.OPENSEARCH_POOL_OVERFLOW.labels(operation).inc()
+        metrics.OPENSEARCH_INFLIGHT.labels(operation).inc()
+        metrics.OPENSEARCH_POOL_SATURATION.set(inflight / capacity)
+        try:
+            yield
+        finally:
+            with self._inflight_lock:
+                self._inflight -= 1
+                inflight = self._inflight
+            metrics.OPENSEARCH_INFLIGHT.labels(operation).dec()
+            metrics.OPENSEARCH_POOL_SATURATION.set(inflight / capacity)
+    
+    def bulk_index_chunks(self, chunks: List[Dict[str, Any]], ids: Optional[List[str]] = None) -> List[str]:
+        """여러 청크를 _bulk 요청 한 번으로 색인 (ids를 주면 같은 ID로 다시 색인할 때 덮어씀)"""
+        if not chunks:
+            return []
+        body = []
+        target_indices = set()
+        for i, chunk in enumerate(chunks):
+            index_name, routing = self._placement_for_chunk(chunk)
+            target_indices.add(index_name)
+            action = {"_index": index_name}
+            if routing:
+                action["routing"] = routing
+            if ids:
+                action["_id"] = ids[i]
+            body.append({"index": action})
+            body.append(chunk)
+        
+        for index_name in target_indices:
+            self._create_index_if_not_exists(index_name)
+        
+        with self._request("bulk"):
+            response = self.client.bulk(body=body, request_timeout=self.transport.bulk_timeout)
+        if response.get('errors'):
+            failed = [item['index'] for item in response['items'] if 'error' in item['index']]
+            raise RuntimeError(f"Bulk indexing failed for {len(failed)} chunks: {failed[0]['error']}")
+        return [item['index']['_id'] for item in response['items']]
+    
+    def bulk_index_batch(self, batch: ChunkBatch) -> List[str]:
+        """한 문서의 ChunkBatch를 _bulk 요청 한 번으로 색인 (청크 dict 없이 NDJSON 문자열로 직렬화)"""
+        if not len(batch):
+            return []
+        index_name, routing = self._placement_for_chunk(batch.metadata)
+        self._create_index_if_not_exists(index_name)
+        action = {"_index": index_name}
+        if routing:
+            action["routing"] = routing
+        
+        with self._request("bulk"):
+            response = self.client.bulk(body=batch.bulk_body(action), request_timeout=self.transport.bulk_timeout)
+        if response.get('errors'):
+            failed = [item['index'] for item in response['items'] if 'error' in item['index']]
+            raise RuntimeError(f"Bulk indexing failed for {len(failed)} chunks: {failed[0]['error']}")
+        return [item['index']['_id'] for item in response['items']]
+    
+    def index_document_summary(self, summary: Dict[str, Any]) -> str:
+        """문서 요약 벡터(제목 + 청크 평균)를 document_id로 저장 (같은 문서를 다시 적재하면 덮어씀)"""
+        self._create_documents_index_if_not_exists()
+        with self._request("index"):
+            response = self.client.index(
+                index=self.documents_index,
+                id=summary['document_id'],
+                body=summary,
+                request_timeout=self.transport.bulk_timeout
+            )
         return response['_id']
     
-    def search_similar_chunks(self, query_embedding: List[float], assistant_id: str = None, size: int = 20) -> List[Dict]:
+    def _build_document_query(self, query_embedding: List[float], assistant_id: str = None, size: int = 5) -> Dict[str, Any]:
         query = {
             "size": size,
             "query": {
@@ -76,48 +412,252 @@ class OpenSearchClient:
                             "knn": {
                                 "embedding": {
                                     "vector": query_embedding,
-                                    "k": size
+                                    "k": self.profile.candidate_k(size, filtered=bool(assistant_id))
                                 }
                             }
                         }
                     ]
                 }
             },
-            "_source": ["content", "document_title", "page_number", "chunk_index", "tags", "organization", "document_type", "assistant_id"]
+            "_source": ["document_id"]
         }
-        
         if assistant_id:
             query["query"]["bool"]["filter"] = [{"term": {"assistant_id": assistant_id}}]
+        return query
+    
+    def search_documents(self, query_embedding: List[float], assistant_id: str = None, size: int = 5) -> List[str]:
+        """질문과 가까운 문서의 document_id 목록 (문서 요약 인덱스가 아직 없으면 빈 목록)"""
+        try:
+            with self._request("search"):
+                response = self.client.search(
+                    index=self.documents_index,
+                    body=self._build_document_query(query_embedding, assistant_id, size)
+                )
+        except NotFoundError:
+            return []
+        return [hit['_source']['document_id'] for hit in response['hits']['hits']]
+    
+    def msearch_documents(self, searches: List[Tuple[List[float], Optional[str], int]]) -> List[Union[List[str], Exception]]:
+        """(임베딩, assistant_id, size) 문서 검색 여러 개를 _msearch 한 번으로 실행"""
+        if not searches:
+            return []
+        body = []
+        for query_embedding, assistant_id, size in searches:
+            body.append({"index": self.documents_index})
+            body.append(self._build_document_query(query_embedding, assistant_id, size))
         
-        response = self.client.search(index=self.index_name, body=query)
-        return response['hits']['hits']
-
+        with self._request("msearch"):
+            response = self.client.msearch(body=body)
+        results = []
+        for item in response['responses']:
+            if 'error' in item:
+                error = item['error']
+                if isinstance(error, dict) and error.get('type') == 'index_not_found_exception':
+                    results.append([])
+                else:
+                    results.append(RuntimeError(f"OpenSearch document search failed: {error}"))
+            else:
+                results.append([hit['_source']['document_id'] for hit in item['hits']['hits']])
+        return results
     
-    def get_assistants(self, organization: str = None) -> List[str]:
+    def _build_knn_query(self, query_embedding: List[float], assistant_id: str = None, size: int = 20,
+                         document_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        filtered = bool(assistant_id or document_ids)
         query = {
-            "aggs": {
-                "assistants": {
-                    "terms": {
-                        "field": "assistant_id",
-                        "size": 100
-                    }
+            "size": size,
+            "query": {
+                "bool": {
+                    "must": [
+                        {
+                            "knn": {
+                                "embedding": {
+                                    "vector": query_embedding,
+                                    "k": self.profile.candidate_k(size, filtered=filtered)
+                                }
+                            }
+                        }
+                    ]
                 }
             },
-            "size": 0
+            "_source": ["content", "document_title", "page_number", "chunk_index", "tags", "organization", "document_type", "assistant_id"]
         }
         
-        # 조직별 필터 추가
-        if organization:
-            query["query"] = {
-                "term": {
-                    "organization": organization
-                }
-            }
+        # 라우팅/조직 인덱스로 대상을 좁혀도 같은 샤드·인덱스의 다른 어시스턴트는 필터로 제외
+        filters = []
+        if assistant_id:
+            filters.append({"term": {"assistant_id": assistant_id}})
+        if document_ids:
+            # 2단계 검색: 1단계에서 고른 문서의 청크만
+            filters.append({"terms": {"document_id": list(document_ids)}})
+        if filters:
+            query["query"]["bool"]["filter"] = filters
+        return query
+    
+    def search_similar_chunks(self, query_embedding: List[float], assistant_id: str = None, size: int = 20,
+                              document_ids: Optional[List[str]] = None) -> List[Dict]:
+        query = self._build_knn_query(query_embedding, assistant_id, size, document_ids)
+        index_name, routing = self._search_target(assistant_id)
+        params = {"routing": routing} if routing else {}
+        with self._request("search"):
+            response = self.client.search(index=index_name, body=query, **params)
+        return response['hits']['hits']
+    
+    def msearch_similar_chunks(self, searches: List[Tuple]) -> List[Union[List[Dict], Exception]]:
+        """(임베딩, assistant_id, size[, document_ids]) 검색 여러 개를 _msearch 한 번으로 실행
         
-        response = self.client.search(index=self.index_name, body=query)
-        assistants = []
-        if 'aggregations' in response and 'assistants' in response['aggregations']:
-            for bucket in response['aggregations']['assistants']['buckets']:
-                assistants.append(bucket['key'])
+        결과는 요청 순서대로 hits 리스트이며, 실패한 검색은 예외 객체로 채워집니다.
+        """
+        if not searches:
+            return []
+        body = []
+        for query_embedding, assistant_id, size, *rest in searches:
+            index_name, routing = self._search_target(assistant_id)
+            header = {"index": index_name}
+            if routing:
+                header["routing"] = routing
+            body.append(header)
+            body.append(self._build_knn_query(query_embedding, assistant_id, size, rest[0] if rest else None))
+        
+        with self._request("msearch"):
+            response = self.client.msearch(body=body)
+        results = []
+        for item in response['responses']:
+            if 'error' in item:
+                results.append(RuntimeError(f"OpenSearch search failed: {item['error']}"))
+            else:
+                results.append(item['hits']['hits'])
+        return results
+    
+    
+    def get_chunk(self, chunk_id: str) -> Dict[str, Any]:
+        """청크 하나를 ID로 조회 (임베딩 제외)"""
+        if self.placement == "shared":
+            with self._request("get"):
+                response = self.client.get(
+                    index=self.index_name,
+                    id=chunk_id,
+                    _source_excludes=["embedding"]
+                )
+            return {"chunk_id": response['_id'], **response['_source']}
+        
+        # routing/org_index 배치에서는 샤드나 인덱스를 모르므로 ID 검색으로 조회
+        with self._request("get"):
+            response = self.client.search(
+                index=self.search_index,
+                body={"size": 1, "query": {"ids": {"values": [chunk_id]}}, "_source": {"excludes": ["embedding"]}}
+            )
+        hits = response['hits']['hits']
+        if not hits:
+            raise NotFoundError(404, "not_found", {"_id": chunk_id})
+        return {"chunk_id": hits[0]['_id'], **hits[0]['_source']}
+    
+    def _composite_buckets(self, sources: List[Dict[str, Any]], aggs: Optional[Dict[str, Any]] = None,
+                           query: Optional[Dict[str, Any]] = None, page_size: int = 100) -> Iterator[Dict[str, Any]]:
+        """composite 집계 버킷을 after_key로 끝까지 페이지 조회"""
+        composite = {"size": page_size, "sources": sources}
+        body = {"size": 0, "aggs": {"buckets": {"composite": composite}}}
+        if aggs:
+            body["aggs"]["buckets"]["aggs"] = aggs
+        if query:
+            body["query"] = query
+        
+        while True:
+            with self._request("aggregation"):
+                response = self.client.search(index=self.search_index, body=body)
+            aggregation = response.get('aggregations', {}).get('buckets', {})
+            buckets = aggregation.get('buckets', [])
+            yield from buckets
+            after_key = aggregation.get('after_key')
+            if not buckets or not after_key:
+                return
+            composite["after"] = after_key
+    
+    def scan_chunks(self, fields: List[str], page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """모든 청크의 _source(fields만)를 document_id, chunk_index 순으로 search_after 페이지 조회"""
+        body = {
+            "size": page_size,
+            "_source": fields,
+            "query": {"match_all": {}},
+            "sort": [{"document_id": "asc"}, {"chunk_index": "asc"}]
+        }
+        while True:
+            with self._request("scan"):
+                response = self.client.search(index=self.search_index, body=body)
+            hits = response['hits']['hits']
+            for hit in hits:
+                yield hit['_source']
+            if len(hits) < page_size:
+                return
+            body["search_after"] = hits[-1]['sort']
+    
+    def get_assistant_stats(self, organization: str = None, page_size: int = 100) -> List[Dict[str, Any]]:
+        """어시스턴트별 청크/문서 수와 마지막 업로드 시각 (composite 집계를 끝까지 페이지 조회)"""
+        # 조직별 필터 추가
+        query = {"term": {"organization": organization}} if organization else None
         
-        return assistants
\ No newline at end of file
+        stats = []
+        buckets = self._composite_buckets(
+            sources=[{"assistant_id": {"terms": {"field": "assistant_id"}}}],
+            aggs={
+                "documents": {"cardinality": {"field": "document_id"}},
+                "last_upload": {"max": {"field": "upload_date"}}
+            },
+            query=query,
+            page_size=page_size
+        )
+        for bucket in buckets:
+            last_upload = bucket['last_upload']
+            stats.append({
+                "assistant_id": bucket['key']['assistant_id'],
+                "chunks": bucket['doc_count'],
+                "documents": bucket['documents']['value'],
+                "last_upload": last_upload.get('value_as_string', last_upload.get('value'))
+            })
+        return stats
+    
+    def get_assistants(self, organization: str = None) -> List[str]:
+        return [item["assistant_id"] for item in self.get_assistant_stats(organization)]
+    
+    def set_ef_search(self, ef_search: int):
+        """ef_search 변경 (nmslib/faiss는 동적 인덱스 설정, lucene은 이후 질의의 k에 반영)"""
+        self.profile.ef_search = ef_search
+        if self.profile.engine != "lucene":
+            self.client.indices.put_settings(
+                index=self.search_index,
+                body={"index": {"knn.algo_param.ef_search": ef_search}}
+            )
+    
+    def refresh(self):
+        self.client.indices.refresh(index=self.search_index)
+    
+    def delete_indices(self) -> List[str]:
+        """현재 배치 전략이 사용하는 인덱스를 모두 삭제하고 삭제한 이름 목록을 반환"""
+        if self.placement == "org_index":
+            # 와일드카드 삭제는 클러스터 설정(action.destructive_requires_name)에 따라 막힐 수 있어 이름을 조회 후 삭제
+            index_names = sorted(self.client.indices.get(index=self.search_index).keys())
+        elif self.client.indices.exists(index=self.index_name):
+            index_names = [self.index_name]
+        else:
+            index_names = []
+        if self.client.indices.exists(index=self.documents_index):
+            index_names.append(self.documents_index)
+        for index_name in index_names:
+            self.client.indices.delete(index=index_name)
+        with self._assistant_map_lock:
+            self._assistant_indices.clear()
+            self._assistant_map_loaded_at = 0.0
+        return index_names
+
+
+_shared_client: Optional[OpenSearchClient] = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> OpenSearchClient:
+    """API 프로세스 전체가 공유하는 클라이언트 (연결 풀 하나를 RAGService, 업로드, 어시스턴트 카탈로그가 함께 사용)"""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = OpenSearchClient()
+    return _shared_client
@@ -1,16 +1,37 @@
 import pdfplumber
 import PyPDF2
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import re
-from sentence_transformers import SentenceTransformer
 import uuid
+from collections import Counter
+
+import numpy as np
 from datetime import datetime
 
+from embedding_model import get_embedding_model
+from vector_projection import get_vector_codec
+import metrics
+from chunk_batch import ChunkBatch
+
 class PDFProcessor:
-    def __init__(self):
-        self.embedding_model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+    # 문서 단위 반복 머리말/꼬리말: 페이지 위/아래 몇 줄을 볼지, 몇 페이지 이상 반복되면 제거할지
+    REPEATED_LINE_ZONE = 3
+    REPEATED_LINE_MIN_PAGES = 3
+    # 문서 요약 벡터에서 제목 임베딩의 비중 (나머지는 청크 임베딩 평균)
+    DOCUMENT_TITLE_WEIGHT = 0.3
+    
+    def __init__(self, embedding_model=None):
+        # 추출/청킹만 하는 경우(대량 적재 워커 프로세스 등)에는 모델을 로드하지 않도록
+        # 첫 임베딩 시점에 공유 모델을 가져옴
+        self._embedding_model = embedding_model
     
-    def extract_text_from_pdf(self, pdf_file_path: str) -> Dict[str, Any]:
+    @property
+    def embedding_model(self):
+        if self._embedding_model is None:
+            self._embedding_model = get_embedding_model()
+        return self._embedding_model
+    
+    def extract_text_from_pdf(self, pdf_file_path: str, remove_repeated: bool = True) -> Dict[str, Any]:
         """PDF에서 텍스트를 추출하고 머리말/꼬리말을 제거"""
         pages_text = []
         
@@ -25,9 +46,14 @@ class PDFProcessor:
                             'content': cleaned_text
                         })
         
+        boilerplate = {'lines': 0, 'removed_chars': 0}
+        if remove_repeated:
+            pages_text, boilerplate = self.remove_repeated_lines(pages_text)
+        
         return {
             'pages': pages_text,
-            'total_pages': len(pages_text)
+            'total_pages': len(pages_text),
+            'boilerplate': boilerplate
         }
     
     def _remove_headers_footers(self, text: str, page_num: int) -> str:
@@ -62,6 +88,48 @@ class PDFProcessor:
         
         return '\n'.join(lines[start_idx:end_idx]).strip()
     
+    def remove_repeated_lines(self, pages_text: List[Dict]) -> Tuple[List[Dict], Dict[str, int]]:
+        """문서 전체에서 여러 페이지 위/아래에 반복되는 줄(장 제목, 기관명, 개정일 등) 제거
+        
+        페이지마다 위/아래 REPEATED_LINE_ZONE줄을 정규화(공백 통합, 숫자 → #)해 등장한 페이지 수를 세고,
+        REPEATED_LINE_MIN_PAGES 페이지 이상에 나오는 줄을 해당 영역에서 지웁니다.
+        """
+        if len(pages_text) < self.REPEATED_LINE_MIN_PAGES:
+            return pages_text, {'lines': 0, 'removed_chars': 0}
+        
+        page_counts = Counter()
+        for page_data in pages_text:
+            lines = [line for line in page_data['content'].split('\n') if line.strip()]
+            zone = self._edge_zone(len(lines))
+            page_counts.update({self._normalize_line(line) for line in lines[:zone] + lines[len(lines) - zone:]})
+        repeated = {line for line, count in page_counts.items() if count >= self.REPEATED_LINE_MIN_PAGES}
+        if not repeated:
+            return pages_text, {'lines': 0, 'removed_chars': 0}
+        
+        cleaned_pages = []
+        removed_chars = 0
+        for page_data in pages_text:
+            lines = page_data['content'].split('\n')
+            positions = [i for i, line in enumerate(lines) if line.strip()]
+            zone = self._edge_zone(len(positions))
+            edge = set(positions[:zone] + positions[len(positions) - zone:])
+            kept = [line for i, line in enumerate(lines) if i not in edge or self._normalize_line(line) not in repeated]
+            content = '\n'.join(kept).strip()
+            removed_chars += len(page_data['content']) - len(content)
+            if content:
+                cleaned_pages.append({**page_data, 'content': content})
+        
+        return cleaned_pages, {'lines': len(repeated), 'removed_chars': removed_chars}
+    
+    def _edge_zone(self, line_count: int) -> int:
+        # 짧은 페이지에서는 위/아래 영역이 본문 전체를 덮지 않도록 페이지의 1/3까지만 검사
+        return min(self.REPEATED_LINE_ZONE, line_count // 3)
+    
+    @staticmethod
+    def _normalize_line(line: str) -> str:
+        # 페이지 번호, 날짜처럼 페이지마다 달라지는 숫자는 같은 줄로 취급
+        return re.sub(r'\d+', '#', re.sub(r'\s+', ' ', line.strip()))
+    
     def chunk_text(self, pages_text: List[Dict], chunk_size: int = 1500, overlap: int = 200) -> List[Dict[str, Any]]:
         """텍스트를 청크로 분할"""
         chunks = []
@@ -108,62 +176,104 @@ class PDFProcessor:
         
         return chunks
     
-    def create_embeddings(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """청크에 대한 임베딩 생성"""
-        texts = [chunk['content'] for chunk in chunks]
-        embeddings = self.embedding_model.encode(texts)
+    @classmethod
+    def document_embedding(cls, title_embedding, chunk_embeddings) -> np.ndarray:
+        """문서 요약 벡터: 정규화한 청크 임베딩 평균과 제목 임베딩의 가중합 (모델 원본 공간)"""
+        def normalize(vectors):
+            norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+            return vectors / np.where(norms == 0, 1.0, norms)
         
-        for i, chunk in enumerate(chunks):
-            chunk['embedding'] = embeddings[i].tolist()
-        
-        return chunks
+        centroid = normalize(normalize(np.asarray(chunk_embeddings, dtype=np.float32)).mean(axis=0))
+        title = normalize(np.asarray(title_embedding, dtype=np.float32))
+        return normalize((1 - cls.DOCUMENT_TITLE_WEIGHT) * centroid + cls.DOCUMENT_TITLE_WEIGHT * title)
     
+    def embed_document(self, processed_data: Dict[str, Any], batch_size: int = 32) -> Dict[str, Any]:
+        """청크 임베딩과 문서 요약 벡터 생성 (제목도 청크와 같은 배치로 인코딩)"""
+        batch = processed_data['chunks']
+        if not len(batch):
+            return processed_data
+        summary = processed_data['summary']
+        embeddings = self.embedding_model.encode(batch.contents + [summary['document_title']], batch_size=batch_size)
+        
+        # 차원 축소/양자화는 요약 벡터를 원본 공간에서 계산한 뒤 적용
+        codec = get_vector_codec()
+        batch.embeddings = codec.encode(embeddings[:-1])
+        summary['embedding'] = codec.encode(self.document_embedding(embeddings[-1], embeddings[:-1])).tolist()
+        return processed_data
     
-    def process_pdf_for_storage(
-        self, 
-        pdf_file_path: str, 
+    def prepare_document(
+        self,
+        pdf_file_path: str,
         document_title: str,
         tags: List[str],
         organization: str,
         document_type: str,
-        assistant_id: str
+        assistant_id: str,
+        document_id: Optional[str] = None
     ) -> Dict[str, Any]:
-        """PDF를 처리하여 저장 준비"""
+        """PDF 텍스트 추출과 청킹, 메타데이터 추가 (임베딩 제외)"""
         
-        document_id = str(uuid.uuid4())
+        document_id = document_id or str(uuid.uuid4())
         
         # 1. PDF에서 텍스트 추출
-        extracted_data = self.extract_text_from_pdf(pdf_file_path)
-        
-        # 2. 텍스트 청킹
-        chunks = self.chunk_text(extracted_data['pages'])
-        
-        # 3. 임베딩 생성
-        chunks_with_embeddings = self.create_embeddings(chunks)
-        
-        # 4. 메타데이터 추가
-        processed_chunks = []
-        for chunk in chunks_with_embeddings:
-            chunk_data = {
-                'document_id': document_id,
-                'document_title': document_title,
-                'content': chunk['content'],
-                'embedding': chunk['embedding'],
-                'page_number': chunk['page_number'],
-                'chunk_index': chunk['chunk_index'],
-                'tags': tags,
-                'organization': organization,
-                'document_type': document_type,
-                'assistant_id': assistant_id,
-                'upload_date': datetime.now().isoformat(),
-                'start_char': chunk['start_char'],
-                'end_char': chunk['end_char']
-            }
-            processed_chunks.append(chunk_data)
+        with metrics.span("ingest", "extract"):
+            extracted_data = self.extract_text_from_pdf(pdf_file_path, remove_repeated=False)
+        
+        # 2. 문서 전체에서 반복되는 머리말/꼬리말 제거
+        with metrics.span("ingest", "boilerplate"):
+            pages, boilerplate = self.remove_repeated_lines(extracted_data['pages'])
+        
+        # 3. 텍스트 청킹
+        with metrics.span("ingest", "chunk"):
+            chunks = self.chunk_text(pages)
+        if boilerplate['removed_chars']:
+            # 제거하지 않았을 때와 비교해 줄어든 청크 수 (청킹은 문자열 연산뿐이라 비용이 작음)
+            boilerplate['saved_chunks'] = len(self.chunk_text(extracted_data['pages'])) - len(chunks)
+            print(f"Removed {boilerplate['lines']} repeated header/footer lines from {document_title}: "
+                  f"{boilerplate['removed_chars']} chars, {boilerplate['saved_chunks']} chunks saved")
+        else:
+            boilerplate['saved_chunks'] = 0
+        
+        # 4. 메타데이터 추가 (문서당 하나를 모든 청크가 공유)
+        metadata = {
+            'document_id': document_id,
+            'document_title': document_title,
+            'tags': tags,
+            'organization': organization,
+            'document_type': document_type,
+            'assistant_id': assistant_id,
+            'upload_date': datetime.now().isoformat()
+        }
+        processed_chunks = ChunkBatch.from_chunks(metadata, chunks)
+        
+        # 2단계 검색용 문서 요약 (임베딩은 embed_document에서 추가)
+        summary = {**metadata, 'chunks': len(processed_chunks)}
         
         return {
             'document_id': document_id,
             'total_chunks': len(processed_chunks),
             'total_pages': extracted_data['total_pages'],
+            'boilerplate': boilerplate,
+            'summary': summary,
             'chunks': processed_chunks
-        }
\ No newline at end of file
+        }
+    
+    def process_pdf_for_storage(
+        self, 
+        pdf_file_path: str, 
+        document_title: str,
+        tags: List[str],
+        organization: str,
+        document_type: str,
+        assistant_id: str
+    ) -> Dict[str, Any]:
+        """PDF를 처리하여 저장 준비"""
+        processed_data = self.prepare_document(
+            pdf_file_path, document_title, tags, organization, document_type, assistant_id
+        )
+        
+        # 5. 임베딩 생성
+        with metrics.span("ingest", "embed"):
+            self.embed_document(processed_data)
+        
+        return processed_data
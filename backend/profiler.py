@@ -0,0 +1,238 @@
+"""운영 중 온디맨드 프로파일링 (cProfile + tracemalloc)
+
+관리자 API로 세션을 시작하면 지정한 라우트의 다음 N개 요청(또는 sample_rate 비율의 요청)을
+cProfile로 측정하고, 요청 전후 tracemalloc 스냅샷 차이로 메모리 할당 위치를 집계합니다.
+  - 세션이 없을 때는 라우트 이름 비교 한 번뿐이라 오버헤드가 없음
+  - cProfile은 스레드 단위이므로 작업을 실행하는 함수 안에서 켜고, 동시에 한 요청만 측정
+  - tracemalloc은 프로세스 전체 할당을 추적하므로 동시에 처리 중인 다른 요청의 할당이 섞일 수 있음
+
+사용법:
+    with profiler.profile("query"):
+        response = rag_service.get_answer(...)
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+ROUTES = ("query", "upload")
+
+_lock = threading.Lock()
+_session: Optional["ProfilingSession"] = None
+# 한 번에 한 요청만 측정 (다른 스레드의 요청은 측정하지 않고 그대로 처리)
+_running = threading.Lock()
+
+
+class ProfilingSession:
+    def __init__(self, route: str, requests: Optional[int] = None, sample_rate: Optional[float] = None,
+                 memory: bool = True, ttl_seconds: int = 600):
+        self.route = route
+        self.requests = requests
+        self.sample_rate = sample_rate
+        self.memory = memory
+        self.ttl_seconds = ttl_seconds
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.profiled = 0
+        self.skipped = 0
+        self._pending = 0
+        self.wall_seconds: List[float] = []
+        self.allocations: Counter = Counter()
+        self.allocation_blocks: Counter = Counter()
+        self._stats: Optional[pstats.Stats] = None
+        self._owns_tracemalloc = False
+        self._lock = threading.Lock()
+
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        # 요청이 더 오지 않아도 TTL이 지나면 종료 (tracemalloc이 계속 켜져 있지 않도록)
+        self._expiry = threading.Timer(ttl_seconds, self._expire)
+        self._expiry.daemon = True
+        self._expiry.start()
+
+    @property
+    def active(self) -> bool:
+        return self.finished_at is None and time.time() - self.started_at < self.ttl_seconds
+
+    def claim(self) -> bool:
+        """이번 요청을 측정할지 결정"""
+        with self._lock:
+            if not self.active:
+                self.finish()
+                return False
+            if self.sample_rate is not None:
+                return random.random() < self.sample_rate
+            if self.profiled + self._pending >= self.requests:
+                return False
+            self._pending += 1
+            return True
+
+    def record(self, profile: cProfile.Profile, elapsed: float, allocations: Dict[str, Tuple[int, int]]) -> None:
+        with self._lock:
+            if self.sample_rate is None:
+                self._pending -= 1
+            self.profiled += 1
+            self.wall_seconds.append(elapsed)
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            for site, (size, count) in allocations.items():
+                self.allocations[site] += size
+                self.allocation_blocks[site] += count
+            if self.requests is not None and self.profiled >= self.requests:
+                self.finish()
+
+    def _expire(self) -> None:
+        with self._lock:
+            self.finish()
+
+    def finish(self) -> None:
+        self._expiry.cancel()
+        if self.finished_at is None:
+            self.finished_at = time.time()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+    def stats_text(self, sort: str = "cumulative", limit: int = 50) -> str:
+        with self._lock:
+            if self._stats is None:
+                return "No profiled requests yet\n"
+            stream = io.StringIO()
+            self._stats.stream = stream
+            self._stats.sort_stats(sort).print_stats(limit)
+            return stream.getvalue()
+
+    def stats_dump(self) -> Optional[bytes]:
+        """pstats 바이너리 (snakeviz, python -m pstats로 열람)"""
+        with self._lock:
+            if self._stats is None:
+                return None
+            fd, path = tempfile.mkstemp(suffix=".prof")
+            os.close(fd)
+            try:
+                self._stats.dump_stats(path)
+                with open(path, "rb") as f:
+                    return f.read()
+            finally:
+                os.unlink(path)
+
+    def top_allocations(self, limit: int = 25) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"site": site, "bytes": size, "blocks": self.allocation_blocks[site]}
+                for site, size in self.allocations.most_common(limit)
+            ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            wall = sorted(self.wall_seconds)
+            return {
+                "route": self.route,
+                "requests": self.requests,
+                "sample_rate": self.sample_rate,
+                "memory": self.memory,
+                "active": self.active,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "profiled": self.profiled,
+                "skipped_busy": self.skipped,
+                "wall_ms_max": round(wall[-1] * 1000, 2) if wall else None,
+                "wall_ms_mean": round(sum(wall) / len(wall) * 1000, 2) if wall else None,
+            }
+
+
+class _NotProfiled:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOT_PROFILED = _NotProfiled()
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+class _ProfiledRequest:
+    def __init__(self, session: ProfilingSession):
+        self.session = session
+        self.profile: Optional[cProfile.Profile] = None
+
+    def __enter__(self):
+        if not _running.acquire(blocking=False):
+            with self.session._lock:
+                self.session.skipped += 1
+            return None
+        if not self.session.claim():
+            _running.release()
+            return None
+        self.before = tracemalloc.take_snapshot() if self.session.memory and tracemalloc.is_tracing() else None
+        self.start = time.perf_counter()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return self.profile
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile is None:
+            return False
+        try:
+            self.profile.disable()
+            elapsed = time.perf_counter() - self.start
+            allocations = {}
+            if self.before is not None and tracemalloc.is_tracing():
+                after = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+                for stat in after.compare_to(self.before.filter_traces(_SNAPSHOT_FILTERS), "lineno"):
+                    if stat.size_diff > 0:
+                        allocations[str(stat.traceback[0])] = (stat.size_diff, stat.count_diff)
+            self.session.record(self.profile, elapsed, allocations)
+        finally:
+            _running.release()
+        return False
+
+
+def profile(route: str):
+    """route 요청을 감싸는 컨텍스트 (해당 라우트 세션이 없으면 아무것도 하지 않음)"""
+    session = _session
+    if session is None or session.route != route or not session.active:
+        return _NOT_PROFILED
+    return _ProfiledRequest(session)
+
+
+def start(route: str, requests: Optional[int] = None, sample_rate: Optional[float] = None,
+          memory: bool = True, ttl_seconds: int = 600) -> ProfilingSession:
+    """새 세션 시작 (이전 세션과 결과는 버림)"""
+    global _session
+    if route not in ROUTES:
+        raise ValueError(f"Unknown profiling route: {route} (expected one of {', '.join(ROUTES)})")
+    with _lock:
+        if _session is not None:
+            _session.finish()
+        _session = ProfilingSession(route, requests, sample_rate, memory, ttl_seconds)
+        return _session
+
+
+def stop() -> Optional[ProfilingSession]:
+    """측정을 멈춤 (결과는 다음 start 전까지 조회 가능)"""
+    with _lock:
+        if _session is not None:
+            _session.finish()
+        return _session
+
+
+def current() -> Optional[ProfilingSession]:
+    return _session
@@ -1,61 +1,212 @@
-import openai
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 import os
 import re
-from sentence_transformers import SentenceTransformer
-from opensearch_client import OpenSearchClient
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from opensearch_client import OpenSearchClient, get_shared_client
+from embedding_model import get_embedding_model
+from vector_projection import get_vector_codec
+import metrics
+from retrieval_cutoff import CutoffPolicy, estimate_tokens
+from llm_gateway import get_llm_gateway
+import comparison
+import keyword_matcher
+from keyword_extractor import get_keyword_extractor
+
+# 정적 사전과 정규식은 모듈 로드 시 한 번만 생성
+# 불용어 목록 (한국어) - 더 포괄적으로 구성
+STOP_WORDS = frozenset({
+    '은', '는', '이', '가', '을', '를', '에', '에서', '와', '과', '의', '로', '으로', '도',
+    '하다', '있다', '되다', '한다', '된다', '한', '할', '해', '하는', '하고', '하며',
+    '무엇', '어떤', '어떻게', '왜', '언제', '어디서', '누가', '얼마나', '어디',
+    '대해', '대한', '관련', '관하여', '대하여', '무엇인지', '그', '저', '제',
+    '알려주세요', '설명해주세요', '가르쳐주세요', '말해주세요', '알려줘', '설명해줘',
+    '그리고', '또한', '그런데', '하지만', '그러나', '따라서', '그래서',
+    '작성하나요', '작성해주세요', '해주세요', '알고', '싶습니다', '합니다', '인가요',
+    '있나요', '있습니까', '합니까', '주세요', '해', '줘'
+})
+
+# 키워드 끝에서 제거할 조사
+JOSA_SUFFIXES = ('는', '은', '를', '을', '가', '이', '에서', '에게', '으로', '로', '와', '과')
+
+# 파일명 키워드 추출용 패턴
+FILENAME_KEYWORD_PATTERNS = {
+    '학사운영위원회': ['학사운영위원회', '학사운영', '운영위원회', '학사', '위원회'],
+    '규정': ['규정'],
+    '개정': ['개정'],
+    '제정': ['제정'],
+    '지침': ['지침'],
+    '세칙': ['세칙'],
+    '학사': ['학사'],
+    '입학': ['입학'],
+    '졸업': ['졸업'],
+    '장학': ['장학'],
+    '연구': ['연구'],
+    '총무': ['총무'],
+    '교무': ['교무'],
+    '학생': ['학생'],
+    '대학원': ['대학원'],
+    '전북대': ['전북대학교', '전북대'],
+    '전북대학교': ['전북대학교', '전북대'],
+}
+
+# 일반적인 학사 관련 짧은 질의 확장 패턴
+QUERY_EXPANSION_PATTERNS = {
+    # 학사 관련
+    '휴학': '휴학 신청 방법 절차 조건',
+    '복학': '복학 신청 방법 절차 조건',
+    '등록': '등록금 납부 방법 기간',
+    '수강': '수강신청 방법 절차 기간',
+    '졸업': '졸업 요건 조건 절차',
+    '학점': '학점 이수 요건 조건',
+    '성적': '성적 평가 기준 방법',
+    '장학금': '장학금 신청 방법 조건',
+    '전과': '전과 신청 방법 조건',
+    '부전공': '부전공 신청 방법 조건',
+    '복수전공': '복수전공 신청 방법 조건',
+    '학사경고': '학사경고 기준 조치',
+    '계절학기': '계절학기 신청 방법',
+    '교환학생': '교환학생 신청 방법',
+    
+    # 행정 관련
+    '등록증명서': '등록증명서 발급 방법',
+    '재학증명서': '재학증명서 발급 방법',
+    '성적증명서': '성적증명서 발급 방법',
+    '졸업증명서': '졸업증명서 발급 방법',
+    
+    # 기타
+    '기숙사': '기숙사 신청 방법 조건',
+    '도서관': '도서관 이용 방법 시간'
+}
+
+# 비교 질문 판별 키워드 (get_answer용 / 개별 응답 비교표용)
+COMPARISON_KEYWORDS = ("비교", "차이", "다른점", "구별", "표", "분석", "대조", "vs", "versus", "비교분석")
+COMPARISON_REQUEST_KEYWORDS = COMPARISON_KEYWORDS + ("항목별로", "항목별", "항목으로", "구분하여", "나누어")
+
+# 비교 질문을 개별 질문으로 바꿀 때 제거할 패턴
+COMPARISON_REMOVAL_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'을?\s*항목별로\s*비교해?[달라|줘]?',
+    r'를?\s*항목별로\s*비교해?[달라|줘]?',
+    r'을?\s*비교해?[달라|줘]?',
+    r'를?\s*비교해?[달라|줘]?',
+    r'항목별로\s*',
+    r'비교해?[달라|줘]?',
+    r'차이점?을?\s*',
+    r'다른점?을?\s*',
+    r'구별해?[달라|줘]?',
+    r'분석해?[달라|줘]?',
+    r'대조해?[달라|줘]?'
+))
+
+PUNCTUATION_RE = re.compile(r'[?!.,;:]')
+HANGUL_RE = re.compile(r'[가-힣]')
+WHITESPACE_RE = re.compile(r'\s+')
+FILE_EXTENSION_RE = re.compile(r'\.(pdf|hwp|docx?|txt)$', re.IGNORECASE)
+DATE_RE = re.compile(r'\d{4}\.\d{1,2}\.\d{1,2}')
+FILENAME_SEPARATOR_RE = re.compile(r'[_\-\(\)\[\]{}]')
+
+def compact_sources(sources: List[Dict[str, Any]], keywords: List[str], preview_chars: int) -> List[Dict[str, Any]]:
+    """출처를 미리보기 + 하이라이트 구간(offset) 형태로 축약합니다.
+    
+    highlighted_content 사본 대신 content 기준 [start, end] 구간을 반환하고,
+    전체 청크는 /chunks/{chunk_id}로 조회합니다.
+    """
+    compact = []
+    for source in sources:
+        content = source.get('content', '')
+        preview = content[:preview_chars]
+        highlights = [
+            [start, min(end, len(preview))]
+            for start, end in keyword_matcher.find_spans(content, keywords)
+            if start < len(preview)
+        ]
+        compact.append({
+            "chunk_id": source.get('chunk_id'),
+            "document_title": source.get('document_title'),
+            "page_number": source.get('page_number'),
+            "chunk_index": source.get('chunk_index'),
+            "relevance_score": source.get('relevance_score'),
+            "preview": preview,
+            "content_length": len(content),
+            "truncated": len(content) > len(preview),
+            "highlights": highlights
+        })
+    return compact
+
+def compact_response(response: Dict[str, Any], preview_chars: int = 300) -> Dict[str, Any]:
+    """/query 응답의 모든 출처 목록을 compact_sources 형태로 변환"""
+    if 'sources' in response:
+        response['sources'] = compact_sources(response['sources'], response.get('keywords', []), preview_chars)
+    for individual in response.get('individual_responses', []):
+        individual['sources'] = compact_sources(
+            individual.get('sources', []), individual.get('keywords', []), preview_chars
+        )
+    return response
 
 class RAGService:
-    def __init__(self):
-        # OpenAI API 키가 있는 경우에만 클라이언트 초기화
+    def __init__(self, opensearch_client: Optional[OpenSearchClient] = None, embedding_model=None):
+        # OpenAI API 키가 있는 경우에만 클라이언트 초기화 (모든 호출은 공용 LLM 게이트웨이 경유)
         api_key = os.getenv("OPENAI_API_KEY")
         if api_key and api_key != "sk-proj-your-actual-api-key-here":
-            self.openai_client = openai.OpenAI(api_key=api_key)
+            self.llm = get_llm_gateway(api_key)
+            self.openai_client = self.llm.client
         else:
+            self.llm = None
             self.openai_client = None
         
-        # SentenceTransformer 초기화 (키워드 추출에는 OpenSearch 불필요)
-        try:
-            self.embedding_model = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
-        except Exception as e:
-            print(f"Warning: Embedding model initialization failed: {e}")
-            self.embedding_model = None
+        # 임베딩 모델 초기화 (EMBEDDING_BACKEND 설정에 따라 fp32/int8, PDFProcessor와 공유)
+        self.embedding_model = embedding_model
+        if self.embedding_model is None:
+            try:
+                self.embedding_model = get_embedding_model()
+            except Exception as e:
+                print(f"Warning: Embedding model initialization failed: {e}")
+                self.embedding_model = None
         
-        # OpenSearch 클라이언트는 선택적으로 초기화
-        try:
-            self.opensearch_client = OpenSearchClient()
-        except Exception as e:
-            print(f"Warning: OpenSearch client initialization failed: {e}")
-            self.opensearch_client = None
+        # 문서 색인과 같은 차원 축소/양자화를 질의 임베딩에도 적용 (VECTOR_PROJECTION_PATH, VECTOR_ENCODING)
+        self.vector_codec = get_vector_codec()
+        
+        # 2단계 검색: 문서 요약 인덱스에서 질문과 가까운 문서를 먼저 고르고 그 문서들의 청크만 kNN 검색
+        # (요약 벡터는 적재 시 생성되므로 기존 문서는 다시 적재한 뒤 켜야 함)
+        self.two_stage_retrieval = os.getenv("RETRIEVAL_TWO_STAGE", "false").lower() in ("1", "true", "yes")
+        self.top_documents = int(os.getenv("RETRIEVAL_TOP_DOCUMENTS", "5"))
+        
+        # 적응형 컷오프: 검색 결과의 점수 분포로 GPT에 보낼 청크 수 결정 (RETRIEVAL_CUTOFF)
+        self.cutoff = CutoffPolicy.from_env()
+        
+        # 비교 질문: 어시스턴트별 답변과 비교표를 LLM 호출 한 번으로 생성 (false면 답변 N회 + 비교표 1회)
+        self.single_pass_comparison = os.getenv("COMPARISON_SINGLE_PASS", "true").lower() in ("1", "true", "yes")
+        # 한 프롬프트에 모든 어시스턴트의 근거가 들어가므로 청크당 길이를 따로 제한
+        self.comparison_content_limit = int(os.getenv("COMPARISON_CONTENT_LIMIT", "600"))
+        
+        # 문서 제목 키워드: 코퍼스 통계로 추출하고 신뢰도가 낮을 때만 GPT 사용 (KEYWORD_LLM_FALLBACK=false면 GPT 미사용)
+        self.keyword_extractor = get_keyword_extractor()
+        self.keyword_llm_fallback = os.getenv("KEYWORD_LLM_FALLBACK", "true").lower() in ("1", "true", "yes")
+        
+        # OpenSearch 클라이언트는 선택적으로 초기화 (주입된 클라이언트가 없으면 프로세스 공용 클라이언트)
+        self.opensearch_client = opensearch_client
+        if self.opensearch_client is None:
+            try:
+                self.opensearch_client = get_shared_client()
+            except Exception as e:
+                print(f"Warning: OpenSearch client initialization failed: {e}")
+                self.opensearch_client = None
     
     def _extract_keywords_from_question(self, question: str) -> List[str]:
         """질문에서 핵심 키워드를 추출합니다."""
-        # 불용어 목록 (한국어) - 더 포괄적으로 구성
-        stop_words = {
-            '은', '는', '이', '가', '을', '를', '에', '에서', '와', '과', '의', '로', '으로', '도',
-            '하다', '있다', '되다', '한다', '된다', '한', '할', '해', '하는', '하고', '하며',
-            '무엇', '어떤', '어떻게', '왜', '언제', '어디서', '누가', '얼마나', '어디',
-            '대해', '대한', '관련', '관하여', '대하여', '무엇인지', '그', '저', '제',
-            '알려주세요', '설명해주세요', '가르쳐주세요', '말해주세요', '알려줘', '설명해줘',
-            '그리고', '또한', '그런데', '하지만', '그러나', '따라서', '그래서',
-            '작성하나요', '작성해주세요', '해주세요', '알고', '싶습니다', '합니다', '인가요',
-            '있나요', '있습니까', '합니까', '주세요', '해', '줘'
-        }
-        
         # 특수문자와 물음표 제거
-        cleaned_question = re.sub(r'[?!.,;:]', '', question)
+        cleaned_question = PUNCTUATION_RE.sub('', question)
         words = cleaned_question.split()
         
         # 키워드 추출 및 조사 제거
         keywords = []
         for word in words:
             # 불용어가 아니고, 2글자 이상이고, 한글이 포함된 단어
-            if (word not in stop_words and 
+            if (word not in STOP_WORDS and 
                 len(word) >= 2 and 
-                re.search(r'[가-힣]', word)):
+                HANGUL_RE.search(word)):
                 # 조사 제거 ('는', '은', '를', '을', '가', '이' 등)
                 cleaned_word = word
-                for suffix in ['는', '은', '를', '을', '가', '이', '에서', '에게', '으로', '로', '와', '과']:
+                for suffix in JOSA_SUFFIXES:
                     if word.endswith(suffix) and len(word) > len(suffix):
                         cleaned_word = word[:-len(suffix)]
                         break
@@ -68,39 +219,18 @@ class RAGService:
     def _extract_keywords_from_filename(self, filename: str) -> List[str]:
         """파일명에서 키워드를 추출합니다."""
         # 파일 확장자 제거
-        clean_filename = re.sub(r'\.(pdf|hwp|docx?|txt)$', '', filename, flags=re.IGNORECASE)
+        clean_filename = FILE_EXTENSION_RE.sub('', filename)
         
         # 날짜 패턴 제거 (2025.08.01 형식)
-        clean_filename = re.sub(r'\d{4}\.\d{1,2}\.\d{1,2}', '', clean_filename)
+        clean_filename = DATE_RE.sub('', clean_filename)
         
         # 특수문자를 공백으로 변경
-        clean_filename = re.sub(r'[_\-\(\)\[\]{}]', ' ', clean_filename)
+        clean_filename = FILENAME_SEPARATOR_RE.sub(' ', clean_filename)
         
         keywords = []
         
-        # 미리 정의된 패턴 매칭
-        patterns = {
-            '학사운영위원회': ['학사운영위원회', '학사운영', '운영위원회', '학사', '위원회'],
-            '규정': ['규정'],
-            '개정': ['개정'],
-            '제정': ['제정'],
-            '지침': ['지침'],
-            '세칙': ['세칙'],
-            '학사': ['학사'],
-            '입학': ['입학'],
-            '졸업': ['졸업'],
-            '장학': ['장학'],
-            '연구': ['연구'],
-            '총무': ['총무'],
-            '교무': ['교무'],
-            '학생': ['학생'],
-            '대학원': ['대학원'],
-            '전북대': ['전북대학교', '전북대'],
-            '전북대학교': ['전북대학교', '전북대'],
-        }
-        
         # 패턴 매칭으로 키워드 추출
-        for pattern, related_keywords in patterns.items():
+        for pattern, related_keywords in FILENAME_KEYWORD_PATTERNS.items():
             if pattern in clean_filename:
                 keywords.extend(related_keywords)
         
@@ -108,7 +238,7 @@ class RAGService:
         words = clean_filename.split()
         for word in words:
             word = word.strip()
-            if len(word) >= 2 and re.search(r'[가-힣]', word):
+            if len(word) >= 2 and HANGUL_RE.search(word):
                 if word not in keywords:
                     keywords.append(word)
         
@@ -118,8 +248,25 @@ class RAGService:
         
         return unique_keywords[:8]  # 상위 8개만 반환
     
+    def extract_keywords(self, text: str) -> Dict[str, Any]:
+        """문서 제목에서 키워드 추출: 로컬 코퍼스 통계 → (신뢰도가 낮으면) GPT → 파일명 패턴"""
+        local = {"keywords": [], "confidence": 0.0}
+        if self.keyword_extractor is not None:
+            with metrics.span("keywords", "corpus_extraction"):
+                local = self.keyword_extractor.extract(text)
+            confident = local["confidence"] >= self.keyword_extractor.min_confidence
+            if local["keywords"] and (confident or not self.keyword_llm_fallback or self.llm is None):
+                return {**local, "source": "corpus"}
+        
+        keywords, source = self._extract_keywords_with_source(text)
+        return {"keywords": keywords, "confidence": local["confidence"], "source": source}
+    
     def extract_keywords_with_openai(self, text: str) -> List[str]:
         """OpenAI API를 사용하여 텍스트에서 한국어 키워드를 추출합니다."""
+        return self._extract_keywords_with_source(text)[0]
+    
+    def _extract_keywords_with_source(self, text: str) -> Tuple[List[str], str]:
+        """OpenAI 키워드 추출 결과와 실제 출처 ("openai" 또는 파일명 패턴으로 대체된 경우 "filename")"""
         
         system_prompt = """
 당신은 한국의 대학 행정 문서에서 키워드를 추출하는 전문가입니다.
@@ -149,19 +296,18 @@ class RAGService:
             # Check if OpenAI API key is configured
             if not os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY") == "sk-proj-your-actual-api-key-here":
                 # Fallback to filename extraction
-                return self._extract_keywords_from_filename(text)
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=500
-            )
+                return self._extract_keywords_from_filename(text), "filename"
             
-            result = response.choices[0].message.content.strip()
+            with metrics.span("keywords", "openai_completion"):
+                result = self.llm.complete(
+                    "extract_keywords",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.1,
+                    max_tokens=500
+                ).strip()
             
             # Parse JSON response
             import json
@@ -174,116 +320,170 @@ class RAGService:
                         for keyword in keywords 
                         if isinstance(keyword, str) and len(keyword.strip()) >= 2
                     ]
-                    return cleaned_keywords[:10]  # Limit to top 10 keywords
+                    return cleaned_keywords[:10], "openai"  # Limit to top 10 keywords
                 else:
                     # If not a list, fallback to filename extraction
-                    return self._extract_keywords_from_filename(text)
+                    return self._extract_keywords_from_filename(text), "filename"
             except json.JSONDecodeError:
                 # If JSON parsing fails, fallback to filename extraction
-                return self._extract_keywords_from_filename(text)
+                return self._extract_keywords_from_filename(text), "filename"
                 
         except Exception as e:
             print(f"OpenAI keyword extraction failed: {e}")
             # Fallback to filename extraction
-            return self._extract_keywords_from_filename(text)
+            return self._extract_keywords_from_filename(text), "filename"
     
     def _highlight_keywords(self, text: str, keywords: List[str]) -> str:
         """텍스트에서 키워드를 하이라이트합니다. 부분 매치와 유사 단어도 포함."""
         if not keywords:
             return text
         
-        highlighted_text = text
-        
-        for keyword in keywords:
-            # 1. 정확한 매치
-            if keyword in highlighted_text:
-                highlighted_text = re.sub(
-                    f'({re.escape(keyword)})', 
-                    r'<mark>\1</mark>', 
-                    highlighted_text, 
-                    flags=re.IGNORECASE
-                )
-            else:
-                # 2. 부분 매치 (2글자 이상일 때)
-                if len(keyword) >= 3:
-                    for i in range(len(keyword)-1):
-                        partial = keyword[i:i+2]
-                        if partial in highlighted_text and len(partial) >= 2:
-                            highlighted_text = re.sub(
-                                f'({re.escape(partial)})', 
-                                r'<mark>\1</mark>', 
-                                highlighted_text, 
-                                flags=re.IGNORECASE
-                            )
-                            break
-                
-                # 3. 관련 단어 매치
-                related_words = {
-                    '재학기간': ['재학', '학기', '기간', '수학'],
-                    '연장': ['연장', '연기', '기간'],
-                    '신청서': ['신청', '서류', '신청서', '허가']
-                }
-                
-                if keyword in related_words:
-                    for related in related_words[keyword]:
-                        if related in highlighted_text:
-                            highlighted_text = re.sub(
-                                f'({re.escape(related)})', 
-                                r'<mark>\1</mark>', 
-                                highlighted_text, 
-                                flags=re.IGNORECASE
-                            )
-        
-        # 중복 마크업 제거
-        highlighted_text = re.sub(r'<mark>(<mark>[^<]*</mark>)</mark>', r'\1', highlighted_text)
-        highlighted_text = re.sub(r'<mark><mark>([^<]*)</mark></mark>', r'<mark>\1</mark>', highlighted_text)
-        
-        return highlighted_text
+        # 정확한 매치, 부분 매치, 관련 단어 매치를 한 번의 스캔으로 처리 (겹치는 <mark> 없음)
+        return keyword_matcher.highlight(text, keywords)
     
-    def get_individual_answers(self, question: str, assistant_ids: List[str], summary_mode: bool = False) -> Dict[str, Any]:
-        """각 assistant별로 개별 응답을 생성하여 비교할 수 있도록 합니다."""
+    def get_individual_answers(self, question: str, assistant_ids: List[str], summary_mode: bool = False,
+                               highlight: bool = True) -> Dict[str, Any]:
+        """각 assistant별로 개별 응답을 생성하여 비교할 수 있도록 합니다.
+        
+        highlight: False면 출처의 highlighted_content를 만들지 않음 (compact 응답처럼 쓰지 않는 경우)
+        """
         individual_responses = []
-        all_keywords = set()
         
         # 비교 질문인 경우 개별 어시스턴트용 질문으로 변환
-        comparison_keywords = ["비교", "차이", "다른점", "구별", "표", "분석", "대조", "vs", "versus", "비교분석", "항목별로", "항목별", "항목으로", "구분하여", "나누어"]
-        is_comparison_question = any(keyword in question for keyword in comparison_keywords)
+        is_comparison_question = any(keyword in question for keyword in COMPARISON_REQUEST_KEYWORDS)
+        
+        if self._use_single_pass_comparison(is_comparison_question, assistant_ids):
+            result = self._get_comparison_answers(question, assistant_ids, summary_mode, highlight)
+            if result is not None:
+                return result
         
         for assistant_id in assistant_ids:
             try:
                 # 비교 질문인 경우 개별 검색용 질문으로 변환
-                if is_comparison_question:
-                    # "휴학 규정을 항목별로 비교해줘" -> "휴학 규정에 대해 알려줘"
-                    individual_question = self._convert_to_individual_question(question)
-                else:
-                    individual_question = question
-                    
-                response = self.get_answer(individual_question, assistant_id, summary_mode)
-                individual_responses.append({
-                    'assistant_id': assistant_id,
-                    'assistant_name': assistant_id,  # TODO: Get actual assistant name from DB
-                    'answer': response['answer'],
-                    'sources': response['sources'],
-                    'confidence': response['confidence'],
-                    'keywords': response['keywords']
-                })
-                # Collect all keywords
-                if 'keywords' in response:
-                    all_keywords.update(response['keywords'])
+                # "휴학 규정을 항목별로 비교해줘" -> "휴학 규정에 대해 알려줘"
+                individual_question = self._convert_to_individual_question(question) if is_comparison_question else question
+                response = self.get_answer(individual_question, assistant_id, summary_mode, highlight)
+                individual_responses.append(self._individual_entry(assistant_id, response))
+            except Exception as e:
+                individual_responses.append(self._individual_error_entry(assistant_id, e))
+        
+        return self._assemble_individual_answers(question, assistant_ids, individual_responses, is_comparison_question)
+    
+    def _use_single_pass_comparison(self, is_comparison_question: bool, assistant_ids: List[str]) -> bool:
+        return self.single_pass_comparison and is_comparison_question and self.llm is not None and len(assistant_ids) >= 2
+    
+    def _get_comparison_answers(self, question: str, assistant_ids: List[str], summary_mode: bool,
+                                highlight: bool = True) -> Optional[Dict[str, Any]]:
+        """비교 질문: 임베딩 1회, 어시스턴트별 검색은 _msearch 1회, 답변과 비교표는 LLM 호출 1회"""
+        individual_question = self._convert_to_individual_question(question)
+        plans = [self._plan_query(individual_question, aid, summary_mode, highlight) for aid in assistant_ids]
+        
+        with metrics.span("query", "embedding"):
+            question_embedding = self.vector_codec.encode(self.embedding_model.encode(plans[0]["question"])).tolist()
+        
+        searches = [(question_embedding, aid, size) for plan in plans for aid, size in plan["searches"]]
+        if self.two_stage_retrieval:
+            searches = self._restrict_to_top_documents(searches)
+        with metrics.span("query", "opensearch_msearch", detail=str(len(searches))):
+            try:
+                search_results = self.opensearch_client.msearch_similar_chunks(searches)
             except Exception as e:
-                individual_responses.append({
-                    'assistant_id': assistant_id,
-                    'assistant_name': assistant_id,
-                    'answer': f"죄송합니다. 이 어시스턴트에서 답변을 생성하는 중 오류가 발생했습니다: {str(e)}",
-                    'sources': [],
-                    'confidence': 0.0,
-                    'keywords': [],
-                    'error': str(e)
-                })
-        
-        # 비교 키워드 확인 및 자동 비교표 생성
-        comparison_keywords = ["비교", "차이", "다른점", "구별", "표", "분석", "대조", "vs", "versus", "비교분석", "항목별로", "항목별", "항목으로", "구분하여", "나누어"]
-        has_comparison = any(keyword in question for keyword in comparison_keywords)
+                search_results = [e] * len(searches)
+        
+        return self._compare_in_single_pass(question, assistant_ids, plans, [[result] for result in search_results])
+    
+    def _compare_in_single_pass(self, question: str, assistant_ids: List[str], plans: List[Dict[str, Any]],
+                                search_results: List[List]) -> Optional[Dict[str, Any]]:
+        """어시스턴트별 근거 청크로 답변과 비교표를 한 번에 생성 (실패하면 None → 기존 방식으로 처리)"""
+        entries = {}
+        evidence = {}
+        for assistant_id, plan, results in zip(assistant_ids, plans, search_results):
+            try:
+                similar_chunks = self._retrieve(plan, None, results)
+            except Exception as e:
+                entries[assistant_id] = self._individual_error_entry(assistant_id, e)
+                continue
+            sources = [self._source_entry(hit) for hit in similar_chunks]
+            if plan["highlight"]:
+                with metrics.span("query", "highlight"):
+                    for source in sources:
+                        source["highlighted_content"] = self._highlight_keywords(source["content"], plan["keywords"])
+            evidence[assistant_id] = sources
+        if not any(evidence.values()):
+            return None
+        
+        def parse(content: str) -> Dict[str, Any]:
+            result = comparison.parse_result(content, list(evidence))
+            missing = [aid for aid, sources in evidence.items() if sources and aid not in result["answers"]]
+            if missing:
+                raise ValueError(f"comparison response has no answer for {', '.join(missing)}")
+            return result
+        
+        content_limit = min(plans[0]["content_limit"], self.comparison_content_limit)
+        try:
+            with metrics.span("query", "comparison_completion", detail=str(len(evidence))):
+                # 형식이 맞지 않는 응답은 캐시에 저장되지 않도록 게이트웨이에서도 같은 검증을 거침
+                result = parse(self.llm.complete(
+                    "comparison",
+                    messages=comparison.build_messages(question, evidence, content_limit),
+                    temperature=0.2,
+                    max_tokens=min(3000, 600 + 500 * len(evidence)),
+                    validate=parse
+                ))
+        except ValueError:
+            metrics.COMPARISON_FALLBACKS.labels("invalid_response").inc()
+            return None
+        except Exception:
+            metrics.COMPARISON_FALLBACKS.labels("llm_error").inc()
+            return None
+        
+        for assistant_id, plan in zip(assistant_ids, plans):
+            if assistant_id not in evidence:
+                continue
+            sources = evidence[assistant_id]
+            response = {
+                "answer": result["answers"][assistant_id] if sources else "죄송합니다. 관련된 문서를 찾을 수 없습니다.",
+                "sources": sources,
+                "confidence": min(sources[0]["relevance_score"], 1.0) if sources else 0.0,
+                "keywords": plan["keywords"]
+            }
+            if "retrieval" in plan:
+                response["retrieval"] = plan["retrieval"]
+            entries[assistant_id] = self._individual_entry(assistant_id, response)
+        
+        comparison_table = comparison.render_table(list(evidence), result["rows"]) if result["rows"] else None
+        return self._assemble_individual_answers(
+            question, assistant_ids, [entries[aid] for aid in assistant_ids], True, comparison_table=comparison_table
+        )
+    
+    def _individual_entry(self, assistant_id: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'assistant_id': assistant_id,
+            'assistant_name': assistant_id,  # TODO: Get actual assistant name from DB
+            'answer': response['answer'],
+            'sources': response['sources'],
+            'confidence': response['confidence'],
+            'keywords': response['keywords'],
+            **({'retrieval': response['retrieval']} if 'retrieval' in response else {})
+        }
+    
+    def _individual_error_entry(self, assistant_id: str, error: Exception) -> Dict[str, Any]:
+        return {
+            'assistant_id': assistant_id,
+            'assistant_name': assistant_id,
+            'answer': f"죄송합니다. 이 어시스턴트에서 답변을 생성하는 중 오류가 발생했습니다: {str(error)}",
+            'sources': [],
+            'confidence': 0.0,
+            'keywords': [],
+            'error': str(error)
+        }
+    
+    def _assemble_individual_answers(self, question: str, assistant_ids: List[str], individual_responses: List[Dict],
+                                     is_comparison_question: bool, comparison_table: Optional[str] = None) -> Dict[str, Any]:
+        # Collect all keywords
+        all_keywords = set()
+        for response in individual_responses:
+            all_keywords.update(response.get('keywords', []))
         
         result = {
             'response_type': 'individual',
@@ -292,8 +492,11 @@ class RAGService:
             'keywords': list(all_keywords)
         }
         
+        # 단일 호출 비교에서 이미 만든 비교표
+        if comparison_table:
+            result['comparison_table'] = comparison_table
         # 비교 키워드가 있고 2개 이상의 어시스턴트가 있으면 비교표 생성
-        if has_comparison and len(assistant_ids) >= 2 and len(individual_responses) >= 2:
+        elif is_comparison_question and len(assistant_ids) >= 2 and len(individual_responses) >= 2:
             try:
                 comparison_table = self._generate_comparison_table(question, individual_responses)
                 if comparison_table:
@@ -306,29 +509,14 @@ class RAGService:
     def _convert_to_individual_question(self, question: str) -> str:
         """비교 질문을 개별 검색용 질문으로 변환합니다."""
         # 비교 관련 키워드 제거하고 핵심 주제만 추출
-        comparison_patterns = [
-            r'을?\s*항목별로\s*비교해?[달라|줘]?',
-            r'를?\s*항목별로\s*비교해?[달라|줘]?',
-            r'을?\s*비교해?[달라|줘]?',
-            r'를?\s*비교해?[달라|줘]?',
-            r'항목별로\s*',
-            r'비교해?[달라|줘]?',
-            r'차이점?을?\s*',
-            r'다른점?을?\s*',
-            r'구별해?[달라|줘]?',
-            r'분석해?[달라|줘]?',
-            r'대조해?[달라|줘]?'
-        ]
-        
-        import re
         converted_question = question
         
         # 패턴별로 제거
-        for pattern in comparison_patterns:
-            converted_question = re.sub(pattern, '', converted_question)
+        for pattern in COMPARISON_REMOVAL_PATTERNS:
+            converted_question = pattern.sub('', converted_question)
         
         # 공백 정리
-        converted_question = re.sub(r'\s+', ' ', converted_question).strip()
+        converted_question = WHITESPACE_RE.sub(' ', converted_question).strip()
         
         # 기본 질문 형태로 변환
         if not converted_question.endswith(('에 대해', '에 대해서', '에 관해', '에 관해서', '은?', '는?', '을?', '를?')):
@@ -343,37 +531,8 @@ class RAGService:
     
     def _expand_short_query(self, question: str) -> str:
         """짧은 질의를 확장하여 검색 품질 향상"""
-        # 일반적인 학사 관련 짧은 질의 확장 패턴
-        expansion_patterns = {
-            # 학사 관련
-            '휴학': '휴학 신청 방법 절차 조건',
-            '복학': '복학 신청 방법 절차 조건',
-            '등록': '등록금 납부 방법 기간',
-            '수강': '수강신청 방법 절차 기간',
-            '졸업': '졸업 요건 조건 절차',
-            '학점': '학점 이수 요건 조건',
-            '성적': '성적 평가 기준 방법',
-            '장학금': '장학금 신청 방법 조건',
-            '전과': '전과 신청 방법 조건',
-            '부전공': '부전공 신청 방법 조건',
-            '복수전공': '복수전공 신청 방법 조건',
-            '학사경고': '학사경고 기준 조치',
-            '계절학기': '계절학기 신청 방법',
-            '교환학생': '교환학생 신청 방법',
-            
-            # 행정 관련
-            '등록증명서': '등록증명서 발급 방법',
-            '재학증명서': '재학증명서 발급 방법',
-            '성적증명서': '성적증명서 발급 방법',
-            '졸업증명서': '졸업증명서 발급 방법',
-            
-            # 기타
-            '기숙사': '기숙사 신청 방법 조건',
-            '도서관': '도서관 이용 방법 시간'
-        }
-        
         # 키워드가 포함된 경우 확장
-        for keyword, expansion in expansion_patterns.items():
+        for keyword, expansion in QUERY_EXPANSION_PATTERNS.items():
             if keyword in question:
                 return f"{question} {expansion}"
         
@@ -431,23 +590,23 @@ class RAGService:
 
 비교표를 위 형식으로 정확히 작성해주세요."""
 
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "간결한 비교표를 만드는 전문가입니다."},
-                    {"role": "user", "content": comparison_prompt}
-                ],
-                temperature=0.2,
-                max_tokens=800
-            )
-            
-            return response.choices[0].message.content
+            with metrics.span("query", "comparison_table"):
+                return self.llm.complete(
+                    "comparison_table",
+                    messages=[
+                        {"role": "system", "content": "간결한 비교표를 만드는 전문가입니다."},
+                        {"role": "user", "content": comparison_prompt}
+                    ],
+                    temperature=0.2,
+                    max_tokens=800
+                )
             
         except Exception as e:
             print(f"비교표 생성 실패: {str(e)}")
             return None
     
-    def get_answer(self, question: str, assistant_id: Optional[str] = None, summary_mode: bool = False) -> Dict[str, Any]:
+    def _plan_query(self, question: str, assistant_id=None, summary_mode: bool = False, highlight: bool = True) -> Dict[str, Any]:
+        """질문 정규화/확장, 키워드 추출, 검색 크기 결정 (임베딩과 검색 이전 단계)"""
         # UTF-8 인코딩 문제 해결
         try:
             if isinstance(question, bytes):
@@ -461,23 +620,21 @@ class RAGService:
         
         # 0. 짧은 질의 확장 (3단어 이하인 경우)
         if len(question.split()) <= 3:
-            question = self._expand_short_query(question)
+            with metrics.span("query", "query_expansion"):
+                question = self._expand_short_query(question)
         
         # 1. 질문에서 키워드 추출
-        keywords = self._extract_keywords_from_question(question)
+        with metrics.span("query", "keyword_extraction"):
+            keywords = self._extract_keywords_from_question(question)
         
         # 2. 비교 모드 및 어시스턴트 조건 확인 (변수 초기화)
-        comparison_keywords = ["비교", "차이", "다른점", "구별", "표", "분석", "대조", "vs", "versus", "비교분석"]
-        has_comparison = any(keyword in question for keyword in comparison_keywords)
+        has_comparison = any(keyword in question for keyword in COMPARISON_KEYWORDS)
         multiple_assistants = isinstance(assistant_id, list) and len(assistant_id) > 1
         
         # 컨텍스트 길이 제한 설정 (비교 모드에서는 토큰 절약)
         content_limit = 300 if (summary_mode and has_comparison and multiple_assistants) else 1500
         
-        # 3. 질문을 임베딩으로 변환
-        question_embedding = self.embedding_model.encode(question).tolist()
-        
-        # 3. 벡터 검색으로 문서 청크 검색
+        # 3. 검색 크기 결정
         if summary_mode and has_comparison and multiple_assistants:
             search_size = 8  # 비교 모드
             assistant_search_size = 4  # 각 어시스턴트당
@@ -487,23 +644,128 @@ class RAGService:
         
         if isinstance(assistant_id, list):
             # 여러 어시스턴트에서 검색
-            all_chunks = []
-            for aid in assistant_id:
-                chunks = self.opensearch_client.search_similar_chunks(
-                    question_embedding,
-                    assistant_id=aid,
-                    size=assistant_search_size
-                )
-                all_chunks.extend(chunks)
-            # 점수순으로 정렬하고 선택
-            similar_chunks = sorted(all_chunks, key=lambda x: x['_score'], reverse=True)[:search_size]
+            searches = [(aid, assistant_search_size) for aid in assistant_id]
         else:
             # 단일 어시스턴트 또는 전체 검색
-            similar_chunks = self.opensearch_client.search_similar_chunks(
-                question_embedding, 
-                assistant_id=assistant_id,
-                size=search_size
-            )
+            searches = [(assistant_id, search_size)]
+        
+        return {
+            "question": question,
+            "assistant_id": assistant_id,
+            "summary_mode": summary_mode,
+            "keywords": keywords,
+            "has_comparison": has_comparison,
+            "multiple_assistants": multiple_assistants,
+            "content_limit": content_limit,
+            "search_size": search_size,
+            "searches": searches,
+            "highlight": highlight,
+        }
+    
+    def _retrieve(self, plan: Dict[str, Any], question_embedding: List[float], search_results: Optional[List] = None) -> List[Dict]:
+        """plan의 벡터 검색 실행 (search_results가 있으면 _msearch로 미리 받은 결과를 사용)"""
+        if search_results is None:
+            search_results = []
+            for aid, size in plan["searches"]:
+                document_ids = None
+                if self.two_stage_retrieval:
+                    with metrics.span("query", "document_search", detail=aid):
+                        # 요약이 없는(요약 도입 전 적재) 어시스턴트는 빈 목록 → 전체 청크 검색
+                        document_ids = self.opensearch_client.search_documents(
+                            question_embedding, assistant_id=aid, size=self.top_documents
+                        ) or None
+                with metrics.span("query", "opensearch_search", detail=aid):
+                    search_results.append(self.opensearch_client.search_similar_chunks(
+                        question_embedding,
+                        assistant_id=aid,
+                        size=size,
+                        document_ids=document_ids
+                    ))
+        for result in search_results:
+            if isinstance(result, Exception):
+                raise result
+        
+        if isinstance(plan["assistant_id"], list):
+            # 점수순으로 정렬하고 선택
+            all_chunks = [hit for hits in search_results for hit in hits]
+            return self._apply_cutoff(plan, sorted(all_chunks, key=lambda x: x['_score'], reverse=True))
+        return self._apply_cutoff(plan, search_results[0])
+    
+    def _apply_cutoff(self, plan: Dict[str, Any], hits: List[Dict]) -> List[Dict]:
+        """점수 분포로 사용할 청크를 고르고, 고정 크기 대비 줄어든 청크/토큰을 plan["retrieval"]에 기록"""
+        if not self.cutoff.enabled:
+            return hits[:plan["search_size"]]
+        used, policy = self.cutoff.apply(hits, plan["search_size"])
+        dropped = hits[len(used):plan["search_size"]]
+        tokens_saved = sum(estimate_tokens(hit['_source']['content'][:plan["content_limit"]]) for hit in dropped)
+        plan["retrieval"] = {
+            "policy": policy,
+            "fetched": len(hits),
+            "baseline_chunks": min(len(hits), plan["search_size"]),
+            "chunks_used": len(used),
+            "tokens_saved": tokens_saved
+        }
+        metrics.RETRIEVAL_CHUNKS_USED.observe(len(used))
+        metrics.RETRIEVAL_TOKENS_SAVED.inc(tokens_saved)
+        return used
+    
+    def _restrict_to_top_documents(self, searches: List[Tuple]) -> List[Tuple]:
+        """배치 검색의 1단계: 모든 문서 검색을 _msearch 한 번으로 실행해 각 청크 검색에 document_id 필터 추가"""
+        with metrics.span("query", "document_msearch", detail=str(len(searches))):
+            try:
+                documents = self.opensearch_client.msearch_documents(
+                    [(embedding, aid, self.top_documents) for embedding, aid, _ in searches]
+                )
+            except Exception as e:
+                print(f"문서 검색 실패, 전체 청크 검색으로 진행: {e}")
+                return searches
+        return [
+            (embedding, aid, size, ids) if ids and not isinstance(ids, Exception) else (embedding, aid, size)
+            for (embedding, aid, size), ids in zip(searches, documents)
+        ]
+    
+    def get_answer(self, question: str, assistant_id: Optional[str] = None, summary_mode: bool = False,
+                   highlight: bool = True) -> Dict[str, Any]:
+        plan = self._plan_query(question, assistant_id, summary_mode, highlight)
+        
+        # 질문을 임베딩으로 변환
+        with metrics.span("query", "embedding"):
+            question_embedding = self.vector_codec.encode(self.embedding_model.encode(plan["question"])).tolist()
+        
+        # 벡터 검색으로 문서 청크 검색
+        similar_chunks = self._retrieve(plan, question_embedding)
+        return self._answer_from_chunks(plan, similar_chunks)
+    
+    def _answer_from_chunks(self, plan: Dict[str, Any], similar_chunks: List[Dict]) -> Dict[str, Any]:
+        response = self._generate_answer(plan, similar_chunks)
+        if "retrieval" in plan:
+            # 적응형 컷오프 결과 (실제 사용한 청크 수, 고정 크기 대비 절약한 컨텍스트 토큰)
+            response["retrieval"] = plan["retrieval"]
+        return response
+    
+    def _source_entry(self, hit: Dict) -> Dict[str, Any]:
+        source = hit['_source']
+        return {
+            "chunk_id": hit.get('_id'),
+            "document_title": source['document_title'],
+            "page_number": source['page_number'],
+            "chunk_index": source['chunk_index'],
+            "content": source['content'],
+            "highlighted_content": None,
+            "tags": source['tags'],
+            "organization": source['organization'],
+            "document_type": source['document_type'],
+            "relevance_score": hit['_score']
+        }
+    
+    def _generate_answer(self, plan: Dict[str, Any], similar_chunks: List[Dict]) -> Dict[str, Any]:
+        """검색된 청크로 컨텍스트를 구성하고 답변 생성"""
+        question = plan["question"]
+        keywords = plan["keywords"]
+        summary_mode = plan["summary_mode"]
+        has_comparison = plan["has_comparison"]
+        multiple_assistants = plan["multiple_assistants"]
+        content_limit = plan["content_limit"]
         
         if not similar_chunks:
             return {
@@ -513,52 +775,35 @@ class RAGService:
                 "keywords": keywords
             }
         
-        # 4. 컨텍스트 구성 및 키워드 하이라이트
+        # 4. 컨텍스트 구성
+        context_span = metrics.span("query", "context_build")
         context_parts = []
         sources = []
         
         for hit in similar_chunks:
             source = hit['_source']
-            score = hit['_score']
             
-            # 원본 내용과 하이라이트된 내용 모두 저장
+            # 원본 내용 저장 (하이라이트는 아래에서 별도 단계로 처리)
             original_content = source['content']
-            highlighted_content = self._highlight_keywords(original_content, keywords)
             
             context_parts.append(f"문서: {source['document_title']}, 페이지: {source['page_number']}\n내용: {original_content}")
             
-            sources.append({
-                "document_title": source['document_title'],
-                "page_number": source['page_number'],
-                "chunk_index": source['chunk_index'],
-                "content": original_content,
-                "highlighted_content": highlighted_content,
-                "tags": source['tags'],
-                "organization": source['organization'],
-                "document_type": source['document_type'],
-                "relevance_score": score
-            })
+            sources.append(self._source_entry(hit))
         
         # 4. OpenAI API로 답변 생성
         # Summary mode와 비교 질문에 따른 프롬프트 선택
         
         if summary_mode and (has_comparison or multiple_assistants):
-            print(f"DEBUG: 비교 모드 진입 - summary_mode: {summary_mode}, has_comparison: {has_comparison}, multiple_assistants: {multiple_assistants}")
             # 어시스턴트별 문서 정리 - similar_chunks에서 직접 가져옴
             assistant_docs = {}
             for i, chunk in enumerate(similar_chunks):
-                print(f"DEBUG: 청크 {i} 구조: {list(chunk.keys())}")
-                print(f"DEBUG: _source 키들: {list(chunk['_source'].keys()) if '_source' in chunk else 'No _source'}")
                 assistant = chunk['_source'].get('assistant_id', 'Unknown')
-                print(f"DEBUG: 청크 {i} - assistant: {assistant}")
                 if assistant not in assistant_docs:
                     assistant_docs[assistant] = []
                 # sources에서 해당하는 source 찾기
                 if i < len(sources):
                     assistant_docs[assistant].append(sources[i])
             
-            print(f"DEBUG: assistant_docs keys: {list(assistant_docs.keys())}")
-            
             assistant_list = list(assistant_docs.keys())
             context_by_assistant = ""
             
@@ -655,6 +900,13 @@ class RAGService:
 
 위 문서를 바탕으로 질문에 답변해주세요. 답변의 근거가 되는 문서명과 페이지를 반드시 명시해주세요.
 """
+        context_span.stop()
+        
+        # 5. 키워드 하이라이트 (compact 응답은 content 기준 구간만 쓰므로 생략)
+        if plan["highlight"]:
+            with metrics.span("query", "highlight"):
+                for source in sources:
+                    source["highlighted_content"] = self._highlight_keywords(source["content"], keywords)
         
         try:
             # Check if OpenAI API key is properly configured
@@ -678,17 +930,16 @@ class RAGService:
                     "keywords": keywords
                 }
             
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.2,
-                max_tokens=1500
-            )
-            
-            answer = response.choices[0].message.content
+            with metrics.span("query", "openai_completion"):
+                answer = self.llm.complete(
+                    "answer",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.2,
+                    max_tokens=1500
+                )
             
             return {
                 "response_type": "integrated",
@@ -720,4 +971,139 @@ class RAGService:
                 "confidence": 0.5,
                 "keywords": keywords,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+    
+    def get_batch_answers(self, items: List[Dict[str, Any]], max_concurrency: int = 4,
+                          submit: Optional[Callable[..., Future]] = None,
+                          highlight: bool = True) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[Exception]]]:
+        """여러 질문을 한 번에 처리하고, 완료되는 순서대로 (index, 응답, 오류)를 반환합니다.
+        
+        item: {"question", "assistant_id", "assistant_ids", "response_mode", "summary_mode"} (/query와 같은 의미)
+        질문 임베딩은 배치 encode 한 번, 벡터 검색은 _msearch 한 번으로 처리하고
+        답변 생성(OpenAI 호출)만 최대 max_concurrency개까지 병렬로 실행합니다.
+        submit: 답변 생성 작업을 제출할 함수 (예: 질의 풀의 submit, 없으면 배치 전용 스레드 풀 사용).
+        제출이 거절되면(예외) 해당 항목의 오류로 반환합니다.
+        highlight: False면 출처의 highlighted_content를 만들지 않음 (compact 응답)
+        """
+        jobs = []
+        for index, item in enumerate(items):
+            try:
+                jobs.append(self._plan_batch_item(index, item, highlight))
+            except Exception as e:
+                yield index, None, e
+        if not jobs:
+            return
+        
+        plans = [entry for job in jobs for entry in job["plans"]]
+        
+        # 1. 모든 질문을 한 번에 임베딩 (중복 질문은 한 번만)
+        texts = list(dict.fromkeys(entry["plan"]["question"] for entry in plans))
+        try:
+            with metrics.span("query", "batch_embedding", detail=str(len(texts))):
+                vectors = self.vector_codec.encode(self.embedding_model.encode(texts))
+        except Exception as e:
+            # 스트림 헤더가 이미 나갔으므로 중간에 끊지 않고 모든 항목에 오류를 반환
+            for job in jobs:
+                yield job["index"], None, e
+            return
+        embeddings = {text: vector.tolist() for text, vector in zip(texts, vectors)}
+        
+        # 2. 모든 검색을 _msearch 한 번으로 실행
+        searches = []
+        for entry in plans:
+            embedding = embeddings[entry["plan"]["question"]]
+            entry["offset"] = len(searches)
+            searches.extend((embedding, aid, size) for aid, size in entry["plan"]["searches"])
+        if self.two_stage_retrieval:
+            searches = self._restrict_to_top_documents(searches)
+        with metrics.span("query", "opensearch_msearch", detail=str(len(searches))):
+            try:
+                search_results = self.opensearch_client.msearch_similar_chunks(searches)
+            except Exception as e:
+                search_results = [e] * len(searches)
+        for entry in plans:
+            count = len(entry["plan"]["searches"])
+            entry["results"] = search_results[entry["offset"]:entry["offset"] + count]
+        
+        # 3. 답변 생성은 최대 max_concurrency개씩 제출하고 끝나는 대로 반환
+        executor = None
+        if submit is None:
+            executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="rag-batch")
+            submit = executor.submit
+        pending_jobs = list(reversed(jobs))
+        futures: Dict[Future, int] = {}
+        try:
+            while pending_jobs or futures:
+                while pending_jobs and len(futures) < max(1, max_concurrency):
+                    job = pending_jobs.pop()
+                    try:
+                        futures[submit(self._answer_batch_item, job)] = job["index"]
+                    except Exception as e:
+                        yield job["index"], None, e
+                if not futures:
+                    continue
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures.pop(future)
+                    try:
+                        yield index, future.result(), None
+                    except Exception as e:
+                        yield index, None, e
+        finally:
+            # 클라이언트가 스트림을 끊으면 아직 시작하지 않은 생성 작업은 취소
+            for future in futures:
+                future.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _plan_batch_item(self, index: int, item: Dict[str, Any], highlight: bool = True) -> Dict[str, Any]:
+        question = item["question"]
+        assistant_ids = item.get("assistant_ids")
+        summary_mode = item.get("summary_mode", False)
+        
+        if assistant_ids is not None and item.get("response_mode", "individual") == "individual":
+            is_comparison_question = any(keyword in question for keyword in COMPARISON_REQUEST_KEYWORDS)
+            individual_question = self._convert_to_individual_question(question) if is_comparison_question else question
+            return {
+                "index": index,
+                "kind": "individual",
+                "question": question,
+                "assistant_ids": assistant_ids,
+                "is_comparison_question": is_comparison_question,
+                "plans": [
+                    {"assistant_id": aid, "plan": self._plan_query(individual_question, aid, summary_mode, highlight)}
+                    for aid in assistant_ids
+                ],
+            }
+        
+        target = assistant_ids if assistant_ids is not None else item.get("assistant_id")
+        return {
+            "index": index,
+            "kind": "single",
+            "plans": [{"assistant_id": target, "plan": self._plan_query(question, target, summary_mode, highlight)}],
+        }
+    
+    def _answer_batch_item(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        if job["kind"] == "single":
+            entry = job["plans"][0]
+            return self._answer_from_chunks(entry["plan"], self._retrieve(entry["plan"], None, entry["results"]))
+        
+        if self._use_single_pass_comparison(job["is_comparison_question"], job["assistant_ids"]):
+            result = self._compare_in_single_pass(
+                job["question"], job["assistant_ids"],
+                [entry["plan"] for entry in job["plans"]], [entry["results"] for entry in job["plans"]]
+            )
+            if result is not None:
+                return result
+        
+        individual_responses = []
+        for entry in job["plans"]:
+            try:
+                similar_chunks = self._retrieve(entry["plan"], None, entry["results"])
+                response = self._answer_from_chunks(entry["plan"], similar_chunks)
+                individual_responses.append(self._individual_entry(entry["assistant_id"], response))
+            except Exception as e:
+                individual_responses.append(self._individual_error_entry(entry["assistant_id"], e))
+        return self._assemble_individual_answers(
+            job["question"], job["assistant_ids"], individual_responses, job["is_comparison_question"]
+        )
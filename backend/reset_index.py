@@ -6,16 +6,16 @@ def reset_opensearch_index():
     client = OpenSearchClient()
     
     try:
-        # 기존 인덱스 삭제
-        if client.client.indices.exists(index=client.index_name):
-            response = client.client.indices.delete(index=client.index_name)
-            print(f"기존 인덱스 '{client.index_name}' 삭제 완료: {response}")
+        # 기존 인덱스 삭제 (org_index 배치에서는 모든 조직 인덱스)
+        deleted = client.delete_indices()
+        if deleted:
+            print(f"기존 인덱스 {', '.join(deleted)} 삭제 완료")
         else:
-            print(f"인덱스 '{client.index_name}'가 존재하지 않습니다.")
+            print(f"인덱스 '{client.search_index}'가 존재하지 않습니다.")
         
-        # 새 인덱스 생성 (OpenSearchClient의 __init__에서 자동으로 생성됨)
+        # 새 인덱스 생성 (OpenSearchClient의 __init__에서 자동으로 생성됨, org_index 배치는 첫 색인 시 생성)
         new_client = OpenSearchClient()
-        print(f"새로운 인덱스 '{new_client.index_name}' 생성 완료")
+        print(f"새로운 인덱스 '{new_client.search_index}' 준비 완료")
         
         return True
         
@@ -0,0 +1,87 @@
+"""검색 결과 적응형 컷오프
+
+고정 크기(search_size)만큼 모든 청크를 GPT에 보내는 대신, 같은 크기로 검색한 결과의
+점수 분포를 보고 답변에 쓸 청크 수를 정합니다. 정책은 쉼표로 여러 개를 지정하면 순서대로 적용합니다.
+  - min_score: 점수가 RETRIEVAL_MIN_SCORE 미만인 청크 제외
+  - elbow    : 인접 청크 간 점수 하락이 최고 점수 대비 RETRIEVAL_ELBOW_GAP 이상인 첫 지점에서 자름
+  - budget   : (점수 - 최저 점수)를 관련도로 보고 누적 관련도가 RETRIEVAL_BUDGET 비율에 도달하면 자름
+어떤 정책도 RETRIEVAL_MIN_CHUNKS개 미만으로 줄이지 않으며, 최대 개수는 기존 검색 크기를 그대로 따릅니다.
+
+설정 (환경변수):
+    RETRIEVAL_CUTOFF=                 (비우면 사용 안 함, 예: min_score,elbow)
+    RETRIEVAL_MIN_CHUNKS=2
+    RETRIEVAL_MIN_SCORE=0.75          RETRIEVAL_ELBOW_GAP=0.05          RETRIEVAL_BUDGET=0.8
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+POLICIES = ("min_score", "elbow", "budget")
+
+
+def estimate_tokens(text: str) -> int:
+    """GPT 토큰 수 근사 (한글 1자 ≈ 1토큰 ≈ UTF-8 3바이트, 영문은 약 4자당 1토큰)"""
+    return (len(text.encode("utf-8")) + 2) // 3
+
+
+class CutoffPolicy:
+    def __init__(self, policies: List[str], min_chunks: int = 2,
+                 min_score: float = 0.75, elbow_gap: float = 0.05, budget: float = 0.8):
+        unknown = [policy for policy in policies if policy not in POLICIES]
+        if unknown:
+            raise ValueError(f"Unknown RETRIEVAL_CUTOFF policy: {', '.join(unknown)} (expected {', '.join(POLICIES)})")
+        self.policies = policies
+        self.min_chunks = min_chunks
+        self.min_score = min_score
+        self.elbow_gap = elbow_gap
+        self.budget = budget
+
+    @classmethod
+    def from_env(cls) -> "CutoffPolicy":
+        policies = [p.strip() for p in os.getenv("RETRIEVAL_CUTOFF", "").split(",") if p.strip()]
+        return cls(
+            policies,
+            min_chunks=int(os.getenv("RETRIEVAL_MIN_CHUNKS", "2")),
+            min_score=float(os.getenv("RETRIEVAL_MIN_SCORE", "0.75")),
+            elbow_gap=float(os.getenv("RETRIEVAL_ELBOW_GAP", "0.05")),
+            budget=float(os.getenv("RETRIEVAL_BUDGET", "0.8")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.policies)
+
+    def apply(self, hits: List[Dict[str, Any]], max_chunks: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """점수 내림차순 hits에서 사용할 청크와 마지막으로 개수를 줄인 정책"""
+        keep = min(len(hits), max_chunks)
+        decided_by = None
+        scores = [hit['_score'] for hit in hits[:keep]]
+        for policy in self.policies:
+            cut = getattr(self, f"_{policy}")(scores[:keep])
+            cut = max(cut, min(self.min_chunks, keep))
+            if cut < keep:
+                keep, decided_by = cut, policy
+        return hits[:keep], decided_by
+
+    def _min_score(self, scores: List[float]) -> int:
+        return sum(1 for score in scores if score >= self.min_score)
+
+    def _elbow(self, scores: List[float]) -> int:
+        if not scores or scores[0] <= 0:
+            return len(scores)
+        for i in range(max(1, self.min_chunks), len(scores)):
+            if (scores[i - 1] - scores[i]) / scores[0] >= self.elbow_gap:
+                return i
+        return len(scores)
+
+    def _budget(self, scores: List[float]) -> int:
+        floor = scores[-1] if scores else 0.0
+        weights = [score - floor for score in scores]
+        total = sum(weights)
+        if total <= 0:
+            return len(scores)
+        cumulative = 0.0
+        for i, weight in enumerate(weights, 1):
+            cumulative += weight
+            if cumulative >= self.budget * total:
+                return i
+        return len(scores)
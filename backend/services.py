@@ -0,0 +1,131 @@
+"""서비스 컴포넌트 지연 초기화 및 준비 상태 관리
+
+무거운 모듈(sentence-transformers/torch, opensearch-py)은 여기서만 지연 import 합니다.
+uvicorn이 트래픽을 먼저 받을 수 있도록 초기화는 백그라운드 스레드에서 진행되며,
+OpenSearch 연결과 임베딩 모델 로드/워밍업은 병렬로 수행됩니다.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+COMPONENTS = ("opensearch", "embedding_model", "pdf_processor", "rag_service")
+
+_lock = threading.Lock()
+_instances: Dict[str, Any] = {}
+_status: Dict[str, Dict[str, Any]] = {
+    name: {"status": "pending", "seconds": None, "error": None} for name in COMPONENTS
+}
+_init_thread: Optional[threading.Thread] = None
+_process_start = time.perf_counter()
+
+
+def _run_component(name: str, factory):
+    """컴포넌트 하나를 초기화하고 상태/소요 시간을 기록"""
+    start = time.perf_counter()
+    try:
+        instance = factory()
+    except Exception as e:
+        with _lock:
+            _status[name].update(status="failed", seconds=time.perf_counter() - start, error=str(e))
+        print(f"Warning: {name} initialization failed: {e}")
+        return None
+
+    with _lock:
+        _instances[name] = instance
+        _status[name].update(status="ready", seconds=time.perf_counter() - start, error=None)
+    print(f"{name} initialized ({time.perf_counter() - start:.2f}s)")
+    return instance
+
+
+def _create_opensearch_client():
+    from opensearch_client import get_shared_client
+    from assistant_catalog import AssistantCatalog
+    client = get_shared_client()
+    with _lock:
+        _instances["assistant_catalog"] = AssistantCatalog.from_env(client)
+    return client
+
+
+def _create_embedding_model():
+    from embedding_model import get_embedding_model
+    model = get_embedding_model()
+    # 첫 요청이 지연되지 않도록 더미 인코딩으로 워밍업
+    model.encode("warm-up")
+    return model
+
+
+def _create_pdf_processor():
+    from pdf_processor import PDFProcessor
+    return PDFProcessor(embedding_model=_instances.get("embedding_model"))
+
+
+def _create_rag_service():
+    from rag_service import RAGService
+    return RAGService(
+        opensearch_client=_instances.get("opensearch"),
+        embedding_model=_instances.get("embedding_model"),
+    )
+
+
+def _initialize_all():
+    start = time.perf_counter()
+
+    # OpenSearch 연결(네트워크)과 모델 로드(CPU)는 서로 독립적이므로 병렬 실행
+    opensearch_thread = threading.Thread(
+        target=_run_component, args=("opensearch", _create_opensearch_client), daemon=True
+    )
+    opensearch_thread.start()
+    _run_component("embedding_model", _create_embedding_model)
+    opensearch_thread.join()
+
+    _run_component("pdf_processor", _create_pdf_processor)
+    _run_component("rag_service", _create_rag_service)
+
+    breakdown = ", ".join(
+        f"{name}={_status[name]['seconds']:.2f}s({_status[name]['status']})" for name in COMPONENTS
+    )
+    print(
+        f"Startup complete in {time.perf_counter() - start:.2f}s "
+        f"({time.perf_counter() - _process_start:.2f}s since import): {breakdown}"
+    )
+
+
+def start_background_initialization():
+    """백그라운드 초기화 시작 (여러 번 호출해도 한 번만 실행)"""
+    global _init_thread
+    with _lock:
+        if _init_thread is not None:
+            return
+        _init_thread = threading.Thread(target=_initialize_all, name="service-init", daemon=True)
+        _init_thread.start()
+
+
+def get_opensearch_client():
+    return _instances.get("opensearch")
+
+
+def get_assistant_catalog():
+    """어시스턴트 목록/통계 캐시 (OpenSearch 연결 후 사용 가능)"""
+    return _instances.get("assistant_catalog")
+
+
+def get_pdf_processor():
+    return _instances.get("pdf_processor")
+
+
+def get_rag_service():
+    return _instances.get("rag_service")
+
+
+def readiness() -> Dict[str, Any]:
+    """컴포넌트별 준비 상태"""
+    with _lock:
+        components = {name: dict(state) for name, state in _status.items()}
+    statuses = {state["status"] for state in components.values()}
+    if statuses == {"ready"}:
+        overall = "ready"
+    elif "pending" in statuses:
+        overall = "starting"
+    else:
+        overall = "degraded"
+    return {"status": overall, "components": components}
@@ -0,0 +1,207 @@
+"""동일 질의 중복 실행 방지 (single-flight)
+
+같은 키로 동시에 들어온 요청은 하나의 계산만 실행하고 결과를 공유합니다.
+  - 워커 내부: 스레드 간 Event 대기
+  - 워커 간: 키별 파일 잠금(fcntl.flock) + 짧은 TTL의 결과 파일
+    다른 워커가 계산 중이면 잠금이 풀릴 때까지 기다린 뒤 결과 파일을 읽습니다.
+
+설정 (환경변수):
+    SINGLEFLIGHT_ENABLED=true
+    SINGLEFLIGHT_CROSS_WORKER=true
+    SINGLEFLIGHT_DIR=<tmp>/rag-singleflight
+    SINGLEFLIGHT_RESULT_TTL=3
+    SINGLEFLIGHT_WAIT_TIMEOUT=120
+"""
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: 워커 내부 병합만 지원
+    fcntl = None
+
+
+def query_key(question: str, assistant_ids: Optional[List[str]], response_mode: str, summary_mode: bool,
+              highlight: bool = True) -> str:
+    """정규화된 질문, 어시스턴트 집합, 모드 플래그로 키 생성 (highlight: 출처 하이라이트 포함 여부)"""
+    normalized = " ".join(unicodedata.normalize("NFC", question).split()).lower()
+    payload = json.dumps(
+        [normalized, sorted(set(assistant_ids or [])), response_mode, bool(summary_mode), bool(highlight)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str, directory: Optional[str] = None, result_ttl: float = 3.0,
+                 wait_timeout: float = 120.0):
+        self.name = name
+        self.directory = directory if fcntl is not None else None
+        self.result_ttl = result_ttl
+        self.wait_timeout = wait_timeout
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, name: str) -> Optional["SingleFlight"]:
+        if os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() != "true":
+            return None
+        directory = None
+        if os.getenv("SINGLEFLIGHT_CROSS_WORKER", "true").lower() == "true":
+            directory = os.path.join(
+                os.getenv("SINGLEFLIGHT_DIR", os.path.join(tempfile.gettempdir(), "rag-singleflight")), name
+            )
+        return cls(
+            name,
+            directory=directory,
+            result_ttl=float(os.getenv("SINGLEFLIGHT_RESULT_TTL", "3")),
+            wait_timeout=float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT", "120")),
+        )
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """key에 대해 진행 중인 계산이 있으면 그 결과를, 없으면 fn()을 실행한 결과를 반환"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            metrics.SINGLEFLIGHT_REQUESTS.labels(self.name, "coalesced_local").inc()
+            if not call.done.wait(self.wait_timeout):
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = self._run_leader(key, fn)
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                # 호출자가 결과를 수정할 수 있으므로 대기자에게는 스냅샷을 공유
+                if call.waiters and call.error is None:
+                    call.result = copy.deepcopy(result)
+            call.done.set()
+
+    def _run_leader(self, key: str, fn: Callable[[], Any]) -> Any:
+        if not self.directory:
+            metrics.SINGLEFLIGHT_REQUESTS.labels(self.name, "leader").inc()
+            return fn()
+
+        self._sweep()
+        lock_path = os.path.join(self.directory, f"{key}.lock")
+        result_path = os.path.join(self.directory, f"{key}.json")
+
+        with open(lock_path, "a+") as lock_file:
+            waited = not self._try_lock(lock_file)
+            if waited and not self._wait_lock(lock_file):
+                # 다른 워커의 계산이 너무 오래 걸리면 직접 계산
+                metrics.SINGLEFLIGHT_REQUESTS.labels(self.name, "leader").inc()
+                return fn()
+            try:
+                if waited:
+                    cached = self._read_result(result_path)
+                    if cached is not None:
+                        metrics.SINGLEFLIGHT_REQUESTS.labels(self.name, "coalesced_cross_worker").inc()
+                        return cached
+
+                metrics.SINGLEFLIGHT_REQUESTS.labels(self.name, "leader").inc()
+                result = fn()
+                self._write_result(result_path, result)
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _try_lock(self, lock_file) -> bool:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _wait_lock(self, lock_file) -> bool:
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            if self._try_lock(lock_file):
+                return True
+            time.sleep(0.02)
+        return False
+
+    def _read_result(self, path: str) -> Any:
+        try:
+            if time.time() - os.path.getmtime(path) > self.result_ttl:
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_result(self, path: str, result: Any) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            # 직렬화할 수 없는 결과는 워커 간에 공유하지 않음
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def _sweep(self) -> None:
+        """오래된 결과/잠금 파일 정리 (최대 1분에 한 번)"""
+        now = time.time()
+        if now - self._last_sweep < 60:
+            return
+        self._last_sweep = now
+        for filename in os.listdir(self.directory):
+            if not filename.endswith((".json", ".lock")):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                if now - os.path.getmtime(path) <= max(60, self.result_ttl):
+                    continue
+                if filename.endswith(".lock"):
+                    # 잠금 파일은 열어도 mtime이 갱신되지 않으므로, 계산 중인(잠긴) 파일은 지우지 않음
+                    self._unlink_unlocked(path)
+                else:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    def _unlink_unlocked(self, path: str) -> None:
+        with open(path, "a+") as lock_file:
+            if self._try_lock(lock_file):
+                try:
+                    os.unlink(path)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 백엔드 모듈은 backend/ 디렉터리 기준으로 import됨 (main.py와 동일)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
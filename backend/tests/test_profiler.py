@@ -0,0 +1,28 @@
+import time
+import tracemalloc
+
+import profiler
+
+
+def test_ttl_expiry_stops_tracemalloc():
+    assert not tracemalloc.is_tracing()
+    session = profiler.start("query", requests=5, memory=True, ttl_seconds=0.2)
+    try:
+        assert tracemalloc.is_tracing()
+        time.sleep(0.5)
+        # 측정 대상 요청이 하나도 오지 않아도 세션이 끝나고 tracemalloc이 꺼져야 함
+        assert not tracemalloc.is_tracing()
+        assert session.finished_at is not None
+        assert not session.to_dict()["active"]
+        with profiler.profile("query") as profile:
+            assert profile is None
+    finally:
+        profiler.stop()
+
+
+def test_stop_before_ttl_stops_tracemalloc():
+    session = profiler.start("upload", requests=1, memory=True, ttl_seconds=600)
+    profiler.stop()
+    assert not tracemalloc.is_tracing()
+    session._expiry.join(timeout=1)
+    assert not session._expiry.is_alive()
@@ -0,0 +1,28 @@
+import threading
+
+import pytest
+
+from workload import PoolSaturatedError, WorkloadPool
+
+
+def test_cancelled_queued_job_leaves_queue():
+    pool = WorkloadPool("query", workers=1, max_queue=3)
+    release = threading.Event()
+    try:
+        running = pool.submit(release.wait)
+        queued = [pool.submit(lambda: None) for _ in range(3)]
+        with pytest.raises(PoolSaturatedError):
+            pool.submit(lambda: None)
+
+        assert queued[0].cancel() and queued[1].cancel()
+        assert pool.stats()["queued"] == 1
+
+        # 취소된 자리만큼 다시 받을 수 있음
+        accepted = [pool.submit(lambda: "ok") for _ in range(2)]
+    finally:
+        release.set()
+    assert running.result(timeout=5) is True
+    assert [future.result(timeout=5) for future in accepted] == ["ok", "ok"]
+    queued[2].result(timeout=5)
+    assert pool.stats()["queued"] == 0
+    assert pool.stats()["running"] == 0
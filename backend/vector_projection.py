@@ -0,0 +1,270 @@
+"""임베딩 차원 축소(PCA)와 저장 인코딩 (float / fp16 / byte)
+
+kNN 인덱스 메모리는 벡터 차원 × 원소 크기에 비례하므로,
+코퍼스 임베딩으로 학습한 PCA 행렬로 384차원을 줄이고 원소를 fp16/byte로 저장할 수 있습니다.
+문서(PDFProcessor, bulk_ingest)와 질의(RAGService) 모두 같은 VectorCodec을 거칩니다.
+  - float: 원본 그대로 (기본값)
+  - fp16 : faiss 엔진의 sq(fp16) 인코더 사용 (OPENSEARCH_KNN_ENGINE=faiss 필요)
+  - byte : data_type=byte, 정규화된 벡터에 학습한 배율을 곱해 [-128, 127]로 양자화
+
+설정을 바꾸면 인덱스 매핑의 차원/타입이 달라지므로 reset_index.py 후 다시 적재해야 합니다.
+
+설정 (환경변수):
+    VECTOR_PROJECTION_PATH=models/projection-128.npz   (미지정시 차원 축소 없음)
+    VECTOR_ENCODING=float
+
+사용법:
+    python vector_projection.py evaluate --pdf-dir ./pdfs --dims 64,128,192 --encodings float,fp16,byte
+    python vector_projection.py fit --pdf-dir ./pdfs --dims 128 --output models/projection-128.npz
+"""
+import argparse
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+ENCODINGS = ("float", "fp16", "byte")
+FULL_DIMENSION = 384
+BYTES_PER_VALUE = {"float": 4, "fp16": 2, "byte": 1}
+
+_shared_codec = None
+_shared_codec_lock = threading.Lock()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class VectorProjection:
+    """정규화 → 평균 제거 → 주성분 투영 → 재정규화 (components가 None이면 투영 없이 정규화만)"""
+
+    def __init__(self, mean: Optional[np.ndarray], components: Optional[np.ndarray], byte_scale: float = 127.0):
+        self.mean = mean
+        self.components = components
+        self.byte_scale = byte_scale
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dims: Optional[int]) -> "VectorProjection":
+        """dims개 주성분 학습 (dims가 None이거나 원본 차원 이상이면 투영 없이 byte 배율만 학습)"""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        if dims and dims < vectors.shape[1]:
+            mean = vectors.mean(axis=0)
+            # 공분산 대신 중심화된 데이터의 SVD: 오른쪽 특이벡터가 주성분
+            _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+            projection = cls(mean.astype(np.float32), vt[:dims].T.astype(np.float32))
+        else:
+            projection = cls(None, None)
+        # 극단값 몇 개 때문에 해상도를 잃지 않도록 99.9 분위수를 127에 맞춤
+        transformed = projection.transform(vectors)
+        projection.byte_scale = float(127.0 / max(np.quantile(np.abs(transformed), 0.999), 1e-6))
+        return projection
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return None if self.components is None else self.components.shape[1]
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        if self.components is None:
+            return vectors
+        return _normalize((vectors - self.mean) @ self.components)
+
+    def save(self, path: str) -> str:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        arrays = {"byte_scale": np.float32(self.byte_scale)}
+        if self.components is not None:
+            arrays.update(mean=self.mean, components=self.components)
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "VectorProjection":
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"Vector projection not found: {path} "
+                f"(run `python vector_projection.py fit --output {path}` first)"
+            )
+        with np.load(path) as data:
+            return cls(
+                data["mean"] if "mean" in data else None,
+                data["components"] if "components" in data else None,
+                float(data["byte_scale"]),
+            )
+
+
+class VectorCodec:
+    """모델 임베딩 → 저장/검색용 벡터 변환 (projection이 없고 float이면 원본 그대로)"""
+
+    def __init__(self, projection: Optional[VectorProjection] = None, encoding: str = "float"):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown VECTOR_ENCODING: {encoding} (expected one of {', '.join(ENCODINGS)})")
+        self.projection = projection
+        self.encoding = encoding
+
+    @classmethod
+    def from_env(cls) -> "VectorCodec":
+        encoding = os.getenv("VECTOR_ENCODING", "float").lower()
+        path = os.getenv("VECTOR_PROJECTION_PATH")
+        if path:
+            projection = VectorProjection.load(path)
+        elif encoding == "byte":
+            raise ValueError("VECTOR_ENCODING=byte requires VECTOR_PROJECTION_PATH (fit with --dims 0 to keep 384 dims)")
+        else:
+            projection = None
+        return cls(projection, encoding)
+
+    @property
+    def is_identity(self) -> bool:
+        return self.projection is None and self.encoding == "float"
+
+    @property
+    def dimension(self) -> int:
+        if self.projection is not None and self.projection.dimension:
+            return self.projection.dimension
+        return FULL_DIMENSION
+
+    def encode(self, vectors) -> np.ndarray:
+        """1차원(질의 하나) 또는 2차원(여러 개) 임베딩을 변환"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.is_identity:
+            return vectors
+        if self.projection is not None:
+            vectors = self.projection.transform(vectors)
+        if self.encoding == "fp16":
+            return vectors.astype(np.float16).astype(np.float32)
+        if self.encoding == "byte":
+            scale = self.projection.byte_scale if self.projection is not None else 127.0
+            return np.clip(np.rint(vectors * scale), -128, 127).astype(np.int8)
+        return vectors
+
+    def mapping(self) -> Dict[str, Any]:
+        """knn_vector 필드의 dimension/data_type"""
+        mapping = {"dimension": self.dimension}
+        if self.encoding == "byte":
+            mapping["data_type"] = "byte"
+        return mapping
+
+    def method_parameters(self) -> Dict[str, Any]:
+        """HNSW method.parameters에 추가할 인코더 설정"""
+        if self.encoding == "fp16":
+            return {"encoder": {"name": "sq", "parameters": {"type": "fp16"}}}
+        return {}
+
+
+def get_vector_codec() -> VectorCodec:
+    """프로세스 전체에서 공유하는 벡터 코덱 (문서와 질의가 같은 투영 행렬을 사용)"""
+    global _shared_codec
+    if _shared_codec is None:
+        with _shared_codec_lock:
+            if _shared_codec is None:
+                _shared_codec = VectorCodec.from_env()
+    return _shared_codec
+
+
+def _load_vectors(pdf_dir: Optional[str], limit: int) -> np.ndarray:
+    """PDF를 원본 모델로 인코딩하거나, 원본 차원으로 색인된 인덱스에서 임베딩을 읽음"""
+    if pdf_dir:
+        from embedding_model import _load_corpus_from_pdfs, get_embedding_model
+        texts = _load_corpus_from_pdfs(pdf_dir, limit)
+        return np.asarray(get_embedding_model().encode(texts, batch_size=64), dtype=np.float32)
+
+    from opensearchpy.helpers import scan
+    from opensearch_client import OpenSearchClient
+    client = OpenSearchClient()
+    vectors = []
+    for hit in scan(client.client, index=client.search_index,
+                    query={"query": {"match_all": {}}, "_source": ["embedding"]}, size=500):
+        vectors.append(hit["_source"]["embedding"])
+        if len(vectors) >= limit:
+            break
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.size and vectors.shape[1] != FULL_DIMENSION:
+        raise SystemExit(f"인덱스 벡터가 이미 {vectors.shape[1]}차원입니다. --pdf-dir로 원본 임베딩을 사용하세요.")
+    return vectors
+
+
+def estimate_index_mb(count: int, dimension: int, encoding: str, m: int = 16) -> float:
+    """HNSW 네이티브 메모리 추정 (OpenSearch 문서 기준 1.1 × (벡터 바이트 + 8m) × 개수)"""
+    return 1.1 * (BYTES_PER_VALUE[encoding] * dimension + 8 * m) * count / (1024 * 1024)
+
+
+def evaluate(vectors: np.ndarray, dims_list: List[Optional[int]], encodings: List[str],
+             queries: int = 200, k: int = 10, seed: int = 42) -> List[Dict[str, Any]]:
+    """원본 벡터 정확 검색 대비 축소/양자화 벡터 정확 검색의 recall@k"""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    query_vectors = vectors[order[:queries]]
+    corpus = vectors[order[queries:]]
+    if len(corpus) < k:
+        raise SystemExit("평가할 벡터가 너무 적습니다.")
+
+    full_corpus = _normalize(corpus)
+    full_queries = _normalize(query_vectors)
+    truth = np.argsort(-(full_queries @ full_corpus.T), axis=1)[:, :k]
+
+    rows = []
+    for dims in dims_list:
+        # 질의로 쓴 벡터는 학습에서 제외 (운영에서는 질의가 코퍼스에 없음)
+        projection = VectorProjection.fit(corpus, dims)
+        for encoding in encodings:
+            codec = VectorCodec(projection, encoding)
+            encoded_corpus = _normalize(codec.encode(corpus).astype(np.float32))
+            encoded_queries = _normalize(codec.encode(query_vectors).astype(np.float32))
+            found = np.argsort(-(encoded_queries @ encoded_corpus.T), axis=1)[:, :k]
+            recall = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+            rows.append({
+                "dims": codec.dimension,
+                "encoding": encoding,
+                "recall_at_k": float(recall),
+                "bytes_per_vector": BYTES_PER_VALUE[encoding] * codec.dimension,
+                "index_mb_per_million": estimate_index_mb(1_000_000, codec.dimension, encoding),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="임베딩 차원 축소/양자화 도구")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("fit", "PCA 투영 행렬 학습 후 저장"), ("evaluate", "원본 대비 recall 손실 평가")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--pdf-dir", help="학습/평가에 사용할 PDF 폴더 (미지정시 OpenSearch 인덱스에서 추출)")
+        sub.add_argument("--limit", type=int, default=20000, help="사용할 최대 벡터 수")
+
+    fit_parser = subparsers.choices["fit"]
+    fit_parser.add_argument("--dims", type=int, default=128, help="축소 차원 (0이면 축소 없이 byte 배율만 학습)")
+    fit_parser.add_argument("--output", default="models/projection-128.npz")
+
+    evaluate_parser = subparsers.choices["evaluate"]
+    evaluate_parser.add_argument("--dims", default="0,64,128,192", help="평가할 차원 목록 (0은 축소 없음)")
+    evaluate_parser.add_argument("--encodings", default="float,fp16,byte")
+    evaluate_parser.add_argument("--queries", type=int, default=200)
+    evaluate_parser.add_argument("--k", type=int, default=10)
+
+    args = parser.parse_args()
+    vectors = _load_vectors(args.pdf_dir, args.limit)
+    if not len(vectors):
+        raise SystemExit("벡터가 없습니다.")
+
+    if args.command == "fit":
+        projection = VectorProjection.fit(vectors, args.dims or None)
+        path = projection.save(args.output)
+        print(f"Saved projection: {path} ({projection.dimension or FULL_DIMENSION} dims, "
+              f"byte_scale={projection.byte_scale:.1f}, trained on {len(vectors)} vectors)")
+        return
+
+    dims_list = [int(d) or None for d in args.dims.split(",")]
+    rows = evaluate(vectors, dims_list, args.encodings.split(","), args.queries, args.k)
+    print(f"{'dims':>5} {'encoding':>8} {'recall@' + str(args.k):>10} {'bytes/vec':>10} {'MB/1M vec':>10}")
+    for row in rows:
+        print(f"{row['dims']:>5} {row['encoding']:>8} {row['recall_at_k']:>10.3f} "
+              f"{row['bytes_per_vector']:>10} {row['index_mb_per_million']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""조회/적재 작업 격리와 수용 제어
+
+/query와 /upload-document가 같은 스레드와 CPU를 나눠 쓰면 큰 PDF 하나를 적재하는 동안 모든 질의가 느려집니다.
+작업 종류별로 크기가 정해진 스레드 풀을 따로 두고
+  - 적재 풀: 적은 워커 수, 낮은 우선순위(nice), CPU 일부에만 고정(affinity)
+  - 대기열 제한: 대기 중인 작업이 max_queue개 이상이면 즉시 PoolSaturatedError
+    (API는 429 + Retry-After로 응답해 지연 시간이 끝없이 늘어나지 않게 함)
+  - 대기열 길이, 실행 중 작업 수, 대기/실행 시간은 Prometheus 메트릭과 stats()로 확인
+우선순위와 CPU 고정은 Linux에서 스레드 단위로 적용되며, 해당 스레드가 만드는 OpenMP(torch) 스레드에도 상속됩니다.
+GIL을 잡고 있는 파이썬 코드끼리는 여전히 경쟁하므로 적재 워커 수는 작게 유지하세요.
+
+설정 (환경변수, <POOL>은 QUERY 또는 INGEST):
+    QUERY_WORKERS=16            QUERY_MAX_QUEUE=64
+    INGEST_WORKERS=1            INGEST_MAX_QUEUE=4
+    INGEST_CPU_SHARE=0.5        INGEST_NICE=10
+    <POOL>_CPU_SHARE, <POOL>_NICE는 두 풀 모두 지정 가능 (비우면 제한 없음)
+
+사용법:
+    response = query_pool.run(answer)                          # 동기 핸들러
+    result = await asyncio.wrap_future(ingest_pool.submit(fn))  # 비동기 핸들러
+"""
+import contextvars
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+
+DEFAULTS = {
+    "query": {"workers": 16, "max_queue": 64, "cpu_share": None, "nice": 0},
+    "ingest": {"workers": 1, "max_queue": 4, "cpu_share": 0.5, "nice": 10},
+}
+
+
+class PoolSaturatedError(Exception):
+    """대기열이 가득 차 작업을 받지 않음 (retry_after초 뒤 재시도 권장)"""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"{pool} queue is full, retry after {retry_after}s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+def _cpu_subset(share: Optional[float]) -> Optional[List[int]]:
+    """사용 가능한 CPU 중 share 비율만큼 (뒤쪽 CPU부터, 최소 1개)"""
+    if share is None or share >= 1 or not hasattr(os, "sched_getaffinity"):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    count = max(1, int(len(cpus) * share))
+    return cpus[-count:]
+
+
+class WorkloadPool:
+    def __init__(self, name: str, workers: int, max_queue: int, cpu_share: Optional[float] = None, nice: int = 0):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.nice = nice
+        self.cpus = _cpu_subset(cpu_share)
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        # 작업 실행 시간 지수 이동 평균 (Retry-After 추정용)
+        self._avg_seconds = 1.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix=f"{name}-pool",
+            initializer=self._init_thread
+        )
+        metrics.WORKLOAD_QUEUE_LIMIT.labels(name).set(max_queue)
+
+    @classmethod
+    def from_env(cls, name: str) -> "WorkloadPool":
+        defaults = DEFAULTS[name]
+        prefix = name.upper()
+        cpu_share = os.getenv(f"{prefix}_CPU_SHARE")
+        return cls(
+            name,
+            workers=int(os.getenv(f"{prefix}_WORKERS", str(defaults["workers"]))),
+            max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", str(defaults["max_queue"]))),
+            cpu_share=float(cpu_share) if cpu_share else defaults["cpu_share"],
+            nice=int(os.getenv(f"{prefix}_NICE", str(defaults["nice"]))),
+        )
+
+    def _init_thread(self) -> None:
+        # Linux에서는 스레드도 독립된 태스크라 native id로 우선순위와 CPU 고정을 따로 지정할 수 있음
+        thread_id = threading.get_native_id()
+        if self.nice:
+            try:
+                os.setpriority(os.PRIO_PROCESS, thread_id, self.nice)
+            except (AttributeError, OSError) as e:
+                print(f"Warning: {self.name} pool priority not applied: {e}")
+        if self.cpus:
+            try:
+                os.sched_setaffinity(thread_id, self.cpus)
+            except (AttributeError, OSError) as e:
+                print(f"Warning: {self.name} pool CPU affinity not applied: {e}")
+
+    def retry_after(self) -> int:
+        """대기 중인 작업이 모두 시작될 때까지 걸릴 예상 시간(초)"""
+        return max(1, math.ceil(self._avg_seconds * (self._queued + 1) / self.workers))
+
+    def admit(self) -> None:
+        """작업을 제출하지 않고 대기열 여유만 확인"""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._reject()
+
+    def _reject(self) -> None:
+        self._rejected += 1
+        metrics.WORKLOAD_REJECTIONS.labels(self.name).inc()
+        raise PoolSaturatedError(self.name, self.retry_after())
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """대기열에 여유가 있으면 제출 (호출한 스레드의 contextvars(단계별 타이밍 등)를 그대로 사용)"""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._reject()
+            self._queued += 1
+            metrics.WORKLOAD_QUEUE_DEPTH.labels(self.name).set(self._queued)
+        context = contextvars.copy_context()
+        future = self._executor.submit(self._run, time.monotonic(), context, fn, args, kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        # 시작 전에 취소된 작업은 _run을 거치지 않으므로 여기서 대기열에서 뺌
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+                metrics.WORKLOAD_QUEUE_DEPTH.labels(self.name).set(self._queued)
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """제출하고 결과를 기다림 (동기 핸들러용)"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _run(self, enqueued_at: float, context: contextvars.Context, fn, args, kwargs) -> Any:
+        started_at = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            metrics.WORKLOAD_QUEUE_DEPTH.labels(self.name).set(self._queued)
+            metrics.WORKLOAD_RUNNING.labels(self.name).set(self._running)
+        metrics.WORKLOAD_WAIT_SECONDS.labels(self.name).observe(started_at - enqueued_at)
+        try:
+            return context.run(fn, *args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - started_at
+            metrics.WORKLOAD_RUN_SECONDS.labels(self.name).observe(elapsed)
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+                metrics.WORKLOAD_RUNNING.labels(self.name).set(self._running)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_run_seconds": round(self._avg_seconds, 3),
+                "retry_after": self.retry_after(),
+                "nice": self.nice,
+                "cpus": self.cpus,
+            }